@@ -0,0 +1,408 @@
+# actor_learner.py
+# Entrenamiento asíncrono actor-learner (estilo IMPALA) sobre field_sim:
+# en vez de alternar recogida de rollouts y actualización en un solo
+# proceso (PPO.learn), varios procesos actor simulan sus campos con la
+# última política que conocen y escriben bloques de trayectoria de tamaño
+# fijo en anillos de memoria compartida; el learner (este proceso) los
+# consume por lotes, corrige el desfase de política con V-trace y publica
+# los pesos nuevos en otro bloque de memoria compartida.
+#
+#   - Anillo por actor: n_slots bloques (T+1, B, obs) / (T, B) en RawArray;
+#     los índices de slot viajan por colas (libres por actor, llenos común),
+#     los datos no se copian entre procesos.
+#   - Pesos: vector plano del actor (matrices ya traspuestas, como el .npz de
+#     NumpyPolicy) + versión; los actores lo copian cuando cambia la versión.
+#     Los actores no usan torch: infieren con NumpyPolicy.
+#   - V-trace (Espeholt et al. 2018) con rho/c truncados a 1.
+#
+# Al terminar se guarda la política como .npz (NumpyPolicy), que los
+# agentes cargan directamente (RCSS_MODEL=models/impala_rcss_final.npz).
+#
+#   python actor_learner.py [--actors 4] [--envs 16] [--unroll 32] [--seconds 300] [--team]
+#   python actor_learner.py --scaling 1 2 4 --seconds 30    # informe de escalado
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from field_sim import OBS_DIM, TEAM_OBS_DIM, N_ACTIONS
+from formation import load_roles
+from numpy_policy import NumpyPolicy
+from vec_env import make_batch
+
+MODEL_DIR = "models"
+CONF_FILE = "conf_file.conf"
+HIDDEN = (128, 128)
+UNROLL = 32          # pasos por bloque de trayectoria
+ENVS_PER_ACTOR = 16  # campos por actor (un step vectorizado)
+N_SLOTS = 4          # bloques del anillo de cada actor
+BATCH_BLOCKS = 4     # bloques por actualización del learner
+LR = 5e-4
+GAMMA = 0.99
+ENTROPY_COEF = 0.01
+VALUE_COEF = 0.5
+MAX_GRAD_NORM = 0.5
+LOG_EVERY = 5.0      # s entre líneas de rendimiento
+
+
+def _mlp(in_dim, hidden):
+    layers, d = [], in_dim
+    for h in hidden:
+        layers += [nn.Linear(d, h), nn.ReLU()]
+        d = h
+    return nn.Sequential(*layers), d
+
+
+class ActorCritic(nn.Module):
+    """Actor y crítico separados, como net_arch=dict(pi=..., vf=...) de train_rl.py."""
+
+    def __init__(self, obs_dim, n_actions=N_ACTIONS, hidden=HIDDEN):
+        super().__init__()
+        self.pi, d = _mlp(obs_dim, hidden)
+        self.action_net = nn.Linear(d, n_actions)
+        self.vf, d = _mlp(obs_dim, hidden)
+        self.value_net = nn.Linear(d, 1)
+
+    def forward(self, obs):
+        return self.action_net(self.pi(obs)), self.value_net(self.vf(obs)).squeeze(-1)
+
+    def actor_layers(self):
+        return [m for m in self.pi if isinstance(m, nn.Linear)] + [self.action_net]
+
+    def flat_actor(self):
+        """Pesos del actor como vector float32: W^T (in, out) y b de cada capa, en orden."""
+        with torch.no_grad():
+            parts = []
+            for layer in self.actor_layers():
+                parts += [layer.weight.t().reshape(-1), layer.bias]
+            return torch.cat(parts).numpy()
+
+    def to_numpy_policy(self, seed=None):
+        return NumpyPolicy(*unflatten_actor(self.flat_actor(), self.layer_shapes()), "relu",
+                           seed, transposed=True)
+
+    def layer_shapes(self):
+        return [(l.in_features, l.out_features) for l in self.actor_layers()]
+
+
+def unflatten_actor(flat, shapes):
+    """Vistas (sin copia) de las W^T y b de un vector plano de flat_actor()."""
+    weights, biases, i = [], [], 0
+    for n_in, n_out in shapes:
+        weights.append(flat[i:i + n_in * n_out].reshape(n_in, n_out))
+        i += n_in * n_out
+        biases.append(flat[i:i + n_out])
+        i += n_out
+    return weights, biases
+
+
+class TrajectoryRing:
+    """
+    n_slots bloques de trayectoria en memoria compartida (RawArray), con
+    vistas NumPy. Se crea antes de lanzar los actores y se hereda (fork) o
+    se serializa con el proceso (spawn); los datos nunca pasan por colas.
+    """
+
+    def __init__(self, ctx, n_slots, unroll, n_envs, obs_dim, n_actions=N_ACTIONS):
+        self.shape = (n_slots, unroll, n_envs)
+        self.obs_dim, self.n_actions = obs_dim, n_actions
+        T1 = (n_slots, unroll + 1, n_envs)
+        self._raw = {
+            "obs": (ctx.RawArray("f", int(np.prod(T1)) * obs_dim), np.float32, T1 + (obs_dim,)),
+            "actions": (ctx.RawArray("b", int(np.prod(self.shape))), np.int8, self.shape),
+            "rewards": (ctx.RawArray("f", int(np.prod(self.shape))), np.float32, self.shape),
+            "dones": (ctx.RawArray("b", int(np.prod(self.shape))), np.bool_, self.shape),
+            "logits": (ctx.RawArray("f", int(np.prod(self.shape)) * n_actions), np.float32,
+                       self.shape + (n_actions,)),
+            "version": (ctx.RawArray("q", n_slots), np.int64, (n_slots,)),
+        }
+        self._views = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_views"] = None
+        return state
+
+    def view(self, name):
+        if self._views is None:
+            self._views = {k: np.frombuffer(raw, dtype=dt).reshape(shape)
+                           for k, (raw, dt, shape) in self._raw.items()}
+        return self._views[name]
+
+
+class SharedWeights:
+    """Vector de pesos del actor + versión, protegido por un lock (copia atómica)."""
+
+    def __init__(self, ctx, size):
+        self._raw = ctx.RawArray("f", int(size))
+        self._version = ctx.RawValue("q", 0)
+        self._lock = ctx.Lock()
+
+    @property
+    def version(self):
+        return self._version.value
+
+    def publish(self, flat):
+        with self._lock:
+            np.frombuffer(self._raw, dtype=np.float32)[:] = flat
+            self._version.value += 1
+
+    def read_into(self, out):
+        """Copia los pesos en out y devuelve su versión."""
+        with self._lock:
+            out[:] = np.frombuffer(self._raw, dtype=np.float32)
+            return self._version.value
+
+
+def _actor(actor_id, ring, free_q, full_q, weights, shapes, stop, unroll, n_envs, seed, team):
+    """Bucle de un actor: simula n_envs campos y llena bloques del anillo."""
+    try:
+        batch = make_batch(n_envs, max_steps=1000, seed=seed, team=team)
+        n = n_envs * batch.agents_per_field
+        obs = batch.reset()
+        rng = np.random.default_rng(seed)
+        flat = np.zeros(sum(i * o + o for i, o in shapes), dtype=np.float32)
+        version = -1
+        policy = None
+        r_obs, r_act, r_rew = ring.view("obs"), ring.view("actions"), ring.view("rewards")
+        r_done, r_logits, r_ver = ring.view("dones"), ring.view("logits"), ring.view("version")
+        while not stop.is_set():
+            try:
+                slot = free_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if weights.version != version:
+                version = weights.read_into(flat)
+                policy = NumpyPolicy(*unflatten_actor(flat, shapes), "relu", transposed=True)
+            r_ver[slot] = version
+            for t in range(unroll):
+                r_obs[slot, t] = obs
+                logits = policy.logits(obs)
+                r_logits[slot, t] = logits
+                # muestreo de la categórica (como NumpyPolicy.predict)
+                z = logits - logits.max(axis=1, keepdims=True)
+                p = np.exp(z)
+                p /= p.sum(axis=1, keepdims=True)
+                u = rng.random((n, 1), dtype=np.float32)
+                act = np.minimum((np.cumsum(p, axis=1) < u).sum(axis=1), N_ACTIONS - 1)
+                obs, rew, done, _, _ = batch.step(act)
+                r_act[slot, t] = act
+                r_rew[slot, t] = rew
+                r_done[slot, t] = done
+            r_obs[slot, unroll] = obs
+            full_q.put((actor_id, slot))
+    except KeyboardInterrupt:
+        pass
+
+
+def vtrace(behaviour_logp, target_logp, rewards, discounts, values, bootstrap, rho_bar=1.0, c_bar=1.0):
+    """
+    Objetivos V-trace (T, B) y ventajas del gradiente de política; todas las
+    entradas son tensores (T, B) salvo bootstrap (B,). Sin gradiente.
+    """
+    with torch.no_grad():
+        rhos = torch.exp(target_logp - behaviour_logp)
+        clipped_rhos = rhos.clamp(max=rho_bar)
+        cs = rhos.clamp(max=c_bar)
+        next_values = torch.cat([values[1:], bootstrap[None]])
+        deltas = clipped_rhos * (rewards + discounts * next_values - values)
+        acc = torch.zeros_like(bootstrap)
+        vs_minus_v = torch.empty_like(values)
+        for t in range(values.shape[0] - 1, -1, -1):
+            acc = deltas[t] + discounts[t] * cs[t] * acc
+            vs_minus_v[t] = acc
+        vs = vs_minus_v + values
+        next_vs = torch.cat([vs[1:], bootstrap[None]])
+        pg_adv = clipped_rhos * (rewards + discounts * next_vs - values)
+    return vs, pg_adv
+
+
+class Learner:
+    def __init__(self, obs_dim, lr=LR, gamma=GAMMA, seed=None):
+        if seed is not None:
+            torch.manual_seed(seed)
+        self.model = ActorCritic(obs_dim)
+        self.opt = torch.optim.Adam(self.model.parameters(), lr=lr, eps=1e-5)
+        self.gamma = gamma
+        self.updates = 0
+
+    def update(self, obs, actions, rewards, dones, behaviour_logits):
+        """Un paso de gradiente sobre un lote (T+1, B, obs) / (T, B) en NumPy."""
+        obs_t = torch.from_numpy(obs)
+        T = actions.shape[0]
+        logits, values = self.model(obs_t)
+        act = torch.from_numpy(actions.astype(np.int64))
+        logp_all = torch.log_softmax(logits[:T], dim=-1)
+        target_logp = logp_all.gather(-1, act[..., None]).squeeze(-1)
+        beh_logp = torch.log_softmax(torch.from_numpy(behaviour_logits), dim=-1)
+        beh_logp = beh_logp.gather(-1, act[..., None]).squeeze(-1)
+        discounts = self.gamma * (1.0 - torch.from_numpy(dones.astype(np.float32)))
+        vs, pg_adv = vtrace(beh_logp, target_logp.detach(), torch.from_numpy(rewards), discounts,
+                            values[:T].detach(), values[T].detach())
+        pg_loss = -(target_logp * pg_adv).mean()
+        value_loss = 0.5 * ((vs - values[:T]) ** 2).mean()
+        entropy = -(logp_all.exp() * logp_all).sum(-1).mean()
+        loss = pg_loss + VALUE_COEF * value_loss - ENTROPY_COEF * entropy
+        self.opt.zero_grad()
+        loss.backward()
+        nn.utils.clip_grad_norm_(self.model.parameters(), MAX_GRAD_NORM)
+        self.opt.step()
+        self.updates += 1
+        return {"pg_loss": pg_loss.item(), "value_loss": value_loss.item(), "entropy": entropy.item()}
+
+
+def train(n_actors=4, envs_per_actor=ENVS_PER_ACTOR, unroll=UNROLL, seconds=300.0, max_steps=None,
+          batch_blocks=BATCH_BLOCKS, team=None, seed=None, out_path=None, log_every=LOG_EVERY,
+          start_method=None):
+    """
+    Entrena durante seconds (o hasta max_steps pasos de entorno) y devuelve
+    un resumen de rendimiento. Con team=(homes, nombres) cada campo lleva el
+    equipo entero (como train_rl.py --team).
+    """
+    if start_method is None:
+        start_method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+    ctx = mp.get_context(start_method)
+    obs_dim = OBS_DIM if team is None else TEAM_OBS_DIM
+    n_sub = envs_per_actor * (1 if team is None else len(team[0]))
+    learner = Learner(obs_dim, seed=seed)
+    shapes = learner.model.layer_shapes()
+    weights = SharedWeights(ctx, sum(i * o + o for i, o in shapes))
+    weights.publish(learner.model.flat_actor())
+    stop = ctx.Event()
+    full_q = ctx.Queue()
+    rings, free_qs, procs = [], [], []
+    for a in range(n_actors):
+        ring = TrajectoryRing(ctx, N_SLOTS, unroll, n_sub, obs_dim)
+        free_q = ctx.Queue()
+        for s in range(N_SLOTS):
+            free_q.put(s)
+        aseed = None if seed is None else seed + 1000 * a
+        p = ctx.Process(target=_actor, args=(a, ring, free_q, full_q, weights, shapes, stop, unroll,
+                                             envs_per_actor, aseed, team), daemon=True)
+        p.start()
+        rings.append(ring)
+        free_qs.append(free_q)
+        procs.append(p)
+
+    batch_blocks = max(1, int(batch_blocks))
+    B = n_sub * batch_blocks
+    obs = np.empty((unroll + 1, B, obs_dim), dtype=np.float32)
+    actions = np.empty((unroll, B), dtype=np.int8)
+    rewards = np.empty((unroll, B), dtype=np.float32)
+    dones = np.empty((unroll, B), dtype=np.bool_)
+    logits = np.empty((unroll, B, N_ACTIONS), dtype=np.float32)
+
+    steps = blocks = 0
+    lag_sum = 0
+    wait_s = 0.0
+    reward_sum = 0.0
+    t_start = time.perf_counter()
+    t_log, steps_log, updates_log = t_start, 0, 0
+    losses = {}
+    try:
+        while True:
+            elapsed = time.perf_counter() - t_start
+            if elapsed >= seconds or (max_steps is not None and steps >= max_steps):
+                break
+            t0 = time.perf_counter()
+            for j in range(batch_blocks):
+                while True:
+                    try:
+                        a, slot = full_q.get(timeout=1.0)
+                        break
+                    except queue.Empty:
+                        if not any(p.is_alive() for p in procs):
+                            raise RuntimeError("todos los actores han terminado")
+                ring = rings[a]
+                sl = slice(j * n_sub, (j + 1) * n_sub)
+                obs[:, sl] = ring.view("obs")[slot]
+                actions[:, sl] = ring.view("actions")[slot]
+                rewards[:, sl] = ring.view("rewards")[slot]
+                dones[:, sl] = ring.view("dones")[slot]
+                logits[:, sl] = ring.view("logits")[slot]
+                lag_sum += learner.updates + 1 - int(ring.view("version")[slot])
+                # copiado: el slot vuelve al actor
+                free_qs[a].put(slot)
+            wait_s += time.perf_counter() - t0
+            losses = learner.update(obs, actions, rewards, dones, logits)
+            weights.publish(learner.model.flat_actor())
+            blocks += batch_blocks
+            steps += unroll * B
+            reward_sum += float(rewards.sum())
+            now = time.perf_counter()
+            if now - t_log >= log_every:
+                dt = now - t_log
+                print(f"[INFO] pasos={steps} {(steps - steps_log) / dt:.0f} pasos/s "
+                      f"{(learner.updates - updates_log) / dt:.1f} updates/s "
+                      f"retraso_medio={lag_sum / blocks:.2f} versiones recompensa/paso={reward_sum / steps:+.4f} "
+                      f"pg={losses['pg_loss']:+.3f} v={losses['value_loss']:.3f} H={losses['entropy']:.3f}")
+                t_log, steps_log, updates_log = now, steps, learner.updates
+    finally:
+        stop.set()
+        for p in procs:
+            p.join(timeout=2.0)
+            if p.is_alive():
+                p.terminate()
+    elapsed = time.perf_counter() - t_start
+    if out_path:
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        learner.model.to_numpy_policy().save(out_path)
+        print(f"[INFO] Política guardada en {out_path}")
+    return {
+        "actors": n_actors, "steps": steps, "updates": learner.updates, "seconds": elapsed,
+        "steps_per_s": steps / elapsed if elapsed else 0.0,
+        "updates_per_s": learner.updates / elapsed if elapsed else 0.0,
+        "mean_lag": lag_sum / blocks if blocks else 0.0,
+        "learner_wait": wait_s / elapsed if elapsed else 0.0,
+        "reward_per_step": reward_sum / steps if steps else 0.0,
+    }
+
+
+def scaling_report(actor_counts, seconds, **kw):
+    """Entrena seconds con cada número de actores y compara con el escalado lineal."""
+    rows = []
+    for n in actor_counts:
+        print(f"[INFO] escalado: {n} actores durante {seconds:.0f}s")
+        rows.append(train(n, seconds=seconds, log_every=float("inf"), **kw))
+    base = rows[0]["steps_per_s"] / rows[0]["actors"]
+    print(f"[INFO] cores disponibles: {len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()}")
+    print(" actores   pasos/s   updates/s   eficiencia   retraso   espera_learner")
+    for r in rows:
+        eff = r["steps_per_s"] / (base * r["actors"]) if base else 0.0
+        print(f"{r['actors']:>8} {r['steps_per_s']:>9.0f} {r['updates_per_s']:>11.1f} {100 * eff:>11.0f}% "
+              f"{r['mean_lag']:>9.2f} {100 * r['learner_wait']:>15.0f}%")
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Entrenamiento actor-learner asíncrono (V-trace)")
+    ap.add_argument("--actors", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    ap.add_argument("--envs", type=int, default=ENVS_PER_ACTOR, help="campos por actor")
+    ap.add_argument("--unroll", type=int, default=UNROLL)
+    ap.add_argument("--batch-blocks", type=int, default=BATCH_BLOCKS)
+    ap.add_argument("--seconds", type=float, default=300.0)
+    ap.add_argument("--steps", type=int, default=None, help="parar tras estos pasos de entorno")
+    ap.add_argument("--team", action="store_true", help="equipo completo por campo (roles de conf_file)")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--out", default=os.path.join(MODEL_DIR, "impala_rcss_final.npz"))
+    ap.add_argument("--scaling", type=int, nargs="+", default=None, metavar="N",
+                    help="informe de escalado con estos números de actores (no guarda modelo)")
+    args = ap.parse_args()
+    team = load_roles(CONF_FILE) if args.team else None
+    kw = dict(envs_per_actor=args.envs, unroll=args.unroll, batch_blocks=args.batch_blocks,
+              team=team, seed=args.seed)
+    if args.scaling:
+        scaling_report(args.scaling, args.seconds, **kw)
+        return
+    res = train(args.actors, seconds=args.seconds, max_steps=args.steps, out_path=args.out, **kw)
+    print(f"[INFO] {res['steps']} pasos en {res['seconds']:.1f}s: {res['steps_per_s']:.0f} pasos/s, "
+          f"{res['updates_per_s']:.1f} updates/s, retraso medio {res['mean_lag']:.2f} versiones")
+
+
+if __name__ == "__main__":
+    main()
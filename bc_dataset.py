@@ -0,0 +1,156 @@
+# bc_dataset.py
+# Datos para behaviour cloning a partir de partidos grabados (match_recorder):
+# pares obs -> acción discreta (0..4) sacados de las decisiones heurísticas
+# (tactical_target, random con límites...), etiquetadas por el comando de
+# cuerpo que mandó el jugador con el mismo mapeo que map_action_to_commands:
+#   (move balón) -> 0, (dash) solo -> 1, (turn <0) -> 2, (turn >0) -> 3,
+#   (move a otro punto: home / objetivo táctico) -> 4.
+# La obs grabada es la que usó la estrategia (posiciones estimadas), así que
+# el "move al balón" se compara con el balón al que apuntó el jugador.
+#
+# Cada fichero .rec es un shard. stream_batches() los recorre en streaming:
+# orden de shards aleatorio por época, varios shards abiertos a la vez
+# (memmap) intercalando trozos, y un buffer de barajado del que salen los
+# minibatches. prefetch() lo corre en un hilo de fondo para que el
+# etiquetado y la lectura se solapen con el paso de optimización.
+import queue
+import threading
+
+import numpy as np
+
+from match_recorder import iter_batches, list_logs, count_records
+
+MOVE_BALL_TOL = 1.0     # m: un move a menos de esto del balón es "ir al balón"
+TURN_MIN = 5.0          # grados: giros menores cuentan como dash recto
+CHUNK = 4096            # registros que se leen de un shard de cada vez
+OPEN_SHARDS = 8         # shards abiertos a la vez (intercalados)
+SHUFFLE_BUFFER = 65536  # muestras en el buffer de barajado
+
+
+def label_command(cmd, ballx, bally):
+    """Acción discreta equivalente al primer comando de cuerpo (o -1)."""
+    if cmd.startswith(b"(move"):
+        try:
+            x, y = (float(v) for v in cmd[6:cmd.index(b")")].split())
+        except ValueError:
+            return -1
+        return 0 if abs(x - ballx) + abs(y - bally) < MOVE_BALL_TOL else 4
+    if cmd.startswith(b"(turn"):
+        try:
+            a = float(cmd[6:cmd.index(b")")])
+        except ValueError:
+            return -1
+        if a <= -TURN_MIN:
+            return 2
+        if a >= TURN_MIN:
+            return 3
+        return 1
+    if cmd.startswith(b"(dash"):
+        return 1
+    return -1
+
+
+def label_batch(batch, include_policy=False):
+    """
+    (obs (n, 7) float32, acción (n,) int64) de un lote de registros. Por
+    defecto sólo las decisiones heurísticas (action == -1); con
+    include_policy también las de la política, con su propia acción.
+    """
+    obs = batch["obs"]
+    act = batch["action"].astype(np.int64)
+    heur = np.flatnonzero(act < 0)
+    cmds = batch["cmd"][heur]
+    bx = obs[heur, 2]
+    by = obs[heur, 3]
+    act[heur] = [label_command(c, x, y) for c, x, y in zip(cmds.tolist(), bx.tolist(), by.tolist())]
+    keep = act >= 0
+    if not include_policy:
+        keep[batch["action"] >= 0] = False
+    return np.ascontiguousarray(obs[keep]), act[keep]
+
+
+def _shard_chunks(path, include_policy):
+    for b in iter_batches(path, batch_size=CHUNK):
+        obs, act = label_batch(b, include_policy)
+        if act.size:
+            yield obs, act
+
+
+def stream_batches(paths, batch_size=256, epochs=1, seed=None, include_policy=False,
+                   shuffle_buffer=SHUFFLE_BUFFER, open_shards=OPEN_SHARDS):
+    """Genera minibatches barajados (obs, acción) durante 'epochs' pasadas por los shards."""
+    rng = np.random.default_rng(seed)
+    files = list_logs(paths)
+    for _ in range(epochs):
+        order = list(rng.permutation(len(files)))
+        active = []
+        buf_obs, buf_act, n_buf = [], [], 0
+        while order or active:
+            while order and len(active) < open_shards:
+                active.append(_shard_chunks(files[order.pop()], include_policy))
+            i = int(rng.integers(len(active)))
+            chunk = next(active[i], None)
+            if chunk is None:
+                active.pop(i)
+            else:
+                buf_obs.append(chunk[0])
+                buf_act.append(chunk[1])
+                n_buf += chunk[1].size
+            if n_buf < shuffle_buffer and (order or active):
+                continue
+            if n_buf == 0:
+                continue
+            obs = np.concatenate(buf_obs)
+            act = np.concatenate(buf_act)
+            perm = rng.permutation(act.size)
+            obs, act = obs[perm], act[perm]
+            # lo que no llena un minibatch queda en el buffer (salvo al final)
+            n_out = act.size if not (order or active) else act.size - act.size % batch_size
+            for s in range(0, n_out, batch_size):
+                yield obs[s:s + batch_size], act[s:s + batch_size]
+            buf_obs, buf_act, n_buf = [obs[n_out:]], [act[n_out:]], act.size - n_out
+
+
+def prefetch(gen, depth=4):
+    """Corre el generador en un hilo de fondo con hasta 'depth' elementos adelantados."""
+    q = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+
+    def _worker():
+        try:
+            for item in gen:
+                while not stop.is_set():
+                    try:
+                        q.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    return
+        except BaseException as e:  # se relanza en el consumidor
+            q.put(e)
+            return
+        q.put(done)
+
+    th = threading.Thread(target=_worker, name="bc-prefetch", daemon=True)
+    th.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def dataset_summary(paths, include_policy=False):
+    """(registros totales, muestras etiquetadas, histograma de acciones)."""
+    hist = np.zeros(5, dtype=np.int64)
+    for b in iter_batches(paths):
+        _, act = label_batch(b, include_policy)
+        hist += np.bincount(act, minlength=5)
+    return count_records(paths), int(hist.sum()), hist
@@ -0,0 +1,145 @@
+# benchmarks/bench_agents.py
+# Benchmark de extremo a extremo de las tres variantes de agente contra el
+# stand-in de rcssserver (fake_server): cada variante corre como proceso
+# aparte (RCSS_PORT / RCSS_CYCLE_MS) durante N ciclos y se mide
+#   - CPU (user+sys) y memoria máxima del proceso del agente (os.wait4),
+#   - comandos por ciclo, conflictos y latencia de decisión vista desde el server,
+#   - arranque en frío (línea "Arranque" de StartupTimer: imports y total hasta
+#     tener a todos colocados).
+# Los resultados se añaden a benchmarks/results/agents.jsonl con el commit
+# de git y se comparan con los del último commit distinto medido.
+#
+#   python -m benchmarks.bench_agents [--variants random rl 433] [--cycles 300] [--cycle-ms 50]
+import argparse
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from fake_server import FakeServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS = os.path.join(ROOT, "benchmarks", "results", "agents.jsonl")
+VARIANTS = {"random": "team_agent.py", "rl": "team_agent_rl.py", "433": "team_agent_433.py"}
+COMPARE = ("cpu_ms_per_cycle", "maxrss_mb", "commands_per_cycle", "decision_ms_p50", "decision_ms_p99",
+           "startup_ms", "imports_ms")
+STARTUP_RE = re.compile(r"Arranque: imports \+([\d.]+)ms.*-> total ([\d.]+)ms")
+
+
+def git_commit():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip() != ""
+        return rev, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def run_variant(variant, cycles, cycle_ms, port=0):
+    srv = FakeServer(port=port, cycle=cycle_ms / 1000.0)
+    env = dict(os.environ, RCSS_PORT=str(srv.port), RCSS_CYCLE_MS=str(cycle_ms))
+    th = threading.Thread(target=srv.serve, kwargs={"cycles": cycles}, daemon=True)
+    th.start()
+    proc = subprocess.Popen([sys.executable, VARIANTS[variant]], cwd=ROOT, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    startup = {}
+
+    def read_stdout():
+        # se lee todo (para que no se llene el pipe) y se guarda la línea de arranque
+        for line in proc.stdout:
+            m = STARTUP_RE.search(line)
+            if m and not startup:
+                startup.update(imports_ms=float(m.group(1)), startup_ms=float(m.group(2)))
+
+    reader = threading.Thread(target=read_stdout, daemon=True)
+    reader.start()
+    th.join()
+    proc.send_signal(signal.SIGINT)
+    deadline = time.monotonic() + 5.0
+    status = ru = None
+    while time.monotonic() < deadline:
+        pid, status, ru = os.wait4(proc.pid, os.WNOHANG)
+        if pid:
+            break
+        time.sleep(0.05)
+    else:
+        proc.kill()
+        _, status, ru = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    reader.join(1.0)
+    srv.close()
+
+    st = srv.stats()
+    cpu = ru.ru_utime + ru.ru_stime
+    st.update({
+        "variant": variant,
+        "cpu_s": round(cpu, 3),
+        "cpu_ms_per_cycle": round(1000.0 * cpu / max(1, st["server_cycles"]), 3),
+        "maxrss_mb": round(ru.ru_maxrss / 1024.0, 1),   # ru_maxrss en KiB (Linux)
+        "exit": proc.returncode,
+    })
+    st.update(startup)
+    return st
+
+
+def previous(commit, variant):
+    """Último resultado de otro commit para la variante (o None)."""
+    if not os.path.exists(RESULTS):
+        return None
+    last = None
+    with open(RESULTS) as f:
+        for line in f:
+            try:
+                r = json.loads(line)
+            except ValueError:
+                continue
+            if r.get("variant") == variant and r.get("commit") != commit:
+                last = r
+    return last
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS))
+    ap.add_argument("--cycles", type=int, default=300)
+    ap.add_argument("--cycle-ms", type=float, default=50.0)
+    ap.add_argument("--no-save", action="store_true")
+    args = ap.parse_args()
+
+    commit, dirty = git_commit()
+    rows = []
+    for v in args.variants:
+        r = run_variant(v, args.cycles, args.cycle_ms)
+        r.update({"commit": commit, "dirty": dirty, "time": time.time(),
+                  "cycles": args.cycles, "cycle_ms": args.cycle_ms})
+        rows.append(r)
+        print(f"{v:>7}: cpu={r['cpu_ms_per_cycle']:.2f}ms/ciclo rss={r['maxrss_mb']:.0f}MB "
+              f"comandos/ciclo={r['commands_per_cycle']:.2f} conflictos={r['conflict_cycles']} "
+              f"decisión p50={r.get('decision_ms_p50', float('nan')):.1f}ms "
+              f"p99={r.get('decision_ms_p99', float('nan')):.1f}ms "
+              f"arranque={r.get('startup_ms', float('nan')):.0f}ms "
+              f"(imports {r.get('imports_ms', float('nan')):.0f}ms)")
+        prev = previous(commit, v)
+        if prev is not None:
+            diffs = []
+            for k in COMPARE:
+                if k in r and k in prev and prev[k]:
+                    diffs.append(f"{k} {100.0 * (r[k] - prev[k]) / prev[k]:+.1f}%")
+            print(f"         vs {prev['commit']}: " + ", ".join(diffs))
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(RESULTS), exist_ok=True)
+        with open(RESULTS, "a") as f:
+            for r in rows:
+                f.write(json.dumps(r) + "\n")
+        print(f"[INFO] resultados añadidos a {os.path.relpath(RESULTS, ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
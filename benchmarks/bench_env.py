@@ -0,0 +1,47 @@
+# benchmarks/bench_env.py
+# Pasos/seg del entorno headless (RcssGymEnv sobre field_sim), en un core.
+#
+#   python -m benchmarks.bench_env [--steps 50000]
+import argparse
+import time
+
+import numpy as np
+
+from field_sim import FieldSim, N_ACTIONS
+from rcss_gym_env import RcssGymEnv
+
+
+def bench_gym(steps, seed=0):
+    env = RcssGymEnv(seed=seed)
+    env.reset(seed=seed)
+    actions = np.random.default_rng(seed).integers(0, N_ACTIONS, size=steps)
+    t0 = time.perf_counter()
+    for a in actions:
+        _, _, terminated, truncated, _ = env.step(a)
+        if terminated or truncated:
+            env.reset()
+    return steps / (time.perf_counter() - t0)
+
+
+def bench_sim(steps, seed=0):
+    # el núcleo NumPy sin la capa gymnasium
+    sim = FieldSim(1, 1, home=(-10.0, 0.0), seed=seed)
+    sim.reset()
+    actions = np.random.default_rng(seed).integers(0, N_ACTIONS, size=(steps, 1, 1))
+    t0 = time.perf_counter()
+    for a in actions:
+        sim.step(a)
+        sim.observe()
+    return steps / (time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--steps", type=int, default=50_000)
+    args = ap.parse_args()
+    print(f"RcssGymEnv.step:       {bench_gym(args.steps):,.0f} steps/s")
+    print(f"FieldSim.step+observe: {bench_sim(args.steps):,.0f} steps/s")
+
+
+if __name__ == "__main__":
+    main()
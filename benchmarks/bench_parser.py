@@ -0,0 +1,120 @@
+# benchmarks/bench_parser.py
+# Micro-benchmark: mensajes/seg de sexp_parser frente al camino anterior con
+# regex (decode a str + POS_RE/BALL_RE, sólo primer match):
+#   - scan_percept: camino caliente de los agentes (mypos/ball sobre el buffer)
+#   - parse_message: parse completo a objetos tipados
+#
+#   python -m benchmarks.bench_parser [--n 200000] [--socket]
+#
+# Con --socket los mensajes pasan por un socket UDP de loopback y se compara
+# recvfrom()+decode+regex contra recvfrom_into() en buffer preasignado+scan/parse.
+import argparse
+import re
+import socket
+import time
+
+from sexp_parser import RecvBuffer, parse_message, scan_percept
+
+# camino anterior, tal cual estaba en los agentes
+POS_RE = re.compile(r"\(mypos\s+([\-0-9.]+)\s+([\-0-9.]+)\)", re.IGNORECASE)
+BALL_RE = re.compile(r"\(ball\s+([\-0-9.]+)\s+([\-0-9.]+)", re.IGNORECASE)
+
+SEE = (b'(see 120 ((f c) 10.2 3 0 0) ((f c t) 35.5 -60) ((f c b) 35.5 60) ((f l t) 70.1 -40) '
+       b'((f p l c) 30 12) ((g l) 52.5 10) ((b) 5.5 -20 0.1 0.2) '
+       b'((p "MY_TEAM" 3) 10 20 0 0 30 40) ((p "MY_TEAM" 7) 12.2 -5 0 0 10 10) '
+       b'((p "RIVAL" 9) 8.1 33) ((p "RIVAL") 30 5) ((p) 40 1) ((l b) 10 -20) '
+       b'(mypos -10.5 2.25) (ball 1.5 -2))')
+SENSE_BODY = (b'(sense_body 120 (view_mode high normal) (stamina 7870.5 1 129000) (speed 0.42 12) '
+              b'(head_angle 0) (kick 0) (dash 31) (turn 12) (say 0) (turn_neck 0) (catch 0) (move 1) '
+              b'(change_view 0) (arm (movable 0) (expires 0) (target 0 0) (count 0)) '
+              b'(focus (target none) (count 0)) (tackle (expires 0) (count 0)) (collision none) '
+              b'(foul  (charged 0) (card none)) (mypos -10.4 2.3) (ball 1.5 -2))')
+HEAR = b'(hear 120 referee play_on)'
+MESSAGES = [SEE, SENSE_BODY, HEAR]
+
+
+def regex_path(data):
+    msg = data.decode(errors="ignore")
+    mpos = POS_RE.search(msg)
+    px = py = bx = by = None
+    if mpos:
+        px = float(mpos.group(1)); py = float(mpos.group(2))
+    mball = BALL_RE.search(msg)
+    if mball:
+        bx = float(mball.group(1)); by = float(mball.group(2))
+    return px, py, bx, by
+
+
+def bench_inmemory(n):
+    msgs = (MESSAGES * (n // len(MESSAGES) + 1))[:n]
+    buf = bytearray(8192)
+    view = memoryview(buf)
+
+    t0 = time.perf_counter()
+    for data in msgs:
+        regex_path(data)
+    t_regex = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for data in msgs:
+        k = len(data)
+        buf[:k] = data  # lo que haría recvfrom_into
+        scan_percept(buf, k)
+    t_scan = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for data in msgs:
+        k = len(data)
+        buf[:k] = data
+        parse_message(view[:k])
+    t_parser = time.perf_counter() - t0
+    return t_regex, t_scan, t_parser
+
+
+def bench_socket(n):
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(("127.0.0.1", 0))
+    rx.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    addr = rx.getsockname()
+    chunk = 256  # no desbordar el buffer del kernel
+
+    def run(reader):
+        done = 0
+        t = 0.0
+        while done < n:
+            k = min(chunk, n - done)
+            for i in range(k):
+                tx.sendto(MESSAGES[i % len(MESSAGES)], addr)
+            t0 = time.perf_counter()
+            for _ in range(k):
+                reader()
+            t += time.perf_counter() - t0
+            done += k
+        return t
+
+    t_regex = run(lambda: regex_path(rx.recvfrom(8192)[0]))
+    rbuf = RecvBuffer()
+    t_scan = run(lambda: rbuf.recv(rx))
+    t_parser = run(lambda: rbuf.recv_full(rx))
+    rx.close(); tx.close()
+    return t_regex, t_scan, t_parser
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--socket", action="store_true", help="medir también recv + parse por UDP loopback")
+    args = ap.parse_args()
+
+    for name, fn in (("memoria", bench_inmemory),) + ((("socket", bench_socket),) if args.socket else ()):
+        t_regex, t_scan, t_parser = fn(args.n)
+        print(f"[{name}] regex (mypos/ball): {args.n / t_regex:,.0f} msg/s")
+        print(f"[{name}] scan_percept:       {args.n / t_scan:,.0f} msg/s "
+              f"({t_regex / t_scan:.2f}x)")
+        print(f"[{name}] parser completo:    {args.n / t_parser:,.0f} msg/s "
+              f"({t_regex / t_parser:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# benchmarks/eval_estimator.py
+# Precisión del estimador (state_estimator) frente al retraso: error al
+# predecir la posición propia y la del balón L ciclos por delante de la
+# última observación, comparado con mantener el último valor (lo que hacía
+# el runtime antes del filtro).
+#
+#   python -m benchmarks.eval_estimator [--fields 256] [--cycles 600] [--see-prob 0.5]
+#   python -m benchmarks.eval_estimator --logs DIR    # partidos grabados (RCSS_RECORD)
+#
+# Simulado: field_sim con acciones aleatorias (que se mantienen unos
+# ciclos) y golpes al balón, todas las
+# pistas de todos los campos en un solo StateEstimator (update vectorizado);
+# las observaciones llevan ruido gaussiano y faltan en los ciclos sin see.
+# Grabado: para cada jugador, las observaciones crudas de su log (campo raw,
+# ya ruidosas y sin filtrar) son medida y referencia a la vez.
+import argparse
+import time
+
+import numpy as np
+
+from field_sim import FieldSim, N_ACTIONS, BALL_DECAY
+from match_recorder import iter_batches, list_logs
+from state_estimator import StateEstimator, SELF_Q, SELF_R, BALL_Q, BALL_R
+
+LAGS = (0, 1, 2, 3, 5)
+
+
+def _tracks(n):
+    """n pistas propias + n de balón, en un solo filtro (tiempo en ciclos)."""
+    decay = np.r_[np.ones(n), np.full(n, BALL_DECAY)]
+    q = np.r_[np.full(n, SELF_Q), np.full(n, BALL_Q)]
+    r = np.r_[np.full(n, SELF_R), np.full(n, BALL_R)]
+    return StateEstimator(2 * n, decay, q, r, cycle_len=1.0)
+
+
+def eval_sim(fields, cycles, see_prob, kick_every, switch_prob=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    sim = FieldSim(fields, 1, home=(-10.0, 0.0), seed=seed, dribble=False)
+    sim.reset()
+    kf = _tracks(fields)
+    idx = np.arange(2 * fields)
+    noise = np.r_[np.full(fields, SELF_R), np.full(fields, BALL_R)][:, None]
+    truth = np.empty((cycles, 2 * fields, 2))
+    kf_pred = {L: np.full((cycles, 2 * fields, 2), np.nan) for L in LAGS}
+    hold_pred = {L: np.full((cycles, 2 * fields, 2), np.nan) for L in LAGS}
+    last = np.full((2 * fields, 2), np.nan)
+    t_update = 0.0
+    actions = rng.integers(0, N_ACTIONS, size=(fields, 1))
+    for c in range(cycles):
+        truth[c] = np.vstack([sim.pos[:, 0], sim.ball])
+        seen = rng.random(2 * fields) < see_prob
+        z = truth[c] + rng.normal(0.0, 1.0, (2 * fields, 2)) * noise
+        t0 = time.perf_counter()
+        kf.update(idx[seen], z[seen], float(c))
+        t_update += time.perf_counter() - t0
+        last[seen] = z[seen]
+        for L in LAGS:
+            if c + L < cycles:
+                kf_pred[L][c + L] = kf.predict(idx, float(c + L))
+                hold_pred[L][c + L] = last
+        # golpes al balón para que haya trayectorias que seguir
+        hit = rng.random(fields) < 1.0 / kick_every
+        if hit.any():
+            ang = rng.uniform(-np.pi, np.pi, hit.sum())
+            speed = rng.uniform(0.5, 2.5, hit.sum())
+            sim.ball_vel[hit] = np.column_stack([speed * np.cos(ang), speed * np.sin(ang)])
+        # los agentes mantienen la acción varios ciclos
+        switch = rng.random((fields, 1)) < switch_prob
+        actions[switch] = rng.integers(0, N_ACTIONS, size=switch.sum())
+        sim.step(actions)
+    print(f"[INFO] update vectorizado: {1e6 * t_update / cycles:.0f} µs/ciclo para {2 * fields} pistas")
+    return _report(truth, kf_pred, hold_pred, fields, skip=10)
+
+
+def eval_logs(paths):
+    """Por jugador: medida en el registro i, referencia en el registro i + L (tiempo en ciclos locales)."""
+    per_player = {}
+    for path in list_logs(paths):
+        # cada fichero es un proceso/partido: las pistas no se mezclan entre ficheros
+        for batch in iter_batches(path, fields=("cycle", "unum", "side", "raw")):
+            keys = np.char.add(batch["side"].astype("S1"), batch["unum"].astype("S2"))
+            for k in np.unique(keys):
+                m = keys == k
+                per_player.setdefault((path, k), []).append((batch["cycle"][m], batch["raw"][m]))
+    rows = {L: [[], [], [], []] for L in LAGS}   # hold self, kf self, hold ball, kf ball
+    for chunks in per_player.values():
+        cyc = np.concatenate([c for c, _ in chunks]).astype(np.float64)
+        obs = np.concatenate([o for _, o in chunks]).astype(np.float64)
+        order = np.argsort(cyc, kind="stable")
+        cyc, obs = cyc[order], obs[order]
+        kf = _tracks(1)
+        n = len(cyc)
+        preds = {L: np.full((n, 4), np.nan) for L in LAGS}
+        for i in range(n):
+            kf.update(np.arange(2), obs[i].reshape(2, 2), cyc[i])
+            for L in LAGS:
+                if i + L < n:
+                    preds[L][i + L] = kf.predict(np.arange(2), cyc[i + L]).ravel()
+        for L in LAGS:
+            if n <= L:
+                continue
+            ref, kfp, hold = obs[L:], preds[L][L:], obs[:n - L]
+            for j, (a, b) in enumerate(((hold, slice(0, 2)), (kfp, slice(0, 2)),
+                                        (hold, slice(2, 4)), (kfp, slice(2, 4)))):
+                rows[L][j].append(np.hypot(*(a[:, b] - ref[:, b]).T))
+    print(f"[INFO] {len(per_player)} jugadores")
+    print(" lag   hold_self   kf_self   hold_ball   kf_ball   (error medio, m)")
+    for L in LAGS:
+        if rows[L][0]:
+            e = [float(np.mean(np.concatenate(r))) for r in rows[L]]
+            print(f"{L:>4} {e[0]:>11.3f} {e[1]:>9.3f} {e[2]:>11.3f} {e[3]:>9.3f}")
+
+
+def _report(truth, kf_pred, hold_pred, n, skip):
+    print(" lag   hold_self   kf_self   hold_ball   kf_ball   (RMSE, m)")
+    out = {}
+    for L in LAGS:
+        row = []
+        for pred in (hold_pred[L], kf_pred[L]):
+            err = np.hypot(*(pred[skip:] - truth[skip:]).transpose(2, 0, 1))
+            row.append((np.sqrt(np.nanmean(err[:, :n] ** 2)), np.sqrt(np.nanmean(err[:, n:] ** 2))))
+        (hs, hb), (ks, kb) = row
+        out[L] = {"hold_self": hs, "kf_self": ks, "hold_ball": hb, "kf_ball": kb}
+        print(f"{L:>4} {hs:>11.3f} {ks:>9.3f} {hb:>11.3f} {kb:>9.3f}")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--logs", nargs="+", default=None, help="partidos grabados en vez de simulación")
+    ap.add_argument("--fields", type=int, default=256)
+    ap.add_argument("--cycles", type=int, default=600)
+    ap.add_argument("--see-prob", type=float, default=0.5, help="probabilidad de observar en cada ciclo")
+    ap.add_argument("--kick-every", type=float, default=25.0, help="ciclos medios entre golpes al balón")
+    ap.add_argument("--switch-prob", type=float, default=0.1, help="probabilidad de cambiar de acción por ciclo")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    if args.logs:
+        eval_logs(args.logs)
+    else:
+        eval_sim(args.fields, args.cycles, args.see_prob, args.kick_every, args.switch_prob, args.seed)
+
+
+if __name__ == "__main__":
+    main()
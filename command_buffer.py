@@ -0,0 +1,158 @@
+# command_buffer.py
+# Buffer de comandos por jugador y ciclo: los comandos de una decisión se
+# juntan y salen en un solo datagrama (un sendto por ciclo en vez de uno
+# por comando). Los comandos constantes se codifican una vez ((dash 60),
+# (turn 30), ...) y los numéricos se formatean directamente a bytes, sin
+# pasar por f-string + encode().
+#
+# Como mucho un comando de cuerpo por ciclo (ver cycle_scheduler): el
+# segundo de un ciclo es un conflicto y el jugador lo pasa a su plan para
+# el ciclo siguiente; si repite uno que ya está pendiente se descarta.
+#
+# Los valores numéricos se sanean: NaN/inf (p.ej. un ángulo calculado con
+# posiciones aún sin observar) pasan a 0 y dash/turn se recortan a los
+# rangos del server, así int() nunca lanza ValueError en el bucle del jugador.
+import math
+
+from cycle_scheduler import is_body_command
+
+UDP_IP_HEADER = 28      # bytes de cabecera IPv4 + UDP que se ahorra cada datagrama evitado
+ENCODE_CACHE_MAX = 1024
+MAX_POWER = 100         # rango del server para dash: [-100, 100]
+MAX_MOMENT = 180        # rango del server para turn: [-180, 180]
+
+# comandos precodificados: potencias/ángulos enteros habituales
+DASH = {p: b"(dash %d)" % p for p in range(-MAX_POWER, MAX_POWER + 1)}
+TURN = {a: b"(turn %d)" % a for a in range(-MAX_MOMENT, MAX_MOMENT + 1)}
+
+_encoded = {}
+
+
+def encode(cmd):
+    """str -> bytes con memo (los comandos constantes se codifican una vez)."""
+    b = _encoded.get(cmd)
+    if b is None:
+        b = cmd.encode()
+        if len(_encoded) < ENCODE_CACHE_MAX:
+            _encoded[cmd] = b
+    return b
+
+
+def _finite(v):
+    """v, o 0 si es NaN/inf."""
+    return v if math.isfinite(v) else 0
+
+
+def _clamp(v, limit):
+    """v recortado a [-limit, limit]; NaN/inf -> 0."""
+    if not math.isfinite(v):
+        return 0
+    return max(-limit, min(limit, v))
+
+
+def dash(power):
+    if not -MAX_POWER <= power <= MAX_POWER:   # también NaN (toda comparación es False)
+        power = _clamp(power, MAX_POWER)
+    p = int(power)
+    if p == power and p in DASH:
+        return DASH[p]
+    return b"(dash %.1f)" % power
+
+
+def turn(moment):
+    if not -MAX_MOMENT <= moment <= MAX_MOMENT:
+        moment = _clamp(moment, MAX_MOMENT)
+    a = int(moment)
+    if a == moment and a in TURN:
+        return TURN[a]
+    return b"(turn %.1f)" % moment
+
+
+def move(x, y):
+    return b"(move %.2f %.2f)" % (_finite(x), _finite(y))
+
+
+def kick(power, direction):
+    return b"(kick %.1f %.1f)" % (_finite(power), _finite(direction))
+
+
+class CommandBuffer:
+    """
+    Comandos pendientes del ciclo: body (uno como mucho) + el resto
+    (turn_neck, say, change_view...). flush() los manda juntos en un
+    datagrama armado sobre un bytearray reutilizado.
+    """
+
+    def __init__(self):
+        self.body = None
+        self.extra = []
+        self._out = bytearray()
+        # contadores
+        self.commands = 0       # comandos enviados
+        self.datagrams = 0      # sendto hechos
+        self.dropped = 0        # comandos de cuerpo repetidos descartados
+        self.dropped_bytes = 0
+
+    def __len__(self):
+        return (self.body is not None) + len(self.extra)
+
+    def add(self, cmd):
+        """
+        Añade un comando (bytes). Devuelve False si es de cuerpo y ya hay uno
+        en este ciclo (el llamante decide si lo deja para después).
+        """
+        if is_body_command(cmd):
+            if self.body is not None:
+                return False
+            self.body = cmd
+        else:
+            self.extra.append(cmd)
+        return True
+
+    def pending(self):
+        """Bytes de lo encolado en este ciclo (sin mandarlo)."""
+        if self.body is None:
+            return b"".join(self.extra)
+        return self.body + b"".join(self.extra)
+
+    def drop(self, cmd):
+        """Cuenta un comando descartado por repetido."""
+        self.dropped += 1
+        self.dropped_bytes += len(cmd)
+
+    def flush(self, transport, addr):
+        """Manda todo lo pendiente en un datagrama. Devuelve cuántos comandos salieron."""
+        n = len(self)
+        if not n:
+            return 0
+        out = self._out
+        del out[:]
+        if self.body is not None:
+            out += self.body
+        for cmd in self.extra:
+            out += cmd
+        self.body = None
+        self.extra.clear()
+        try:
+            transport.sendto(out, addr)
+        except Exception:
+            return 0
+        self.commands += n
+        self.datagrams += 1
+        return n
+
+    def stats(self):
+        saved = self.commands - self.datagrams
+        return {
+            "commands": self.commands,
+            "datagrams": self.datagrams,
+            "syscalls_saved": saved,
+            "bytes_saved": saved * UDP_IP_HEADER + self.dropped_bytes,
+            "dropped": self.dropped,
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"comandos={s['commands']} datagramas={s['datagrams']} "
+                f"sendto_ahorrados={s['syscalls_saved']} bytes_ahorrados={s['bytes_saved']} "
+                f"descartados={s['dropped']}")
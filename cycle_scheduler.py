@@ -0,0 +1,119 @@
+# cycle_scheduler.py
+# Sincroniza las decisiones de cada jugador con el ciclo de simulación del
+# server (100 ms) en lugar de dormir tiempos fijos.
+# El inicio de cada ciclo se infiere por la llegada de sense_body (que el
+# server manda una vez por ciclo, también antes del saque inicial); si el
+# server sólo manda see se usa see, y si no llega nada se extrapola el
+# ciclo con el periodo nominal para que el jugador no se quede quieto.
+import asyncio
+import os
+
+# periodo nominal del server (simulator_step); RCSS_CYCLE_MS lo cambia para
+# servers más rápidos que tiempo real (fake_server.py)
+CYCLE = float(os.environ.get("RCSS_CYCLE_MS", "100")) / 1000.0
+DECISION_OFFSET = 0.2 * CYCLE  # cuánto después del inicio del ciclo se decide (20 ms)
+EXTRAPOLATE_AFTER = 1.5  # ciclos sin mensajes antes de inventar un límite
+
+BODY_COMMANDS = (b"(dash", b"(turn ", b"(kick", b"(move", b"(catch", b"(tackle")
+
+
+def is_body_command(cmd):
+    """Comandos de los que el server acepta sólo uno por ciclo."""
+    if isinstance(cmd, str):
+        cmd = cmd.encode()
+    return cmd.startswith(BODY_COMMANDS)
+
+
+class CycleClock:
+    """
+    Reloj de ciclos de un jugador.
+
+    - cycle: contador local de ciclos (sube con cada sense_body)
+    - server_time: último tiempo de simulación informado por el server
+    - missed_cycles: ciclos en los que el jugador tenía que decidir y no lo hizo
+    """
+
+    def __init__(self, offset=DECISION_OFFSET, cycle_len=CYCLE):
+        self.offset = float(offset)
+        self.cycle_len = float(cycle_len)
+        self.cycle = 0
+        self.cycle_start = None
+        self.server_time = None
+        self.decided_cycle = -1
+        self.missed_cycles = 0
+        self.extrapolated_cycles = 0
+        self.active = False
+        self._saw_sense_body = False
+        self._synthetic = False
+        self._event = asyncio.Event()
+
+    def on_message(self, data, t):
+        """Llamar con cada datagrama recibido (bytes) y su hora de llegada."""
+        if data.startswith(b"(sense_body"):
+            self._saw_sense_body = True
+            self._new_cycle(t, _parse_time(data, 11))
+        elif data.startswith(b"(see") and not self._saw_sense_body:
+            self._new_cycle(t, _parse_time(data, 4))
+
+    def _new_cycle(self, t, server_time=None, synthetic=False):
+        if self._synthetic and not synthetic and t - self.cycle_start < self.cycle_len * 0.5:
+            # el mensaje real llegó tarde: es el mismo ciclo que ya extrapolamos
+            self.cycle_start = t
+            self._synthetic = False
+            if server_time is not None:
+                self.server_time = server_time
+            return
+        self._synthetic = synthetic
+        if self.cycle_start is not None:
+            if self.active and self.decided_cycle < self.cycle:
+                self.missed_cycles += 1
+            self.cycle += 1
+        self.cycle_start = t
+        if server_time is not None:
+            self.server_time = server_time
+        self._event.set()
+
+    async def wait_decision(self):
+        """
+        Espera al punto de decisión del próximo ciclo aún no decidido
+        (inicio del ciclo + offset) y lo marca como decidido.
+        Devuelve el número de ciclo local.
+        """
+        loop = asyncio.get_running_loop()
+        self.active = True
+        while self.cycle_start is None or self.cycle <= self.decided_cycle:
+            if self.cycle_start is None:
+                timeout = self.cycle_len * EXTRAPOLATE_AFTER
+            else:
+                timeout = self.cycle_start + self.cycle_len * EXTRAPOLATE_AFTER - loop.time()
+            if timeout > 0:
+                self._event.clear()
+                try:
+                    await asyncio.wait_for(self._event.wait(), timeout)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+            if self.cycle_start is None or loop.time() >= self.cycle_start + self.cycle_len * EXTRAPOLATE_AFTER:
+                # no llegó nada: límite sintético con el periodo nominal
+                self.extrapolated_cycles += 1
+                start = loop.time() if self.cycle_start is None else self.cycle_start + self.cycle_len
+                self._new_cycle(start, synthetic=True)
+        delay = self.cycle_start + self.offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.decided_cycle = self.cycle
+        return self.cycle
+
+
+def _parse_time(data, start):
+    # "(sense_body 123 ..." / "(see 123 ..." -> 123
+    end = start
+    n = len(data)
+    while end < n and data[end:end + 1] == b" ":
+        end += 1
+    begin = end
+    while end < n and data[end:end + 1].isdigit():
+        end += 1
+    if end == begin:
+        return None
+    return int(data[begin:end])
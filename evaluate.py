@@ -0,0 +1,236 @@
+# evaluate.py
+# Evaluación en paralelo de checkpoints (models/ppo_rcss_*_steps.zip de
+# AsyncCheckpointCallback y el modelo final) contra las variantes de agente:
+# cada partido corre en un worker de un pool de procesos con su propio
+# fake_server (puerto libre elegido por el sistema, así los partidos no se
+# pisan) y dos procesos de equipo:
+#   - candidato: la variante --variant (rl o 433) con el checkpoint (RCSS_MODEL)
+#   - rival: random, rl o 433 (con --opponent-model para los de política)
+# Se varían semilla y rival; al final se agrega una tabla por checkpoint.
+#
+# Los .zip se exportan antes a .npz (export_policy, sin torch) para que los
+# agentes arranquen en milisegundos. Los modelos de train_rl.py --team
+# (obs con rol) se detectan por la dimensión de entrada y se lanzan con
+# RCSS_ROLE_OBS=1.
+#
+#   python evaluate.py [--checkpoints models/ppo_rcss_*_steps.zip ...] [--opponents random rl 433]
+#                      [--seeds 3] [--cycles 600] [--cycle-ms 20] [--jobs N] [--out eval.jsonl]
+import argparse
+import glob
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from export_policy import export
+from fake_server import FakeServer
+from field_sim import TEAM_OBS_DIM
+from numpy_policy import NumpyPolicy
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+AGENTS = {"random": "team_agent.py", "rl": "team_agent_rl.py", "433": "team_agent_433.py"}
+MODEL_DIR = os.path.join(ROOT, "models")
+EXPORT_DIR = os.path.join(MODEL_DIR, "eval_npz")
+PROCS_PER_MATCH = 3     # server (worker del pool) + dos equipos
+JOIN_TIMEOUT = 5.0      # s para que el candidato se registre antes de lanzar al rival
+STOP_TIMEOUT = 5.0
+
+
+def default_checkpoints():
+    """Checkpoints de AsyncCheckpointCallback ordenados por pasos, más el modelo final."""
+    def steps(p):
+        m = re.search(r"_(\d+)_steps\.zip$", p)
+        return int(m.group(1)) if m else float("inf")
+    paths = sorted(glob.glob(os.path.join(MODEL_DIR, "ppo_rcss_*_steps.zip")), key=steps)
+    final = os.path.join(MODEL_DIR, "ppo_rcss_final.zip")
+    if os.path.exists(final):
+        paths.append(final)
+    return paths
+
+
+def prepare_model(path):
+    """Ruta del .npz a usar para un checkpoint (.zip se exporta una vez)."""
+    if path.endswith(".npz"):
+        return path
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    out = os.path.join(EXPORT_DIR, os.path.splitext(os.path.basename(path))[0] + ".npz")
+    if not os.path.exists(out) or os.path.getmtime(out) < os.path.getmtime(path):
+        export(path, out)
+    return out
+
+
+def is_team_policy(npz_path):
+    """True si el modelo espera la obs con rol (train_rl.py --team)."""
+    return NumpyPolicy.load(npz_path).obs_dim == TEAM_OBS_DIM
+
+
+def _launch(variant, team, port, cycle_ms, seed, model):
+    env = dict(os.environ, RCSS_PORT=str(port), RCSS_CYCLE_MS=str(cycle_ms),
+               RCSS_TEAM=team, RCSS_SEED=str(seed))
+    env.pop("RCSS_RECORD", None)
+    env.pop("RCSS_ROLE_OBS", None)
+    if model is not None:
+        env["RCSS_MODEL"] = model
+        if is_team_policy(model):
+            env["RCSS_ROLE_OBS"] = "1"
+    return subprocess.Popen([sys.executable, AGENTS[variant]], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _stop(proc):
+    if proc.poll() is None:
+        proc.send_signal(signal.SIGINT)
+        try:
+            proc.wait(STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def run_match(spec):
+    """Un partido completo en este proceso (worker del pool). Devuelve un dict de métricas."""
+    srv = FakeServer(port=0, cycle=spec["cycle_ms"] / 1000.0, seed=spec["seed"], dribble=True)
+    th = threading.Thread(target=srv.serve, kwargs={"cycles": spec["cycles"]}, daemon=True)
+    th.start()
+    procs = []
+    t0 = time.perf_counter()
+    try:
+        procs.append(_launch(spec["variant"], "CANDIDATE", srv.port, spec["cycle_ms"], spec["seed"],
+                             spec["model"]))
+        # el primer equipo en hacer init juega en el lado l
+        deadline = time.monotonic() + JOIN_TIMEOUT
+        while not srv.teams and time.monotonic() < deadline:
+            time.sleep(0.01)
+        procs.append(_launch(spec["opponent"], "OPPONENT", srv.port, spec["cycle_ms"], spec["seed"] + 1,
+                             spec["opponent_model"]))
+        th.join()
+    finally:
+        srv.stop()
+        for p in procs:
+            _stop(p)
+        srv.close()
+    cand = srv.stats("l")
+    opp = srv.stats("r")
+    return {
+        "checkpoint": spec["checkpoint"], "opponent": spec["opponent"], "seed": spec["seed"],
+        "goals_for": cand["goals_l"], "goals_against": cand["goals_r"],
+        "touches_for": cand["touches_l"], "touches_against": cand["touches_r"],
+        "ball_x_mean": cand["ball_x_mean"],
+        "players": cand["players"], "opp_players": opp["players"],
+        "decision_ms_p50": cand.get("decision_ms_p50"),
+        "conflict_cycles": cand["conflict_cycles"],
+        "wall_s": time.perf_counter() - t0,
+    }
+
+
+def aggregate(results):
+    """Filas de la tabla: por (checkpoint, rival) y por checkpoint con todos los rivales."""
+    groups = {}
+    for r in results:
+        groups.setdefault((r["checkpoint"], r["opponent"]), []).append(r)
+        groups.setdefault((r["checkpoint"], "*"), []).append(r)
+    rows = []
+    for (ckpt, opp), rs in groups.items():
+        gf = np.array([r["goals_for"] for r in rs], dtype=float)
+        ga = np.array([r["goals_against"] for r in rs], dtype=float)
+        tf = sum(r["touches_for"] for r in rs)
+        ta = sum(r["touches_against"] for r in rs)
+        lat = [r["decision_ms_p50"] for r in rs if r["decision_ms_p50"] is not None]
+        rows.append({
+            "checkpoint": ckpt, "opponent": opp, "matches": len(rs),
+            "win": float(np.mean(gf > ga)), "draw": float(np.mean(gf == ga)),
+            "goals_for": float(gf.mean()), "goals_against": float(ga.mean()),
+            "goal_diff": float((gf - ga).mean()),
+            "possession": tf / (tf + ta) if tf + ta else 0.0,
+            "ball_x_mean": float(np.mean([r["ball_x_mean"] for r in rs])),
+            "decision_ms_p50": float(np.median(lat)) if lat else float("nan"),
+            "incomplete": sum(r["players"] < 11 or r["opp_players"] < 11 for r in rs),
+        })
+    order = {c: i for i, c in enumerate(dict.fromkeys(r["checkpoint"] for r in results))}
+    rows.sort(key=lambda r: (order[r["checkpoint"]], r["opponent"] == "*", r["opponent"]))
+    return rows
+
+
+def format_table(rows):
+    head = (f"{'checkpoint':<28} {'rival':<7} {'n':>3} {'gan%':>5} {'emp%':>5} {'GF':>5} {'GC':>5} "
+            f"{'dif':>6} {'pos%':>5} {'bal_x':>6} {'dec_ms':>6}")
+    lines = [head, "-" * len(head)]
+    for r in rows:
+        lines.append(f"{r['checkpoint'][:28]:<28} {r['opponent']:<7} {r['matches']:>3} "
+                     f"{100 * r['win']:>5.0f} {100 * r['draw']:>5.0f} {r['goals_for']:>5.2f} "
+                     f"{r['goals_against']:>5.2f} {r['goal_diff']:>+6.2f} {100 * r['possession']:>5.1f} "
+                     f"{r['ball_x_mean']:>+6.1f} {r['decision_ms_p50']:>6.1f}"
+                     + (f"  ({r['incomplete']} incompletos)" if r["incomplete"] else ""))
+    return "\n".join(lines)
+
+
+def default_jobs():
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    return max(1, (cores or 1) // PROCS_PER_MATCH)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Evaluación de checkpoints en partidos paralelos")
+    ap.add_argument("--checkpoints", nargs="+", default=None,
+                    help="modelos .zip/.npz (por defecto models/ppo_rcss_*_steps.zip + final)")
+    ap.add_argument("--variant", default="rl", choices=("rl", "433"), help="agente que usa el checkpoint")
+    ap.add_argument("--opponents", nargs="+", default=list(AGENTS), choices=list(AGENTS))
+    ap.add_argument("--opponent-model", default=os.path.join(MODEL_DIR, "ppo_rcss_final.zip"),
+                    help="modelo de los rivales rl/433 (si no existe, juegan con la heurística)")
+    ap.add_argument("--seeds", type=int, default=3, help="partidos (semillas) por checkpoint y rival")
+    ap.add_argument("--cycles", type=int, default=600)
+    ap.add_argument("--cycle-ms", type=float, default=20.0)
+    ap.add_argument("--jobs", type=int, default=None,
+                    help=f"partidos simultáneos (por defecto cores/{PROCS_PER_MATCH})")
+    ap.add_argument("--out", default=None, help="añadir los resultados por partido a este .jsonl")
+    args = ap.parse_args()
+
+    ckpts = args.checkpoints or default_checkpoints()
+    if not ckpts:
+        print("[WARN] No hay checkpoints en", MODEL_DIR, "— ejecuta train_rl.py primero.")
+        return
+    models = {c: prepare_model(c) for c in ckpts}
+    opp_model = prepare_model(args.opponent_model) if os.path.exists(args.opponent_model) else None
+    specs = [{"checkpoint": os.path.basename(c), "model": models[c], "variant": args.variant,
+              "opponent": opp, "opponent_model": opp_model, "seed": 1000 * s,
+              "cycles": args.cycles, "cycle_ms": args.cycle_ms}
+             for c in ckpts for opp in args.opponents for s in range(args.seeds)]
+    jobs = args.jobs or default_jobs()
+    print(f"[INFO] {len(specs)} partidos ({len(ckpts)} checkpoints x {len(args.opponents)} rivales x "
+          f"{args.seeds} semillas), {jobs} en paralelo")
+
+    t0 = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(run_match, s): s for s in specs}
+        for fut in as_completed(futures):
+            s = futures[fut]
+            try:
+                r = fut.result()
+            except Exception as e:
+                print(f"[WARN] partido {s['checkpoint']} vs {s['opponent']} (semilla {s['seed']}) falló: {e!r}")
+                continue
+            results.append(r)
+            print(f"[INFO] {r['checkpoint']} vs {r['opponent']} s={r['seed']}: "
+                  f"{r['goals_for']}-{r['goals_against']} ({len(results)}/{len(specs)})")
+    elapsed = time.perf_counter() - t0
+    if not results:
+        return
+    print()
+    print(format_table(aggregate(results)))
+    print(f"\n[INFO] {len(results)} partidos en {elapsed:.1f}s")
+    if args.out:
+        with open(args.out, "a") as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+
+
+if __name__ == "__main__":
+    main()
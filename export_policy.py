@@ -0,0 +1,160 @@
+# export_policy.py
+# Exporta el actor de un modelo PPO de stable_baselines3 (.zip) a un .npz
+# compacto para numpy_policy.NumpyPolicy. No necesita torch: lee el
+# policy.pth (formato zip de torch.save) con un unpickler propio.
+#
+#   python export_policy.py models/ppo_rcss_final.zip [-o salida.npz] [--check 1000]
+#
+# --check compara acciones y logits contra PPO.load (requiere SB3 + torch);
+# tests/test_export_policy.py hace la misma comparación con pytest.
+import argparse
+import io
+import json
+import os
+import pickle
+import re
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+
+from numpy_policy import NumpyPolicy
+
+_STORAGE_DTYPES = {
+    "FloatStorage": np.float32,
+    "DoubleStorage": np.float64,
+    "HalfStorage": np.float16,
+    "LongStorage": np.int64,
+    "IntStorage": np.int32,
+    "BoolStorage": np.bool_,
+}
+
+
+class _StorageType:
+    def __init__(self, name):
+        self.dtype = np.dtype(_STORAGE_DTYPES[name])
+
+
+def _rebuild_tensor(storage, offset, size, stride, *args):
+    itemsize = storage.dtype.itemsize
+    return np.lib.stride_tricks.as_strided(
+        storage[offset:], shape=tuple(size), strides=tuple(s * itemsize for s in stride)).copy()
+
+
+class _TorchUnpickler(pickle.Unpickler):
+    """Unpickler de state_dict de torch que construye arrays NumPy."""
+
+    def __init__(self, fileobj, archive, prefix):
+        super().__init__(fileobj)
+        self.archive = archive
+        self.prefix = prefix
+
+    def find_class(self, module, name):
+        if module == "collections" and name == "OrderedDict":
+            return OrderedDict
+        if module == "torch._utils" and name == "_rebuild_tensor_v2":
+            return _rebuild_tensor
+        if module == "torch" and name in _STORAGE_DTYPES:
+            return _StorageType(name)
+        raise pickle.UnpicklingError(f"tipo no soportado en el state_dict: {module}.{name}")
+
+    def persistent_load(self, pid):
+        # ('storage', tipo, clave, device, numel)
+        _, storage_type, key, _, _ = pid
+        raw = self.archive.read(f"{self.prefix}/data/{key}")
+        return np.frombuffer(raw, dtype=storage_type.dtype)
+
+
+def read_state_dict(pth_bytes):
+    """state_dict de un torch.save (formato zip) como {nombre: np.ndarray}."""
+    with zipfile.ZipFile(io.BytesIO(pth_bytes)) as archive:
+        pkl = next(n for n in archive.namelist() if n.endswith("/data.pkl"))
+        prefix = pkl[:-len("/data.pkl")]
+        byteorder = f"{prefix}/byteorder"
+        if byteorder in archive.namelist() and archive.read(byteorder).strip() != b"little":
+            raise ValueError("sólo se soportan state_dict little-endian")
+        return _TorchUnpickler(io.BytesIO(archive.read(pkl)), archive, prefix).load()
+
+
+def read_activation(data_json):
+    """Nombre de la activación desde policy_kwargs del zip de SB3 (Tanh por defecto)."""
+    kwargs = data_json.get("policy_kwargs", {})
+    text = kwargs.get("activation_fn", "") if isinstance(kwargs, dict) else ""
+    m = re.search(r"\.(\w+)'>", str(text))
+    return m.group(1).lower() if m else "tanh"
+
+
+def load_sb3_actor(zip_path):
+    """Pesos del actor (weights, biases, activation) de un .zip de PPO."""
+    with zipfile.ZipFile(zip_path) as z:
+        data_json = json.loads(z.read("data"))
+        state = read_state_dict(z.read("policy.pth"))
+
+    layer_ids = sorted(int(m.group(1)) for k in state
+                       for m in [re.match(r"mlp_extractor\.policy_net\.(\d+)\.weight$", k)] if m)
+    weights = [state[f"mlp_extractor.policy_net.{i}.weight"] for i in layer_ids]
+    biases = [state[f"mlp_extractor.policy_net.{i}.bias"] for i in layer_ids]
+    weights.append(state["action_net.weight"])
+    biases.append(state["action_net.bias"])
+    if any(k.startswith("features_extractor.") and "weight" in k for k in state):
+        raise ValueError("sólo se soporta FlattenExtractor (MlpPolicy)")
+    return weights, biases, read_activation(data_json)
+
+
+def export(zip_path, out_path=None):
+    out_path = out_path or os.path.splitext(zip_path)[0] + ".npz"
+    weights, biases, activation = load_sb3_actor(zip_path)
+    policy = NumpyPolicy(weights, biases, activation)
+    policy.save(out_path)
+    return policy, out_path
+
+
+def check_parity(zip_path, policy, n=1000, seed=0):
+    """Compara NumpyPolicy contra PPO.load sobre observaciones aleatorias."""
+    import torch
+    from stable_baselines3 import PPO
+
+    model = PPO.load(zip_path, device="cpu")
+    space = model.observation_space
+    rng = np.random.default_rng(seed)
+    obs = rng.uniform(space.low, space.high, size=(n,) + space.shape).astype(np.float32)
+
+    sb3_actions, _ = model.predict(obs, deterministic=True)
+    np_actions, _ = policy.predict(obs, deterministic=True)
+    with torch.no_grad():
+        dist = model.policy.get_distribution(torch.as_tensor(obs))
+        sb3_logits = dist.distribution.logits.numpy()
+        sb3_probs = dist.distribution.probs.numpy()
+    np_probs = policy.action_probs(obs)
+    return {
+        "n": n,
+        "argmax_match": float(np.mean(sb3_actions == np_actions)),
+        # los logits de torch vienen normalizados (log-softmax)
+        "max_logprob_diff": float(np.max(np.abs(
+            sb3_logits - np.log(np.maximum(np_probs, 1e-30))))),
+        "max_prob_diff": float(np.max(np.abs(sb3_probs - np_probs))),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Exporta el actor PPO de SB3 a .npz (NumpyPolicy)")
+    ap.add_argument("model", help="zip de stable_baselines3 (p.ej. models/ppo_rcss_final.zip)")
+    ap.add_argument("-o", "--output", help="ruta del .npz (por defecto junto al .zip)")
+    ap.add_argument("--check", type=int, default=0, metavar="N",
+                    help="comparar N observaciones contra SB3 (necesita torch)")
+    args = ap.parse_args()
+
+    policy, out_path = export(args.model, args.output)
+    size = os.path.getsize(out_path)
+    print(f"[INFO] Actor exportado a {out_path} ({size / 1024:.1f} KB, "
+          f"{len(policy.weights_t)} capas, activación {policy.activation})")
+    if args.check:
+        res = check_parity(args.model, policy, args.check)
+        print(f"[INFO] Paridad con SB3 en {res['n']} obs: argmax {res['argmax_match'] * 100:.2f}% "
+              f"| max |Δ log p| {res['max_logprob_diff']:.2e} | max |Δ p| {res['max_prob_diff']:.2e}")
+        if res["argmax_match"] < 1.0 or res["max_prob_diff"] > 1e-4:
+            raise SystemExit("[ERROR] la política exportada no coincide con SB3")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+# fake_server.py
+# Stand-in ligero de rcssserver para probar y medir los agentes sin el
+# server real. Habla lo justo del protocolo:
+#   (init TEAM ...) -> (init l|r UNUM before_kick_off)
+#   (reconnect TEAM UNUM) -> (reconnect l|r MODO)
+#   dash / turn / move / kick (uno de cuerpo por ciclo, como el server)
+#   y cada ciclo sense_body + see con la extensión (mypos x y) (ball x y).
+# La cinemática es la de field_sim (step_commands), con todos los jugadores
+# conectados en un único campo. Las coordenadas son globales (las de mypos).
+# El ciclo es configurable, también más rápido que tiempo real.
+#
+# Además mide, por jugador y ciclo, comandos recibidos, conflictos (más de
+# un comando de cuerpo en el ciclo) y la latencia de decisión vista desde
+# el server: desde el envío del sense_body hasta el primer comando; y por
+# equipo, goles, toques de balón y territorio (x media del balón).
+# Con --dribble el jugador que llega al balón lo empuja (como en el
+# entorno de entrenamiento), así hay partido aunque los agentes no chuten.
+#
+# Puerto de trainer (offline coach, por defecto el del server + 1): init,
+# move (ball) / move (player EQUIPO DORSAL), change_mode, start, look,
+# recover, eye, ear y done, con las respuestas (ok ...) de rcssserver.
+# Con --synch (server::synch_mode) el ciclo avanza en cuanto todos los
+# clientes (jugadores y trainer) mandan (done), con cycle-ms como espera
+# máxima, y tras las percepciones se envía (think) a cada jugador.
+#
+#   python fake_server.py [--port 6000] [--cycle-ms 100] [--cycles 600] [--dribble] [--synch]
+import argparse
+import math
+import re
+import select
+import socket
+import time
+
+import numpy as np
+
+from field_sim import FieldSim, FIELD_X_MAX
+
+MAX_PLAYERS = 22
+KICKOFF_CYCLE = 20     # ciclos en before_kick_off antes del play_on
+FAR = 1000.0           # donde se aparcan los slots sin jugador
+GOAL_HALF_WIDTH = 7.01
+
+_INIT_RE = re.compile(rb"\(init\s+(\S+?)[\s)]")
+_RECONNECT_RE = re.compile(rb"\(reconnect\s+(\S+)\s+(\d+)")
+_CMD_RE = re.compile(rb"\((dash|turn|move|kick)\s+([-\d.e]+)(?:\s+([-\d.e]+))?")
+_NUM = rb"([-\d.e]+)"
+_T_MOVE_BALL_RE = re.compile(rb"\(move\s+\(ball\)\s+" + rb"\s+".join([_NUM] * 2)
+                             + rb"(?:\s+" + _NUM + rb"\s+" + _NUM + rb")?")
+_T_MOVE_PLAYER_RE = re.compile(rb'\(move\s+\(player\s+"?([^")\s]+)"?\s+(\d+)\)\s+' + _NUM + rb"\s+" + _NUM
+                               + rb"(?:\s+" + _NUM + rb")?(?:\s+" + _NUM + rb"\s+" + _NUM + rb")?")
+_T_CHANGE_MODE_RE = re.compile(rb"\(change_mode\s+(\w+)\)")
+_T_SWITCH_RE = re.compile(rb"\((eye|ear)\s+(on|off)\)")
+
+
+class _Client:
+    __slots__ = ("addr", "slot", "team", "side", "unum", "commands", "body_this_cycle",
+                 "first_cmd_t", "conflicts", "cycles", "latencies", "done")
+
+    def __init__(self, addr, slot, team, side, unum):
+        self.addr = addr
+        self.slot = slot
+        self.team = team
+        self.side = side
+        self.unum = unum
+        self.commands = 0
+        self.body_this_cycle = 0
+        self.first_cmd_t = None
+        self.conflicts = 0
+        self.cycles = 0
+        self.latencies = []
+        self.done = False
+
+
+class FakeServer:
+    """
+    Server UDP síncrono (select) de un solo hilo. serve() corre hasta
+    'cycles' ciclos, 'duration' segundos o stop().
+    """
+
+    def __init__(self, host="127.0.0.1", port=6000, cycle=0.1, kickoff_cycle=KICKOFF_CYCLE,
+                 seed=None, see_every=1, dribble=False, trainer_port=None, synch=False):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+        self.port = self.sock.getsockname()[1]
+        # trainer en port + 1 (6001 con el 6000), o uno libre si port es 0
+        if trainer_port is None:
+            trainer_port = port + 1 if port else 0
+        self.tsock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.tsock.bind((host, trainer_port))
+        self.tsock.setblocking(False)
+        self.trainer_port = self.tsock.getsockname()[1]
+        self.trainer = None        # dirección del trainer conectado
+        self._trainer_done = False
+        self.synch = bool(synch)
+        self.cycle_len = float(cycle)
+        self.kickoff_cycle = int(kickoff_cycle)
+        self.see_every = max(1, int(see_every))
+
+        self.sim = FieldSim(1, MAX_PLAYERS, seed=seed, random_ball=False, dribble=dribble)
+        self.sim.pos[:] = FAR
+        self.time = 0
+        self.play_mode = "before_kick_off"
+        self.clients = {}
+        self.by_slot = {}
+        self.teams = []
+        self._running = False
+        # comandos del ciclo en curso (el primero de cuerpo de cada jugador)
+        self._turn = np.zeros((1, MAX_PLAYERS))
+        self._dash = np.zeros((1, MAX_PLAYERS))
+        self._kick_pow = np.zeros((1, MAX_PLAYERS))
+        self._kick_dir = np.zeros((1, MAX_PLAYERS))
+        self._cycle_sent_t = 0.0
+        self.total_datagrams = 0
+        # por equipo (l, r)
+        self.goals = {"l": 0, "r": 0}
+        self.touches = {"l": 0, "r": 0}
+        self._ball_x_sum = 0.0
+        self._play_cycles = 0
+
+    # ---------- protocolo ----------
+    def _handle(self, data, addr, t):
+        self.total_datagrams += 1
+        c = self.clients.get(addr)
+        if c is None:
+            if data.startswith(b"(init"):
+                self._init(data, addr)
+            elif data.startswith(b"(reconnect"):
+                self._reconnect(data, addr)
+            return
+        if data.startswith(b"(init"):
+            # init repetido (reintento del cliente): misma respuesta
+            self._send(f"(init {c.side} {c.unum} {self.play_mode})", addr)
+            return
+        if b"(done)" in data:
+            c.done = True
+            if data == b"(done)":
+                return
+        if c.first_cmd_t is None:
+            c.first_cmd_t = t
+        # todos los comandos del datagrama cuentan (say, turn_neck...), pero
+        # sólo los de cuerpo mueven al jugador
+        c.commands += data.count(b")(") + 1
+        for m in _CMD_RE.finditer(data):
+            cmd, a, b = m.group(1), float(m.group(2)), m.group(3)
+            c.body_this_cycle += 1
+            if c.body_this_cycle > 1:
+                # el server real ejecuta sólo uno por ciclo
+                if c.body_this_cycle == 2:
+                    c.conflicts += 1
+                continue
+            s = c.slot
+            if cmd == b"dash":
+                self._dash[0, s] = max(-100.0, min(100.0, a))
+            elif cmd == b"turn":
+                self._turn[0, s] = max(-180.0, min(180.0, a))
+            elif cmd == b"kick":
+                self._kick_pow[0, s] = max(0.0, min(100.0, a))
+                self._kick_dir[0, s] = float(b) if b else 0.0
+            elif cmd == b"move" and b is not None and self.play_mode == "before_kick_off":
+                self.sim.pos[0, s] = (a, float(b))
+                self.sim.vel[0, s] = 0.0
+
+    def _new_client(self, addr, team, unum=None):
+        if team not in self.teams:
+            if len(self.teams) == 2:
+                return None
+            self.teams.append(team)
+        side = "l" if self.teams.index(team) == 0 else "r"
+        used = {c.unum for c in self.clients.values() if c.team == team}
+        if unum is None:
+            unum = next((u for u in range(1, 12) if u not in used), None)
+            if unum is None:
+                return None
+        slot = (0 if side == "l" else 11) + unum - 1
+        c = _Client(addr, slot, team, side, unum)
+        self.clients[addr] = c
+        self.by_slot[slot] = c
+        if self.sim.pos[0, slot, 0] >= FAR:
+            # posición inicial en su campo, como antes del move
+            x = -5.0 - 3.0 * unum
+            self.sim.pos[0, slot] = (x if side == "l" else -x, -30.0 + 5.0 * unum)
+            self.sim.body[0, slot] = 0.0 if side == "l" else math.pi
+        return c
+
+    def _init(self, data, addr):
+        m = _INIT_RE.search(data)
+        c = self._new_client(addr, m.group(1).decode() if m else "NONAME")
+        if c is None:
+            self._send("(error no_more_team_or_player_or_goalie)", addr)
+            return
+        self._send(f"(init {c.side} {c.unum} {self.play_mode})", addr)
+
+    def _reconnect(self, data, addr):
+        m = _RECONNECT_RE.search(data)
+        if m is None:
+            return
+        team, unum = m.group(1).decode(), int(m.group(2))
+        old = next((c for c in self.clients.values() if c.team == team and c.unum == unum), None)
+        if old is None:
+            self._send("(error no_such_team_or_already_have_goalie)", addr)
+            return
+        del self.clients[old.addr]
+        old.addr = addr
+        self.clients[addr] = old
+        self._send(f"(reconnect {old.side} {self.play_mode})", addr)
+
+    def _send(self, text, addr, sock=None):
+        try:
+            (sock or self.sock).sendto(text.encode() if isinstance(text, str) else text, addr)
+        except OSError:
+            pass
+
+    # ---------- trainer (offline coach) ----------
+    def _handle_trainer(self, data, addr):
+        self.total_datagrams += 1
+        if data.startswith(b"(init"):
+            self.trainer = addr
+            self._send("(init ok)", addr, self.tsock)
+            return
+        if addr != self.trainer:
+            self._send("(error illegal_command_form)", addr, self.tsock)
+            return
+        # un datagrama puede llevar varios comandos; se responde a cada uno
+        for part in re.findall(rb"\((?:[^()]|\([^()]*\))*\)", data):
+            self._send(self._trainer_command(part), addr, self.tsock)
+
+    def _trainer_command(self, cmd):
+        sim = self.sim
+        if cmd.startswith(b"(done"):
+            self._trainer_done = True
+            return "(ok done)"
+        if cmd.startswith(b"(look"):
+            return self._look()
+        if cmd.startswith(b"(move"):
+            m = _T_MOVE_BALL_RE.match(cmd)
+            if m:
+                sim.ball[0] = (float(m.group(1)), float(m.group(2)))
+                sim.ball_vel[0] = ((float(m.group(3)), float(m.group(4))) if m.group(3) else 0.0)
+                return "(ok move)"
+            m = _T_MOVE_PLAYER_RE.match(cmd)
+            if m:
+                team, unum = m.group(1).decode(), int(m.group(2))
+                c = next((c for c in self.clients.values() if c.team == team and c.unum == unum), None)
+                if c is None:
+                    return "(error no_such_player)"
+                sim.pos[0, c.slot] = (float(m.group(3)), float(m.group(4)))
+                if m.group(5):
+                    sim.body[0, c.slot] = math.radians(float(m.group(5)))
+                sim.vel[0, c.slot] = ((float(m.group(6)), float(m.group(7))) if m.group(6) else 0.0)
+                return "(ok move)"
+            return "(error illegal_object_form)"
+        if cmd.startswith(b"(change_mode"):
+            m = _T_CHANGE_MODE_RE.match(cmd)
+            if m is None:
+                return "(error illegal_mode)"
+            self._set_play_mode(m.group(1).decode())
+            return "(ok change_mode)"
+        if cmd.startswith(b"(start"):
+            self._set_play_mode("play_on")
+            return "(ok start)"
+        if cmd.startswith(b"(recover"):
+            return "(ok recover)"
+        m = _T_SWITCH_RE.match(cmd)
+        if m:
+            return f"(ok {m.group(1).decode()} {m.group(2).decode()})"
+        return "(error unknown_command)"
+
+    def _set_play_mode(self, mode):
+        self.play_mode = mode
+        for c in self.clients.values():
+            self._send(f"(hear {self.time} referee {mode})", c.addr)
+
+    def _look(self):
+        """(ok look T ((g l) x y) ((g r) x y) ((b) x y vx vy) ((p "EQUIPO" n) x y vx vy cuerpo cuello) ...)"""
+        sim = self.sim
+        bx, by = sim.ball[0]
+        bvx, bvy = sim.ball_vel[0]
+        parts = [f"(ok look {self.time} ((g l) {-FIELD_X_MAX:.1f} 0) ((g r) {FIELD_X_MAX:.1f} 0)",
+                 f"((b) {bx:.4f} {by:.4f} {bvx:.4f} {bvy:.4f})"]
+        for c in sorted(self.clients.values(), key=lambda c: c.slot):
+            px, py = sim.pos[0, c.slot]
+            vx, vy = sim.vel[0, c.slot]
+            body = math.degrees(sim.body[0, c.slot])
+            parts.append(f'((p "{c.team}" {c.unum}) {px:.4f} {py:.4f} {vx:.4f} {vy:.4f} {body:.2f} 0)')
+        return " ".join(parts) + ")"
+
+    def _all_done(self):
+        """synch_mode: todos los jugadores (y el trainer, si hay) han mandado (done) este ciclo."""
+        if not self.clients and self.trainer is None:
+            return False
+        return (all(c.done for c in self.clients.values())
+                and (self.trainer is None or self._trainer_done))
+
+    # ---------- ciclo ----------
+    def _step(self, t):
+        # cerrar el ciclo: estadísticas de los comandos recibidos
+        for c in self.clients.values():
+            c.cycles += 1
+            if c.first_cmd_t is not None:
+                c.latencies.append(c.first_cmd_t - self._cycle_sent_t)
+            c.first_cmd_t = None
+            c.body_this_cycle = 0
+            c.done = False
+        self._trainer_done = False
+        touched = self.sim.step_commands(self._turn, self._dash, self._kick_pow, self._kick_dir)
+        self._turn[:] = 0.0
+        self._dash[:] = 0.0
+        self._kick_pow[:] = 0.0
+        self.time += 1
+        if self.play_mode == "play_on":
+            self._referee(touched[0])
+        if self.play_mode == "before_kick_off" and self.time >= self.kickoff_cycle:
+            self._set_play_mode("play_on")
+        self._cycle_sent_t = time.perf_counter()
+        self._send_percepts()
+        if self.synch:
+            for c in self.clients.values():
+                self._send("(think)", c.addr)
+
+    def _referee(self, touched):
+        """Toques, territorio y goles (el balón cruza la línea de gol entre los palos)."""
+        self.touches["l"] += int(touched[:11].sum())
+        self.touches["r"] += int(touched[11:].sum())
+        bx, by = self.sim.ball[0]
+        self._ball_x_sum += bx
+        self._play_cycles += 1
+        if abs(bx) >= FIELD_X_MAX - 1e-6 and abs(by) < GOAL_HALF_WIDTH:
+            side = "l" if bx > 0 else "r"
+            self.goals[side] += 1
+            self.sim.ball[0] = 0.0
+            self.sim.ball_vel[0] = 0.0
+            for c in self.clients.values():
+                self._send(f"(hear {self.time} referee goal_{side}_{self.goals[side]})", c.addr)
+                self._send(f"(hear {self.time} referee play_on)", c.addr)
+
+    def _send_percepts(self):
+        sim = self.sim
+        bx, by = sim.ball[0]
+        see = self.time % self.see_every == 0
+        for c in self.clients.values():
+            px, py = sim.pos[0, c.slot]
+            tail = f"(mypos {px:.3f} {py:.3f}) (ball {bx:.3f} {by:.3f})"
+            self._send(f"(sense_body {self.time} (view_mode high normal) (stamina 8000 1 130600) "
+                       f"(speed 0 0) (head_angle 0) {tail})", c.addr)
+            if see:
+                self._send(self._see(c, tail), c.addr)
+
+    def _see(self, c, tail):
+        sim = self.sim
+        p = sim.pos[0, c.slot]
+        body = math.degrees(sim.body[0, c.slot])
+        parts = [f"(see {self.time}"]
+        d = sim.ball[0] - p
+        parts.append(f"((b) {math.hypot(d[0], d[1]):.1f} {_rel_dir(d, body):.0f})")
+        for o in self.clients.values():
+            if o is c:
+                continue
+            d = sim.pos[0, o.slot] - p
+            parts.append(f'((p "{o.team}" {o.unum}) {math.hypot(d[0], d[1]):.1f} {_rel_dir(d, body):.0f})')
+        parts.append(tail + ")")
+        return " ".join(parts)
+
+    def serve(self, cycles=None, duration=None):
+        self._running = True
+        t0 = time.perf_counter()
+        next_tick = t0 + self.cycle_len
+        end_cycle = None if cycles is None else self.time + int(cycles)
+        while self._running:
+            now = time.perf_counter()
+            if duration is not None and now - t0 >= duration:
+                break
+            r, _, _ = select.select([self.sock, self.tsock], [], [], max(0.0, next_tick - now))
+            for sock in r:
+                try:
+                    while True:
+                        data, addr = sock.recvfrom(8192)
+                        if sock is self.tsock:
+                            self._handle_trainer(data, addr)
+                        else:
+                            self._handle(data, addr, time.perf_counter())
+                except (BlockingIOError, InterruptedError):
+                    pass
+            now = time.perf_counter()
+            # synch_mode: no se espera al tick si ya han terminado todos
+            if now >= next_tick or (self.synch and self._all_done()):
+                self._step(now)
+                # si vamos atrasados no se acumulan ciclos de golpe
+                next_tick = max(next_tick + self.cycle_len, now)
+                if end_cycle is not None and self.time >= end_cycle:
+                    break
+        self._running = False
+
+    def stop(self):
+        self._running = False
+
+    def close(self):
+        self.sock.close()
+        self.tsock.close()
+
+    # ---------- estadísticas ----------
+    def stats(self, side=None):
+        """
+        Resumen de comandos por ciclo, conflictos y latencia de decisión (ms),
+        de todos los jugadores o sólo los de un lado ("l" / "r"), más los
+        contadores del partido.
+        """
+        clients = [c for c in self.clients.values() if side is None or c.side == side]
+        cycles = sum(c.cycles for c in clients)
+        lat = np.array([x for c in clients for x in c.latencies]) * 1000.0
+        out = {
+            "players": len(clients),
+            "server_cycles": self.time,
+            "commands": sum(c.commands for c in clients),
+            "datagrams": self.total_datagrams,
+            "commands_per_cycle": sum(c.commands for c in clients) / cycles if cycles else 0.0,
+            "conflict_cycles": sum(c.conflicts for c in clients),
+            "active_cycle_ratio": lat.size / cycles if cycles else 0.0,
+        }
+        if lat.size:
+            out["decision_ms_p50"] = float(np.percentile(lat, 50))
+            out["decision_ms_p99"] = float(np.percentile(lat, 99))
+        out.update({
+            "goals_l": self.goals["l"], "goals_r": self.goals["r"],
+            "touches_l": self.touches["l"], "touches_r": self.touches["r"],
+            "ball_x_mean": self._ball_x_sum / self._play_cycles if self._play_cycles else 0.0,
+        })
+        return out
+
+
+def _rel_dir(d, body_deg):
+    a = math.degrees(math.atan2(d[1], d[0])) - body_deg
+    return (a + 180.0) % 360.0 - 180.0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Stand-in de rcssserver para pruebas y benchmarks")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=6000)
+    ap.add_argument("--cycle-ms", type=float, default=100.0,
+                    help="duración del ciclo (menos de 100 = más rápido que tiempo real)")
+    ap.add_argument("--cycles", type=int, default=None, help="parar tras N ciclos")
+    ap.add_argument("--kickoff", type=int, default=KICKOFF_CYCLE, help="ciclo del play_on")
+    ap.add_argument("--dribble", action="store_true", help="el jugador que llega al balón lo empuja")
+    ap.add_argument("--trainer-port", type=int, default=None, help="puerto del trainer (por defecto port + 1)")
+    ap.add_argument("--synch", action="store_true",
+                    help="synch_mode: el ciclo avanza cuando todos mandan (done) (cycle-ms = espera máxima)")
+    args = ap.parse_args()
+
+    srv = FakeServer(args.host, args.port, args.cycle_ms / 1000.0, args.kickoff, dribble=args.dribble,
+                     trainer_port=args.trainer_port, synch=args.synch)
+    print(f"[INFO] fake_server en {args.host}:{srv.port} (trainer {srv.trainer_port}), "
+          f"ciclo {args.cycle_ms:.0f}ms{' synch' if srv.synch else ''}. Ctrl-C para parar.")
+    try:
+        srv.serve(cycles=args.cycles)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.close()
+    print("[INFO]", " ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                             for k, v in srv.stats().items()))
+
+
+if __name__ == "__main__":
+    main()
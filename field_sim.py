@@ -0,0 +1,254 @@
+# field_sim.py
+# Simulador cinemático headless (sin rcssserver) en NumPy.
+# Simula n campos independientes con k jugadores cada uno, todo como arrays,
+# para que un paso de todos los campos sea una sola llamada vectorizada.
+# El modelo imita lo básico de rcssserver: dash con aceleración y decay,
+# turn con inercia, velocidad máxima, balón con decay; en vez de kick el
+# jugador que llega al balón lo empuja en la dirección de su cuerpo.
+import numpy as np
+
+FIELD_X_MIN, FIELD_X_MAX = -52.5, 52.5
+FIELD_Y_MIN, FIELD_Y_MAX = -34.0, 34.0
+
+# parámetros (server.conf por defecto, simplificados)
+PLAYER_DECAY = 0.4
+PLAYER_SPEED_MAX = 1.05
+DASH_POWER_RATE = 0.006
+INERTIA_MOMENT = 5.0
+BALL_DECAY = 0.94
+BALL_SPEED_MAX = 3.0
+KICKABLE_DIST = 1.085  # player_size + ball_size + kickable_margin
+KICK_POWER_RATE = 0.027
+DRIBBLE_SPEED = 1.2
+
+OBS_DIM = 7
+OBS_LOW = np.array([-100, -100, -100, -100, -10, -10, -1], dtype=np.float32)
+OBS_HIGH = np.array([100, 100, 100, 100, 10, 10, 1], dtype=np.float32)
+N_ACTIONS = 5
+
+# acción -> (modo de giro, ángulo relativo en grados, potencia de dash)
+# modo 0: sin giro, 1: giro relativo, 2: encarar balón, 3: encarar home.
+# Es el mismo mapeo que usan los agentes (map_action_to_commands): los
+# "(move x y)" hacia balón/home se modelan como encarar el objetivo y
+# correr, que es lo que significan en juego (move sólo vale antes del saque).
+ACTION_TURN_MODE = np.array([2, 0, 1, 1, 3], dtype=np.int8)
+ACTION_TURN_DEG = np.array([0.0, 0.0, -30.0, 30.0, 0.0])
+ACTION_DASH = np.array([60.0, 75.0, 40.0, 40.0, 55.0])
+
+# recompensa
+REWARD_APPROACH = 0.1     # por metro ganado hacia el balón
+REWARD_TOUCH = 1.0        # por llegar a distancia de control
+PENALTY_HOME = 0.01       # por metro fuera del radio de home, por paso
+PENALTY_OUT = 1.0         # por salir del campo (termina el episodio)
+HOME_RADIUS = 25.0
+
+# rol del jugador (política de equipo, train_rl --team): la obs lleva además
+# la home normalizada y el tipo de rol de la tabla "role" de conf_file en one-hot
+ROLE_TYPES = ("Goalie", "SideBack", "CenterBack", "Midfielder", "Forward", "CenterForward")
+ROLE_DIM = 2 + len(ROLE_TYPES)
+TEAM_OBS_DIM = OBS_DIM + ROLE_DIM
+TEAM_OBS_LOW = np.r_[OBS_LOW, np.full(ROLE_DIM, -1.0)].astype(np.float32)
+TEAM_OBS_HIGH = np.r_[OBS_HIGH, np.ones(ROLE_DIM)].astype(np.float32)
+
+
+def build_obs(px, py, ballx, bally, home_x, home_y):
+    """
+    Observación de un jugador: [px, py, ballx, bally, dx, dy, dist_home/60],
+    recortada a los límites del observation_space (dx/dy a ±10 m).
+    """
+    dx = ballx - px; dy = bally - py
+    dist_home = np.hypot(px - home_x, py - home_y)
+    obs = np.array([px, py, ballx, bally, dx, dy, dist_home / 60.0], dtype=np.float32)
+    return np.clip(obs, OBS_LOW, OBS_HIGH, out=obs)
+
+
+def role_features(names, homes):
+    """
+    (k, ROLE_DIM) float32 para k jugadores: [home_x/52.5, home_y/34, one-hot
+    del tipo de rol]. Un nombre que no está en ROLE_TYPES deja el one-hot a 0.
+    """
+    homes = np.asarray(homes, dtype=np.float64).reshape(-1, 2)
+    feat = np.zeros((len(homes), ROLE_DIM), dtype=np.float32)
+    feat[:, 0] = homes[:, 0] / FIELD_X_MAX
+    feat[:, 1] = homes[:, 1] / FIELD_Y_MAX
+    for i, name in enumerate(names):
+        if name in ROLE_TYPES:
+            feat[i, 2 + ROLE_TYPES.index(name)] = 1.0
+    return np.clip(feat, -1.0, 1.0, out=feat)
+
+
+def build_team_obs(obs, role_feat):
+    """obs de build_obs (7,) seguida de los rasgos de rol (ROLE_DIM,) -> (TEAM_OBS_DIM,)."""
+    return np.concatenate([obs, role_feat]).astype(np.float32, copy=False)
+
+
+class FieldSim:
+    """
+    Estado (float64):
+      pos, vel, home: (n, k, 2)   body: (n, k) en radianes
+      ball, ball_vel: (n, 2)
+    """
+
+    def __init__(self, n_fields=1, n_players=1, home=None, seed=None, random_ball=True,
+                 dribble=True):
+        self.n = int(n_fields)
+        self.k = int(n_players)
+        self.rng = np.random.default_rng(seed)
+        self.random_ball = random_ball
+        # dribble: el jugador que llega al balón lo empuja solo (entrenamiento);
+        # sin dribble el balón sólo se mueve con kick (step_commands)
+        self.dribble = dribble
+
+        self.pos = np.zeros((self.n, self.k, 2))
+        self.vel = np.zeros((self.n, self.k, 2))
+        self.body = np.zeros((self.n, self.k))
+        self.home = np.zeros((self.n, self.k, 2))
+        self.ball = np.zeros((self.n, 2))
+        self.ball_vel = np.zeros((self.n, 2))
+        if home is not None:
+            self.set_home(home)
+
+        self._lo = np.array([FIELD_X_MIN, FIELD_Y_MIN])
+        self._hi = np.array([FIELD_X_MAX, FIELD_Y_MAX])
+        self._obs = np.zeros((self.n, self.k, OBS_DIM), dtype=np.float32)
+
+    def set_home(self, home):
+        """home: (2,), (k, 2) o (n, k, 2)."""
+        self.home[...] = np.broadcast_to(np.asarray(home, dtype=np.float64), self.home.shape)
+
+    def reset(self, mask=None):
+        """Reinicia los campos indicados (máscara bool (n,) o todos)."""
+        idx = np.arange(self.n) if mask is None else np.flatnonzero(mask)
+        if idx.size == 0:
+            return
+        self.pos[idx] = self.home[idx]
+        self.vel[idx] = 0.0
+        # mirando hacia el campo rival, como tras el move inicial
+        self.body[idx] = 0.0
+        if self.random_ball:
+            self.ball[idx] = self.rng.uniform(self._lo * 0.8, self._hi * 0.8, size=(idx.size, 2))
+        else:
+            self.ball[idx] = 0.0
+        self.ball_vel[idx] = 0.0
+
+    def reset_players(self, mask):
+        """Devuelve a su home, parados, los jugadores de la máscara (n, k) sin tocar el balón."""
+        self.pos[mask] = self.home[mask]
+        self.vel[mask] = 0.0
+        self.body[mask] = 0.0
+
+    def step(self, actions):
+        """
+        Aplica una acción discreta (0..4) por jugador, actions: (n, k) int.
+        Devuelve la máscara (n, k) de jugadores que controlan el balón.
+        """
+        actions = np.asarray(actions).reshape(self.n, self.k)
+        mode = ACTION_TURN_MODE[actions]
+        pos, vel = self.pos, self.vel
+
+        # ----- turn -----
+        speed = np.hypot(vel[..., 0], vel[..., 1])
+        rel = np.radians(ACTION_TURN_DEG[actions]) / (1.0 + INERTIA_MOMENT * speed)
+        body = np.where(mode == 1, self.body + rel, self.body)
+        to_ball = self.ball[:, None, :] - pos
+        body = np.where(mode == 2, np.arctan2(to_ball[..., 1], to_ball[..., 0]), body)
+        to_home = self.home - pos
+        body = np.where(mode == 3, np.arctan2(to_home[..., 1], to_home[..., 0]), body)
+        self.body = (body + np.pi) % (2 * np.pi) - np.pi
+        return self._advance(ACTION_DASH[actions])
+
+    def step_commands(self, turn_deg, dash_power, kick_power=None, kick_dir=None):
+        """
+        Paso con comandos continuos como los de rcssserver, arrays (n, k):
+        turn en grados (con inercia), potencia de dash y, opcionalmente,
+        kick (potencia, dirección relativa al cuerpo en grados) para los
+        jugadores que tienen el balón a distancia de control.
+        Devuelve la máscara (n, k) de jugadores con el balón a su alcance.
+        """
+        vel = self.vel
+        speed = np.hypot(vel[..., 0], vel[..., 1])
+        rel = np.radians(turn_deg) / (1.0 + INERTIA_MOMENT * speed)
+        self.body = (self.body + rel + np.pi) % (2 * np.pi) - np.pi
+        if kick_power is not None:
+            d = self.ball[:, None, :] - self.pos
+            can = (np.hypot(d[..., 0], d[..., 1]) < KICKABLE_DIST) & (kick_power > 0)
+            if can.any():
+                f, p = np.nonzero(can)
+                ang = self.body[f, p] + np.radians(kick_dir[f, p])
+                acc = KICK_POWER_RATE * kick_power[f, p]
+                np.add.at(self.ball_vel[:, 0], f, acc * np.cos(ang))
+                np.add.at(self.ball_vel[:, 1], f, acc * np.sin(ang))
+        return self._advance(dash_power)
+
+    def _advance(self, dash_power):
+        """dash + movimiento de jugadores y balón; devuelve la máscara de contacto."""
+        pos, vel = self.pos, self.vel
+
+        # ----- dash -----
+        accel = dash_power * DASH_POWER_RATE
+        vel[..., 0] += accel * np.cos(self.body)
+        vel[..., 1] += accel * np.sin(self.body)
+        speed = np.hypot(vel[..., 0], vel[..., 1])
+        scale = np.minimum(1.0, PLAYER_SPEED_MAX / np.maximum(speed, 1e-9))
+        vel *= scale[..., None]
+        pos += vel
+        vel *= PLAYER_DECAY
+
+        # ----- balón -----
+        d = self.ball[:, None, :] - pos
+        dist = np.hypot(d[..., 0], d[..., 1])
+        touched = dist < KICKABLE_DIST
+        any_touch = touched.any(axis=1)
+        if self.dribble and any_touch.any():
+            # el más cercano de cada campo empuja el balón hacia donde mira
+            who = np.argmin(dist, axis=1)
+            f = np.flatnonzero(any_touch)
+            b = self.body[f, who[f]]
+            self.ball_vel[f, 0] = DRIBBLE_SPEED * np.cos(b)
+            self.ball_vel[f, 1] = DRIBBLE_SPEED * np.sin(b)
+        bspeed = np.hypot(self.ball_vel[:, 0], self.ball_vel[:, 1])
+        self.ball_vel *= np.minimum(1.0, BALL_SPEED_MAX / np.maximum(bspeed, 1e-9))[:, None]
+        self.ball += self.ball_vel
+        self.ball_vel *= BALL_DECAY
+        # el balón rebota en los bordes (sin saques de banda)
+        out_lo = self.ball < self._lo
+        out_hi = self.ball > self._hi
+        self.ball = np.clip(self.ball, self._lo, self._hi)
+        self.ball_vel[out_lo | out_hi] *= -0.5
+        return touched
+
+    def out_of_field(self):
+        """(n, k) bool: jugadores fuera de los límites del campo."""
+        p = self.pos
+        return ((p[..., 0] < FIELD_X_MIN) | (p[..., 0] > FIELD_X_MAX) |
+                (p[..., 1] < FIELD_Y_MIN) | (p[..., 1] > FIELD_Y_MAX))
+
+    def ball_dist(self):
+        d = self.ball[:, None, :] - self.pos
+        return np.hypot(d[..., 0], d[..., 1])
+
+    def observe(self):
+        """
+        (n, k, 7) float32, igual que el obs de los agentes (ver build_obs).
+        El array se reutiliza entre llamadas.
+        """
+        obs = self._obs
+        obs[..., 0:2] = self.pos
+        obs[..., 2:4] = self.ball[:, None, :]
+        obs[..., 4:6] = self.ball[:, None, :] - self.pos
+        dh = self.pos - self.home
+        obs[..., 6] = np.hypot(dh[..., 0], dh[..., 1]) / 60.0
+        np.clip(obs, OBS_LOW, OBS_HIGH, out=obs)
+        return obs
+
+
+def compute_reward(sim, prev_ball_dist, touched, out):
+    """Recompensa (n, k): acercarse al balón, controlarlo, no alejarse de home."""
+    dist = sim.ball_dist()
+    dh = sim.pos - sim.home
+    home_excess = np.maximum(0.0, np.hypot(dh[..., 0], dh[..., 1]) - HOME_RADIUS)
+    reward = (REWARD_APPROACH * (prev_ball_dist - dist)
+              + REWARD_TOUCH * touched
+              - PENALTY_HOME * home_excess
+              - PENALTY_OUT * out)
+    return reward.astype(np.float32), dist
@@ -0,0 +1,195 @@
+# formation.py
+# Formación interpolada a partir de muestras estilo HELIOS (conf_file.conf):
+# cada muestra del array "data" da la posición de los 11 jugadores para una
+# posición del balón; para un balón cualquiera se interpola entre muestras.
+#
+# Con "method": "DelaunayTriangulation" se triangulan las posiciones del
+# balón de las muestras (scipy.spatial.Delaunay, opcional) y se interpola
+# con coordenadas baricéntricas dentro del triángulo que contiene al balón;
+# sin scipy se usa ponderación por inversa de la distancia (exacta en las
+# muestras). Con "Static" (o una sola muestra) vale siempre data[0].
+#
+# Todo se precalcula sobre una rejilla densa de posiciones del balón:
+# lookup(bx, by) es indexar una fila (11, 2) del array, O(1). from_conf
+# guarda la rejilla junto al conf (conf_file.formation.npy) y en los
+# arranques siguientes la mapea con np.load(mmap_mode="r"): ni se importa
+# scipy (~400 ms) ni se interpola; sólo se reconstruye si el conf es más
+# nuevo que el .npy. Las coordenadas son las del equipo que ataca hacia +x
+# (lado l).
+import importlib.util
+import json
+import os
+
+import numpy as np
+
+# scipy es opcional y caro de importar: sólo se importa al construir la rejilla
+HAVE_SCIPY = importlib.util.find_spec("scipy") is not None
+
+FIELD_X_MIN, FIELD_X_MAX = -52.5, 52.5
+FIELD_Y_MIN, FIELD_Y_MAX = -34.0, 34.0
+GRID_STEP = 0.5     # m entre puntos de la rejilla (~30k puntos, ~2.6 MB en float32)
+IDW_POWER = 2.0
+
+
+def _barycentric(ball, pos, pts):
+    """Interpolación baricéntrica sobre la triangulación de 'ball' en los puntos pts (k, 2)."""
+    from scipy.spatial import Delaunay
+
+    tri = Delaunay(ball)
+    s = tri.find_simplex(pts)
+    out = np.empty((len(pts),) + pos.shape[1:])
+    inside = s >= 0
+    if inside.any():
+        si = s[inside]
+        T = tri.transform[si]
+        b = np.einsum("ijk,ik->ij", T[:, :2], pts[inside] - T[:, 2])
+        bary = np.column_stack([b, 1.0 - b.sum(axis=1)])
+        out[inside] = np.einsum("ij,ijnk->ink", bary, pos[tri.simplices[si]])
+    if not inside.all():
+        # fuera de la envolvente de las muestras: la muestra más cercana
+        d = np.linalg.norm(pts[~inside, None, :] - ball[None], axis=2)
+        out[~inside] = pos[np.argmin(d, axis=1)]
+    return out
+
+
+def _idw(ball, pos, pts, power=IDW_POWER):
+    """Inversa de la distancia: exacta en las muestras, suave entre ellas."""
+    d = np.linalg.norm(pts[:, None, :] - ball[None], axis=2)
+    exact = d < 1e-9
+    w = 1.0 / np.maximum(d, 1e-9) ** power
+    w[exact.any(axis=1)] = exact[exact.any(axis=1)]
+    w /= w.sum(axis=1, keepdims=True)
+    return np.einsum("ij,jnk->ink", w, pos)
+
+
+def grid_path(conf_file):
+    """Ruta del .npy con la rejilla precalculada de conf_file."""
+    return os.path.splitext(conf_file)[0] + ".formation.npy"
+
+
+def _load_grid(path, conf_file, shape):
+    """Rejilla mapeada (sólo lectura) de path, o None si falta, es vieja o no encaja."""
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(conf_file):
+            return None
+        grid = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if grid.shape != shape or grid.dtype != np.float32:
+        return None
+    return grid.view(np.ndarray)
+
+
+def _save_grid(path, grid):
+    # .tmp + rename: otro proceso que arranque a la vez no lee un .npy a medias
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            np.save(f, grid)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[WARN] No se pudo guardar la rejilla de formación en {path}: {e}")
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def load_roles(conf_file, num_players=11):
+    """
+    (homes (n, 2), nombres de rol) de conf_file: la home es la posición de
+    la muestra 0 (saque, como load_positions de team_runtime) y el nombre
+    el de la tabla "role" ("Unknown" si el dorsal no está en la tabla).
+    """
+    with open(conf_file, "r") as f:
+        conf = json.load(f)
+    names = {int(r["number"]): r.get("name", "Unknown") for r in conf.get("role", [])}
+    sample = conf["data"][0]
+    homes = []
+    for i in range(1, num_players + 1):
+        entry = sample.get(str(i))
+        if entry is None:
+            raise KeyError(f"No hay posición para '{i}' en {conf_file}")
+        homes.append((float(entry["x"]), float(entry["y"])))
+    return np.array(homes), [names.get(i, "Unknown") for i in range(1, num_players + 1)]
+
+
+class Formation:
+    """
+    ball: (m, 2) posiciones del balón de las muestras; pos: (m, n, 2)
+    posiciones de los n jugadores en cada muestra (fila j = dorsal j + 1).
+    """
+
+    def __init__(self, ball, pos, method="DelaunayTriangulation", step=GRID_STEP, grid=None):
+        self.ball = np.asarray(ball, dtype=np.float64).reshape(-1, 2)
+        self.pos = np.asarray(pos, dtype=np.float64)
+        self.n_players = self.pos.shape[1]
+        if method == "Static" or len(self.ball) == 1:
+            self.method = "Static"
+        elif HAVE_SCIPY and len(self.ball) >= 3:
+            self.method = "DelaunayTriangulation"
+        else:
+            self.method = "IDW"
+        self.step = float(step)
+        self.xs = np.arange(FIELD_X_MIN, FIELD_X_MAX + step / 2, step)
+        self.ys = np.arange(FIELD_Y_MIN, FIELD_Y_MAX + step / 2, step)
+        if grid is not None:
+            self.grid = grid
+            return
+        gx, gy = np.meshgrid(self.xs, self.ys, indexing="ij")
+        pts = np.column_stack([gx.ravel(), gy.ravel()])
+        self.grid = self.interpolate(pts).astype(np.float32).reshape(
+            len(self.xs), len(self.ys), self.n_players, 2)
+
+    @classmethod
+    def from_conf(cls, conf_file, num_players=11, step=GRID_STEP, cache=True):
+        """
+        Formación de conf_file. Con cache, la rejilla se lee de (o se
+        guarda en) grid_path(conf_file).
+        """
+        with open(conf_file, "r") as f:
+            conf = json.load(f)
+        ball, pos = [], []
+        for sample in conf["data"]:
+            ball.append((float(sample["ball"]["x"]), float(sample["ball"]["y"])))
+            row = []
+            for i in range(1, num_players + 1):
+                entry = sample.get(str(i))
+                if entry is None:
+                    raise KeyError(f"No hay posición para '{i}' en la muestra {sample.get('index')} de {conf_file}")
+                row.append((float(entry["x"]), float(entry["y"])))
+            pos.append(row)
+        method = conf.get("method", "Static")
+        if not cache:
+            return cls(ball, pos, method, step)
+        path = grid_path(conf_file)
+        n_x = len(np.arange(FIELD_X_MIN, FIELD_X_MAX + step / 2, step))
+        n_y = len(np.arange(FIELD_Y_MIN, FIELD_Y_MAX + step / 2, step))
+        grid = _load_grid(path, conf_file, (n_x, n_y, num_players, 2))
+        formation = cls(ball, pos, method, step, grid=grid)
+        if grid is None:
+            _save_grid(path, formation.grid)
+        return formation
+
+    def interpolate(self, pts):
+        """Posiciones exactas (k, n, 2) para los balones pts (k, 2), sin rejilla."""
+        pts = np.atleast_2d(np.asarray(pts, dtype=np.float64))
+        if self.method == "Static":
+            return np.broadcast_to(self.pos[0], (len(pts),) + self.pos.shape[1:]).copy()
+        if self.method == "DelaunayTriangulation":
+            return _barycentric(self.ball, self.pos, pts)
+        return _idw(self.ball, self.pos, pts)
+
+    def lookup(self, bx, by):
+        """Las n posiciones objetivo (n, 2) para el balón en (bx, by): una fila de la rejilla."""
+        ix = int((min(max(bx, FIELD_X_MIN), FIELD_X_MAX) - FIELD_X_MIN) / self.step + 0.5)
+        iy = int((min(max(by, FIELD_Y_MIN), FIELD_Y_MAX) - FIELD_Y_MIN) / self.step + 0.5)
+        return self.grid[ix, iy]
+
+    def target(self, unum, bx, by, side="l"):
+        """Objetivo (x, y) del dorsal unum en coordenadas del jugador (refleja x en el lado r)."""
+        if side == "r":
+            x, y = self.lookup(-bx, by)[unum - 1]
+            return -float(x), float(y)
+        x, y = self.lookup(bx, by)[unum - 1]
+        return float(x), float(y)
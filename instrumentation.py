@@ -0,0 +1,192 @@
+# instrumentation.py
+# Latencias del bucle de cada jugador por etapa (recepción, parseo, retraso
+# de la decisión, decisión, inferencia, envío) con perf_counter_ns, en
+# histogramas de tamaño fijo preasignados, más contadores (ciclos perdidos,
+# timeouts, mensajes no reconocidos por el parser, descartes del buzón).
+#
+# Desactivado por defecto: Player.metrics es None y el bucle sólo paga un
+# "is not None". Se activa con la variable de entorno RCSS_METRICS:
+#   RCSS_METRICS=metrics.prom    -> fichero de texto Prometheus (textfile collector)
+#   RCSS_METRICS=metrics.jsonl   -> una línea JSON por snapshot
+# ({pid} en la ruta se sustituye por el pid, útil con team_supervisor).
+# RCSS_METRICS_EVERY: segundos entre snapshots (por defecto 5).
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+METRICS_PATH = os.environ.get("RCSS_METRICS") or None
+METRICS_EVERY = float(os.environ.get("RCSS_METRICS_EVERY", "5"))
+
+RECV, PARSE, LAG, DECIDE, INFER, SEND = range(6)
+STAGES = ("recv", "parse", "lag", "decide", "infer", "send")
+
+# buckets log2 con 4 sub-buckets por potencia de 2 (error < 12.5%):
+# índice = (bit_length << 2) | 2 bits tras el bit alto; hasta ~2^40 ns
+MAX_BITS = 41
+N_BUCKETS = (MAX_BITS + 1) << 2
+
+
+def _bucket_mid():
+    mid = np.zeros(N_BUCKETS)
+    mid[:8] = np.arange(8)
+    for idx in range(16, N_BUCKETS):
+        bl, sub = idx >> 2, idx & 3
+        lo = (4 + sub) << (bl - 3)
+        mid[idx] = lo + (1 << (bl - 3)) / 2.0
+    return mid
+
+
+BUCKET_MID_NS = _bucket_mid()
+
+
+class PlayerMetrics:
+    """Histogramas por etapa de un jugador; counters() da los contadores del jugador."""
+
+    __slots__ = ("team", "player", "hist", "counters")
+
+    def __init__(self, team, player, counters=None):
+        self.team = team
+        self.player = player
+        self.hist = [[0] * N_BUCKETS for _ in STAGES]
+        self.counters = counters
+
+    def record(self, stage, ns):
+        if ns < 8:
+            idx = ns if ns > 0 else 0
+        else:
+            bl = ns.bit_length()
+            idx = (bl << 2) | ((ns >> (bl - 3)) & 3)
+            if idx >= N_BUCKETS:
+                idx = N_BUCKETS - 1
+        self.hist[stage][idx] += 1
+
+    def quantiles(self, stage, qs=(0.5, 0.99)):
+        """(count, [valor en µs para cada q]) o (0, None) si no hay muestras."""
+        h = np.asarray(self.hist[stage], dtype=np.int64)
+        n = int(h.sum())
+        if n == 0:
+            return 0, None
+        cum = np.cumsum(h)
+        idx = np.searchsorted(cum, [q * n for q in qs])
+        return n, [float(BUCKET_MID_NS[i]) / 1000.0 for i in idx]
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Span:
+    __slots__ = ("m", "stage", "t0")
+
+    def __init__(self, m, stage):
+        self.m = m
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.m.record(self.stage, time.perf_counter_ns() - self.t0)
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(metrics, stage):
+    """with span(player.metrics, INFER): ...  (no hace nada si metrics es None)."""
+    return _NULL_SPAN if metrics is None else _Span(metrics, stage)
+
+
+# ---------- registro y export ----------
+REGISTRY = []
+
+
+def new_player_metrics(team, player, counters=None):
+    """PlayerMetrics registrado para el export, o None si la instrumentación está apagada."""
+    if METRICS_PATH is None:
+        return None
+    m = PlayerMetrics(team, player, counters)
+    REGISTRY.append(m)
+    return m
+
+
+def snapshot(registry=None):
+    """Lista de dicts por jugador: etapas (count, p50/p99 en µs) y contadores."""
+    out = []
+    for m in (REGISTRY if registry is None else registry):
+        stages = {}
+        for s, name in enumerate(STAGES):
+            n, q = m.quantiles(s)
+            if n:
+                stages[name] = {"count": n, "p50_us": round(q[0], 2), "p99_us": round(q[1], 2)}
+        out.append({"team": m.team, "player": m.player, "stages": stages,
+                    "counters": m.counters() if m.counters is not None else {}})
+    return out
+
+
+def format_prometheus(snap):
+    lines = ["# TYPE rcss_stage_latency_microseconds summary"]
+    for p in snap:
+        labels = f'team="{p["team"]}",player="{p["player"]}"'
+        for stage, v in p["stages"].items():
+            sl = f'{labels},stage="{stage}"'
+            lines.append(f'rcss_stage_latency_microseconds{{{sl},quantile="0.5"}} {v["p50_us"]}')
+            lines.append(f'rcss_stage_latency_microseconds{{{sl},quantile="0.99"}} {v["p99_us"]}')
+            lines.append(f"rcss_stage_latency_microseconds_count{{{sl}}} {v['count']}")
+    names = sorted({k for p in snap for k in p["counters"]})
+    for name in names:
+        lines.append(f"# TYPE rcss_{name}_total counter")
+        for p in snap:
+            if name in p["counters"]:
+                lines.append(f'rcss_{name}_total{{team="{p["team"]}",player="{p["player"]}"}} '
+                             f'{p["counters"][name]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot(path=None):
+    path = path or METRICS_PATH
+    if path is None or not REGISTRY:
+        return
+    path = path.replace("{pid}", str(os.getpid()))
+    snap = snapshot()
+    if path.endswith(".jsonl"):
+        with open(path, "a") as f:
+            f.write(json.dumps({"time": time.time(), "pid": os.getpid(), "players": snap}) + "\n")
+    else:
+        # escritura atómica: el collector nunca ve un fichero a medias
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(format_prometheus(snap))
+        os.replace(tmp, path)
+
+
+_exporter = None
+
+
+def start_exporter():
+    """Tarea que vuelca snapshots cada METRICS_EVERY s (una por proceso)."""
+    global _exporter
+    if METRICS_PATH is None or (_exporter is not None and not _exporter.done()):
+        return None
+
+    async def _run():
+        try:
+            while True:
+                await asyncio.sleep(METRICS_EVERY)
+                write_snapshot()
+        finally:
+            write_snapshot()
+
+    _exporter = asyncio.get_running_loop().create_task(_run())
+    return _exporter
@@ -0,0 +1,209 @@
+# match_recorder.py
+# Grabación compacta de partidos: un registro binario de ancho fijo por
+# decisión de cada jugador (ciclo, jugador, obs de 7 floats como los de los
+# agentes RL, acción y bytes de los comandos enviados). obs es la que usó la
+# estrategia (posiciones estimadas, est_*); raw guarda además las posiciones
+# observadas sin filtrar (px, py, ballx, bally) para evaluar el estimador.
+#
+# Escritura: el bucle del jugador sólo copia el registro en un ring buffer
+# preasignado; un hilo escritor vuelca los tramos pendientes al fichero en
+# bloque. Un productor (el event loop) y un consumidor (el hilo): head lo
+# mueve sólo el productor y tail sólo el escritor, así que no hace falta
+# lock. Si el buffer se llena el registro se descarta y se cuenta (nunca se
+# bloquea el bucle).
+#
+# Lectura: los ficheros se abren con np.memmap y se recorren por lotes de
+# registros NumPy, de fichero en fichero, sin cargar nada entero en RAM.
+#
+# Se activa con RCSS_RECORD=directorio (un fichero por proceso).
+#   python match_recorder.py DIR_O_FICHERO...   -> resumen de los registros
+import argparse
+import glob
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from field_sim import OBS_DIM
+
+RECORD_PATH = os.environ.get("RCSS_RECORD") or None
+
+MAGIC = b"RCSSREC2"               # v2: obs estimada + raw (v1 guardaba la obs cruda en obs)
+HEADER = struct.Struct("<8sII")   # magic, tamaño de registro, dimensión de obs
+CMD_BYTES = 51                    # comandos del ciclo (truncados); el registro ocupa 112 bytes
+RAW_DIM = 4                       # px, py, ballx, bally sin filtrar
+
+RECORD_DTYPE = np.dtype([
+    ("t", np.float64),            # time.monotonic() de la decisión
+    ("obs", np.float32, (OBS_DIM,)),  # obs con la que decidió la estrategia
+    ("raw", np.float32, (RAW_DIM,)),  # observación cruda (sin filtro)
+    ("cycle", np.int32),          # ciclo local del jugador
+    ("action", np.int16),         # acción discreta de la política (-1 = sin política)
+    ("unum", np.int16),
+    ("side", "S1"),               # b"l" / b"r"
+    ("cmd", f"S{CMD_BYTES}"),
+])
+assert RECORD_DTYPE.itemsize == 112
+
+RING_SIZE = 1 << 14       # registros en memoria (~1.8 MB)
+FLUSH_EVERY = 0.5         # s entre volcados del hilo escritor
+EXT = ".rec"
+
+
+class MatchRecorder:
+    """
+    Grabador de un proceso: append() desde el bucle de los jugadores,
+    close() al terminar (vuelca lo pendiente y cierra el fichero).
+    """
+
+    def __init__(self, path, ring_size=RING_SIZE, flush_every=FLUSH_EVERY):
+        self.path = path
+        self.pid = os.getpid()
+        self.ring = np.zeros(ring_size, dtype=RECORD_DTYPE)
+        self.size = ring_size
+        self.head = 0           # registros escritos en el ring (productor)
+        self.tail = 0           # registros volcados al fichero (escritor)
+        self.dropped = 0
+        self.flush_every = flush_every
+        self._wake = threading.Event()
+        self._stop = False
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, RECORD_DTYPE.itemsize, OBS_DIM))
+        self._thread = threading.Thread(target=self._writer, name="match-recorder", daemon=True)
+        self._thread.start()
+
+    # ---------- productor (bucle del jugador) ----------
+    def append(self, t, cycle, unum, side, action, obs, raw, cmd):
+        head = self.head
+        if head - self.tail >= self.size:
+            self.dropped += 1
+            return False
+        # una sola asignación de tupla (~5x más rápida que campo a campo)
+        self.ring[head % self.size] = (t, obs, raw, cycle, action, unum or 0, side or b"", cmd[:CMD_BYTES])
+        self.head = head + 1    # publicar después de escribir el registro
+        if head - self.tail >= self.size // 2:
+            self._wake.set()
+        return True
+
+    # ---------- escritor ----------
+    def _drain(self):
+        head, tail = self.head, self.tail
+        while tail < head:
+            i = tail % self.size
+            n = min(head - tail, self.size - i)
+            self._file.write(memoryview(self.ring[i:i + n]).cast("B"))
+            tail += n
+            self.tail = tail    # el hueco ya se puede reutilizar
+        self._file.flush()
+
+    def _writer(self):
+        while not self._stop:
+            self._wake.wait(self.flush_every)
+            self._wake.clear()
+            self._drain()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._stop = True
+        self._wake.set()
+        self._thread.join()
+        self._drain()
+        self._file.close()
+
+    def stats(self):
+        return {"records": self.tail, "pending": self.head - self.tail, "dropped": self.dropped}
+
+
+_recorder = None
+
+
+def get_recorder():
+    """Grabador del proceso (RCSS_RECORD) o None si la grabación está apagada."""
+    global _recorder
+    if RECORD_PATH is None:
+        return None
+    if _recorder is None or _recorder.pid != os.getpid():
+        # tras un fork (team_supervisor) cada worker abre su propio fichero
+        os.makedirs(RECORD_PATH, exist_ok=True)
+        name = f"match_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}{EXT}"
+        _recorder = MatchRecorder(os.path.join(RECORD_PATH, name))
+    return _recorder
+
+
+def close_recorder():
+    if _recorder is not None and _recorder.pid == os.getpid():
+        _recorder.close()
+        print(f"[INFO] partido grabado en {_recorder.path}: {_recorder.stats()}")
+
+
+# ---------- lectura ----------
+def list_logs(paths):
+    """Ficheros .rec de una lista de ficheros/directorios, ordenados."""
+    if isinstance(paths, str):
+        paths = [paths]
+    out = []
+    for p in paths:
+        if os.path.isdir(p):
+            out.extend(sorted(glob.glob(os.path.join(p, "**", "*" + EXT), recursive=True)))
+        else:
+            out.append(p)
+    return out
+
+
+def open_log(path):
+    """Registros de un fichero como np.memmap de sólo lectura (sin copiar)."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        magic, itemsize, obs_dim = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or itemsize != RECORD_DTYPE.itemsize or obs_dim != OBS_DIM:
+        raise ValueError(f"{path}: formato de grabación no reconocido "
+                         f"({magic!r}, se esperaba {MAGIC!r}; hay que volver a grabar)")
+    # un registro a medias al final (proceso matado) se ignora
+    n = (size - HEADER.size) // itemsize
+    if n == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size, shape=(n,))
+
+
+def iter_batches(paths, batch_size=65536, fields=None):
+    """
+    Genera lotes de hasta batch_size registros (vistas sobre el memmap; con
+    fields, arrays sólo con esas columnas). Se abre un fichero cada vez,
+    así que sirve igual para miles de partidos.
+    """
+    for path in list_logs(paths):
+        recs = open_log(path)
+        for i in range(0, len(recs), batch_size):
+            batch = recs[i:i + batch_size]
+            yield batch if fields is None else {f: batch[f] for f in fields}
+        del recs
+
+
+def count_records(paths):
+    return sum((os.path.getsize(p) - HEADER.size) // RECORD_DTYPE.itemsize for p in list_logs(paths))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Resumen de partidos grabados")
+    ap.add_argument("paths", nargs="+")
+    args = ap.parse_args()
+    files = list_logs(args.paths)
+    total = 0
+    actions = np.zeros(8, dtype=np.int64)
+    t0 = time.perf_counter()
+    for batch in iter_batches(files, fields=("action",)):
+        a = batch["action"]
+        total += a.size
+        actions += np.bincount(a + 1, minlength=8)[:8]
+    dt = time.perf_counter() - t0
+    print(f"[INFO] {len(files)} ficheros, {total} registros "
+          f"({total * RECORD_DTYPE.itemsize / 1e6:.1f} MB) leídos en {dt:.2f}s")
+    print("[INFO] acciones (-1 = sin política):",
+          {i - 1: int(c) for i, c in enumerate(actions) if c})
+
+
+if __name__ == "__main__":
+    main()
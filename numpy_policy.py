@@ -0,0 +1,292 @@
+# numpy_policy.py
+# Inferencia de la política PPO sin torch ni stable_baselines3: sólo los
+# pesos del actor (MLP + action_net) exportados a .npz por export_policy.py.
+# NumpyPolicy.predict tiene la misma firma que PPO.predict, así que los
+# agentes la usan como reemplazo directo (también dentro del
+# BatchedPolicyServer, con batches (N, 7)).
+#
+# El .npz se guarda sin comprimir y con las matrices ya traspuestas
+# (in, out): load() mapea los arrays directamente desde disco (mmap) sin
+# copiarlos, y LazyPolicy difiere la carga a un hilo en segundo plano para
+# no retrasar el arranque de los jugadores.
+import io
+import mmap
+import os
+import threading
+import time
+import zipfile
+
+import numpy as np
+
+ACTIVATIONS = {
+    "relu": lambda x: np.maximum(x, 0.0, out=x),
+    "tanh": lambda x: np.tanh(x, out=x),
+    "identity": lambda x: x,
+}
+
+
+class NumpyPolicy:
+    """
+    MLP del actor: obs -> [Linear -> activación] * n -> action_net -> logits.
+    weights[i] tiene forma (out, in) como en torch; con transposed=True se
+    pasan ya como (in, out) (así vienen del .npz) y no se copian.
+    """
+
+    def __init__(self, weights, biases, activation="relu", seed=None, transposed=False):
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"activación no soportada: {activation}")
+        # guardamos W transpuesta y contigua: x @ W.T sin copias en cada predict
+        # (matmul con la vista .T es ~3x más lento en las capas de 128)
+        if transposed:
+            self.weights_t = [np.require(w, np.float32, "C") for w in weights]
+        else:
+            self.weights_t = [np.ascontiguousarray(np.asarray(w, dtype=np.float32).T) for w in weights]
+        self.biases = [np.require(b, np.float32) for b in biases]
+        self.activation = activation
+        self._act = ACTIVATIONS[activation]
+        self.obs_dim = self.weights_t[0].shape[0]
+        self.n_actions = self.weights_t[-1].shape[1]
+        self.rng = np.random.default_rng(seed)
+        self._mm = None  # mmap del .npz cuando los pesos son vistas sobre él
+
+    @classmethod
+    def load(cls, path, seed=None, mmap=True):
+        """
+        Carga un .npz de export_policy.py. Con mmap=True los pesos son vistas
+        de sólo lectura sobre el fichero mapeado (sin copias ni lectura
+        completa); si el .npz está comprimido se lee normalmente.
+        """
+        mm, data = map_npz(path) if mmap else (None, None)
+        if data is None:
+            with np.load(path, allow_pickle=False) as npz:
+                data = {k: npz[k] for k in npz.files}
+        n = int(data["n_layers"])
+        activation = str(data["activation"])
+        if "Wt0" in data:
+            policy = cls([data[f"Wt{i}"] for i in range(n)], [data[f"b{i}"] for i in range(n)],
+                         activation, seed, transposed=True)
+        else:
+            # formato anterior: W{i} como (out, in)
+            policy = cls([data[f"W{i}"] for i in range(n)], [data[f"b{i}"] for i in range(n)],
+                         activation, seed)
+        policy._mm = mm
+        return policy
+
+    def close(self):
+        """
+        Suelta los pesos y cierra el mmap del .npz. Si alguien conserva aún
+        una vista de los pesos el mmap queda abierto hasta que se libere.
+        """
+        mm, self._mm = self._mm, None
+        if mm is None:
+            return
+        self.weights_t = self.biases = None
+        try:
+            mm.close()
+        except BufferError:
+            pass
+
+    def __del__(self):
+        self.close()
+
+    def save(self, path):
+        arrays = {"n_layers": np.array(len(self.weights_t)),
+                  "activation": np.array(self.activation)}
+        for i, (wt, b) in enumerate(zip(self.weights_t, self.biases)):
+            arrays[f"Wt{i}"] = wt
+            arrays[f"b{i}"] = b
+        # sin comprimir: así los arrays se pueden mapear desde disco. Se escribe
+        # en .tmp y se renombra: un agente que tenga mapeado el fichero anterior
+        # sigue leyendo ese (truncarlo en sitio le daría SIGBUS)
+        if not path.endswith(".npz"):
+            path += ".npz"
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    def logits(self, obs):
+        x = np.asarray(obs, dtype=np.float32).reshape(-1, self.obs_dim)
+        last = len(self.weights_t) - 1
+        for i, (wt, b) in enumerate(zip(self.weights_t, self.biases)):
+            x = x @ wt
+            x += b
+            if i < last:
+                x = self._act(x)
+        return x
+
+    def action_probs(self, obs):
+        z = self.logits(obs)
+        z -= z.max(axis=1, keepdims=True)
+        np.exp(z, out=z)
+        z /= z.sum(axis=1, keepdims=True)
+        return z
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=False):
+        """
+        Igual que PPO.predict: acepta un obs (7,) o un batch (N, 7) y
+        devuelve (acciones, None). deterministic=True -> argmax, si no se
+        muestrea de la distribución categórica.
+        """
+        obs = np.asarray(observation, dtype=np.float32)
+        single = obs.ndim == 1
+        if deterministic:
+            actions = self.logits(obs).argmax(axis=1)
+        else:
+            probs = self.action_probs(obs)
+            u = self.rng.random((probs.shape[0], 1), dtype=np.float32)
+            actions = (np.cumsum(probs, axis=1) < u).sum(axis=1)
+            np.minimum(actions, self.n_actions - 1, out=actions)
+        if single:
+            return actions[0], state
+        return actions, state
+
+
+def map_npz(path):
+    """
+    (mm, {nombre: array}) con cada miembro de un .npz sin comprimir como
+    vista de sólo lectura sobre el fichero mapeado en memoria; quien lo usa
+    se queda con mm y lo cierra (NumpyPolicy.close). Devuelve (None, None)
+    si algún miembro está comprimido (np.savez_compressed).
+    """
+    with open(path, "rb") as f:
+        # el directorio del zip se lee del fichero; los datos, del mmap
+        with zipfile.ZipFile(f) as z:
+            infos = z.infolist()
+        if any(info.compress_type != zipfile.ZIP_STORED for info in infos):
+            return None, None
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    arrays = {}
+    try:
+        for info in infos:
+            # cabecera local: 30 bytes + nombre + extra, luego el .npy
+            name_len = int.from_bytes(mm[info.header_offset + 26:info.header_offset + 28], "little")
+            extra_len = int.from_bytes(mm[info.header_offset + 28:info.header_offset + 30], "little")
+            start = info.header_offset + 30 + name_len + extra_len
+            head = io.BytesIO(mm[start:start + min(info.file_size, 4096)])
+            if np.lib.format.read_magic(head) == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(head)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(head)
+            count = int(np.prod(shape))
+            arr = np.frombuffer(mm, dtype=dtype, count=count, offset=start + head.tell())
+            arrays[info.filename[:-4]] = arr.reshape(shape, order="F" if fortran else "C")
+    except Exception:
+        arrays.clear()
+        try:
+            mm.close()
+        except BufferError:
+            pass
+        raise
+    return mm, arrays
+
+
+def _find_model(path):
+    """(ruta, 'npz' | 'zip') del modelo a usar, o None si no hay."""
+    root, ext = os.path.splitext(path)
+    npz = path if ext == ".npz" else root + ".npz"
+    if os.path.exists(npz) and (not os.path.exists(path) or npz == path
+                                or os.path.getmtime(npz) >= os.path.getmtime(path)):
+        return npz, "npz"
+    if ext == ".zip" and os.path.exists(path):
+        return path, "zip"
+    return None
+
+
+def load_policy(path, seed=None):
+    """
+    Carga la política para los agentes. Si path es un .npz (o hay un .npz
+    exportado junto al .zip y no es más viejo) se usa NumpyPolicy; si no,
+    se cae a PPO.load de stable_baselines3 (import perezoso).
+    Devuelve None si no hay modelo.
+    """
+    found = _find_model(path)
+    if found is None:
+        return None
+    model_path, kind = found
+    if kind == "npz":
+        return NumpyPolicy.load(model_path, seed=seed)
+    from stable_baselines3 import PPO
+    return PPO.load(model_path, device="cpu")
+
+
+class LazyPolicy:
+    """
+    Política que se carga en un hilo aparte (prefetch) o, como muy tarde, en
+    el primer predict. Así el import del agente y los handshakes no esperan
+    al modelo (PPO.load + torch tarda segundos; el .npz mapeado, milisegundos).
+    reload() carga de nuevo el fichero sin cortar el servicio; generation
+    cuenta las cargas completadas (p.ej. para invalidar cachés).
+    """
+
+    def __init__(self, path, seed=None):
+        self.path = path
+        self.seed = seed
+        self.load_seconds = None
+        self.generation = 0
+        self._model = None
+        self._error = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def prefetch(self):
+        """Empieza a cargar en segundo plano (idempotente)."""
+        with self._lock:
+            if self._thread is None and self._model is None:
+                self._thread = threading.Thread(target=self._load, name="policy-load", daemon=True)
+                self._thread.start()
+        return self
+
+    def reload(self):
+        """Recarga en segundo plano; el modelo anterior sigue sirviendo hasta que termina."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._load, name="policy-load", daemon=True)
+                self._thread.start()
+        return self
+
+    def _load(self):
+        t0 = time.perf_counter()
+        try:
+            model = load_policy(self.path, self.seed)
+            if model is None:
+                raise FileNotFoundError(f"no hay modelo en {self.path}")
+            self._model = model
+            self.generation += 1
+        except Exception as e:
+            # en una recarga fallida (fichero a medio escribir...) se sigue con el anterior
+            if self._model is None:
+                self._error = e
+            print(f"[WARN] No se pudo cargar el modelo {self.path}: {e!r}")
+        self.load_seconds = time.perf_counter() - t0
+
+    def model_mtime(self):
+        """mtime del fichero que se cargaría ahora (.npz o .zip), o None si no hay."""
+        found = _find_model(self.path)
+        if found is None:
+            return None
+        try:
+            return os.path.getmtime(found[0])
+        except OSError:
+            return None
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def get(self):
+        """El modelo cargado (espera a la carga si está en curso)."""
+        if self._model is None:
+            self.prefetch()
+            self._thread.join()
+            if self._error is not None:
+                raise self._error
+        return self._model
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=False):
+        return self.get().predict(observation, state, episode_start, deterministic=deterministic)
+
+
+def lazy_policy(path, seed=None):
+    """LazyPolicy si existe el modelo (.npz o .zip), None si no. No carga nada."""
+    return LazyPolicy(path, seed) if _find_model(path) is not None else None
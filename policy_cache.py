@@ -0,0 +1,125 @@
+# policy_cache.py
+# Caché obs -> acción delante del servidor de inferencia, sólo en modo
+# determinista (argmax): con muestreo la acción es aleatoria y no se puede
+# memorizar. La observación de 7 floats se cuantiza a una resolución por
+# componente y la acción se guarda en un LRU de tamaño acotado; un defensor
+# parado con el balón lejos repite la misma obs cuantizada ciclo tras ciclo
+# y se ahorra el viaje al batch.
+#
+# Invalidación automática: cada check_every s se mira el mtime del fichero
+# del modelo; si cambió se recarga (LazyPolicy.reload) y, cuando la carga
+# termina (cambia LazyPolicy.generation), se vacía la caché.
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from field_sim import ROLE_DIM
+
+# resolución por componente: px, py, ballx, bally (m), dx, dy (m), dist_home/60
+DEFAULT_RESOLUTION = (0.5, 0.5, 0.5, 0.5, 0.25, 0.25, 0.01)
+# obs con rol (política de equipo): los rasgos de rol son fijos por jugador
+TEAM_RESOLUTION = DEFAULT_RESOLUTION + (0.01,) * ROLE_DIM
+DEFAULT_SIZE = 4096
+CHECK_EVERY = 1.0   # s entre comprobaciones del fichero del modelo
+
+
+class PolicyCache:
+    """
+    Envuelve un BatchedPolicyServer (predict_async) con la misma firma.
+    policy: la LazyPolicy del servidor (para mtime/recarga/generación);
+    con otra política la caché funciona pero no se invalida sola.
+    """
+
+    def __init__(self, server, policy=None, resolution=DEFAULT_RESOLUTION, max_size=DEFAULT_SIZE,
+                 check_every=CHECK_EVERY):
+        self.server = server
+        self.policy = policy
+        self.inv_res = 1.0 / np.asarray(resolution, dtype=np.float64)
+        self.max_size = int(max_size)
+        self.check_every = float(check_every)
+        self._lru = OrderedDict()
+        self._generation = getattr(policy, "generation", 0)
+        self._mtime = self._model_mtime()
+        self._next_check = time.monotonic() + self.check_every
+        # contadores
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.bypassed = 0     # peticiones no deterministas (no se cachean)
+
+    def key(self, obs):
+        q = np.floor(np.asarray(obs, dtype=np.float64) * self.inv_res + 0.5)
+        return q.astype(np.int32).tobytes()
+
+    async def predict_async(self, obs, deterministic=False):
+        if not deterministic:
+            self.bypassed += 1
+            return await self.server.predict_async(obs, deterministic=False)
+        self._check_model()
+        key = self.key(obs)
+        lru = self._lru
+        action = lru.get(key)
+        if action is not None:
+            lru.move_to_end(key)
+            self.hits += 1
+            return action
+        self.misses += 1
+        generation = self._generation
+        action = await self.server.predict_async(obs, deterministic=True)
+        # si el modelo cambió mientras esperábamos, la acción es del anterior
+        if generation == self._generation:
+            lru[key] = action
+            if len(lru) > self.max_size:
+                lru.popitem(last=False)
+                self.evictions += 1
+        return action
+
+    def invalidate(self):
+        self._lru.clear()
+        self.invalidations += 1
+
+    # ---------- invalidación ----------
+    def _model_mtime(self):
+        mtime = getattr(self.policy, "model_mtime", None)
+        return mtime() if mtime is not None else None
+
+    def _check_model(self):
+        generation = getattr(self.policy, "generation", 0)
+        if generation != self._generation:
+            # la primera carga (generation 0 -> 1) no invalida nada
+            if self._generation and self._lru:
+                self.invalidate()
+            self._generation = generation
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_every
+        mtime = self._model_mtime()
+        if mtime != self._mtime:
+            self._mtime = mtime
+            print(f"[INFO] El modelo cambió en disco, recargando {getattr(self.policy, 'path', '')}")
+            if hasattr(self.policy, "reload"):
+                self.policy.reload()
+            # se vacía ya y otra vez cuando termine la carga (cambio de generation)
+            self.invalidate()
+
+    # ---------- contadores ----------
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._lru),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "bypassed": self.bypassed,
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"{self.server.format_stats()} | caché: tamaño={s['size']} aciertos={s['hits']} "
+                f"fallos={s['misses']} tasa={100.0 * s['hit_rate']:.1f}% expulsadas={s['evictions']} "
+                f"invalidaciones={s['invalidations']} sin_caché={s['bypassed']}")
@@ -0,0 +1,211 @@
+# policy_server.py
+# Servidor de inferencia por lotes compartido por todo el equipo.
+# En vez de 11 llamadas MODEL.predict(obs) con batch 1 (una por hilo),
+# los jugadores encolan su observación y un único hilo de inferencia
+# junta todas las que llegan en el mismo ciclo en un batch (N, 7),
+# hace un solo forward y devuelve a cada jugador su acción.
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+NUM_PLAYERS = 11
+OBS_DIM = 7
+# tiempo máximo que se espera a que lleguen más jugadores al batch,
+# contado desde la primera petición del ciclo (el ciclo del server es 100 ms)
+DEFAULT_DEADLINE = 0.010
+
+
+class _Request:
+    __slots__ = ("obs", "deterministic", "action", "error", "done", "callback")
+
+    def __init__(self, obs, deterministic, callback=None):
+        self.obs = obs
+        self.deterministic = deterministic
+        self.action = None
+        self.error = None
+        self.done = threading.Event() if callback is None else None
+        self.callback = callback
+
+
+class BatchedPolicyServer:
+    """
+    Agrupa las peticiones de inferencia de todo el equipo en un solo forward.
+
+    - max_batch: si se juntan tantas peticiones se lanza el batch sin esperar
+      al deadline (por defecto los 11 jugadores).
+    - deadline: segundos máximos de espera desde la primera petición del ciclo,
+      para que un jugador lento no haga perder el ciclo a los demás.
+    """
+
+    def __init__(self, model, max_batch=NUM_PLAYERS, deadline=DEFAULT_DEADLINE,
+                 obs_dim=OBS_DIM, history=512):
+        self.model = model
+        self.max_batch = int(max_batch)
+        self.deadline = float(deadline)
+        self.obs_dim = int(obs_dim)
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._closed = False
+        # buffer preasignado para el batch: evita np.stack en cada ciclo
+        self._batch = np.zeros((self.max_batch, self.obs_dim), dtype=np.float32)
+
+        # contadores por ciclo: (tamaño batch, espera ms, inferencia ms)
+        self._cycles = deque(maxlen=history)
+        self.total_batches = 0
+        self.total_requests = 0
+        self.total_errors = 0
+
+        # el hilo arranca con la primera petición (ver _ensure_worker)
+        self._thread = None
+        self._pid = None
+
+    # ---------- API para hilos ----------
+    def predict(self, obs, deterministic=False, timeout=None):
+        """Bloquea el hilo llamante hasta tener la acción (int)."""
+        req = _Request(obs, deterministic)
+        self._submit(req)
+        if not req.done.wait(timeout):
+            raise TimeoutError("policy server no respondió a tiempo")
+        if req.error is not None:
+            raise req.error
+        return req.action
+
+    # ---------- API para corrutinas ----------
+    async def predict_async(self, obs, deterministic=False):
+        """Igual que predict() pero sin bloquear el event loop."""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+
+        def _deliver(req):
+            loop.call_soon_threadsafe(_resolve, fut, req)
+
+        self._submit(_Request(obs, deterministic, callback=_deliver))
+        return await fut
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=1.0)
+
+    # ---------- contadores ----------
+    def stats(self):
+        """Resumen de los últimos ciclos: tamaño de batch y latencias (ms)."""
+        if not self._cycles:
+            return {"batches": 0, "requests": 0, "errors": self.total_errors}
+        arr = np.array(self._cycles, dtype=np.float64)
+        sizes, waits, infers = arr[:, 0], arr[:, 1], arr[:, 2]
+        return {
+            "batches": self.total_batches,
+            "requests": self.total_requests,
+            "errors": self.total_errors,
+            "last_batch": int(sizes[-1]),
+            "mean_batch": float(sizes.mean()),
+            "wait_ms_p50": float(np.percentile(waits, 50)),
+            "wait_ms_p99": float(np.percentile(waits, 99)),
+            "infer_ms_p50": float(np.percentile(infers, 50)),
+            "infer_ms_p99": float(np.percentile(infers, 99)),
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        if not s["batches"]:
+            return "inferencia: sin batches todavía"
+        return (f"inferencia: batches={s['batches']} batch_medio={s['mean_batch']:.1f} "
+                f"espera p50/p99={s['wait_ms_p50']:.2f}/{s['wait_ms_p99']:.2f}ms "
+                f"forward p50/p99={s['infer_ms_p50']:.2f}/{s['infer_ms_p99']:.2f}ms "
+                f"errores={s['errors']}")
+
+    # ---------- interno ----------
+    def _ensure_worker(self):
+        # los hilos no sobreviven a un fork: si el servidor se creó en el
+        # proceso padre (team_supervisor) cada worker arranca el suyo
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._cond = threading.Condition()
+            self._pending = []
+            self._thread = threading.Thread(target=self._worker, name="policy-server", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _submit(self, req):
+        self._ensure_worker()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("policy server cerrado")
+            self._pending.append(req)
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+
+    def _collect(self):
+        """Espera a la primera petición y junta las demás hasta max_batch o deadline."""
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if self._closed and not self._pending:
+                return None, 0.0
+            t_first = time.perf_counter()
+            t_end = t_first + self.deadline
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = t_end - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            reqs = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            return reqs, t_first
+
+    def _worker(self):
+        while True:
+            reqs, t_first = self._collect()
+            if reqs is None:
+                return
+            t0 = time.perf_counter()
+            # un forward por modo (normalmente todos piden el mismo)
+            for det in (False, True):
+                group = [r for r in reqs if r.deterministic == det]
+                if group:
+                    self._run(group, det)
+            t1 = time.perf_counter()
+            self._cycles.append((len(reqs), (t0 - t_first) * 1000.0, (t1 - t0) * 1000.0))
+            self.total_batches += 1
+            self.total_requests += len(reqs)
+
+    def _run(self, group, deterministic):
+        n = len(group)
+        batch = self._batch[:n]
+        try:
+            for i, r in enumerate(group):
+                batch[i] = r.obs
+            actions, _ = self.model.predict(batch, deterministic=deterministic)
+            actions = np.asarray(actions).reshape(n, -1)
+            for i, r in enumerate(group):
+                r.action = int(actions[i, 0]) if actions.shape[1] == 1 else actions[i]
+        except Exception as e:
+            self.total_errors += 1
+            for r in group:
+                r.error = e
+        for r in group:
+            if r.callback is not None:
+                r.callback(r)
+            else:
+                r.done.set()
+
+
+def _resolve(fut, req):
+    if fut.done():
+        return
+    if req.error is not None:
+        fut.set_exception(req.error)
+    else:
+        fut.set_result(req.action)
@@ -1,160 +1,54 @@
-# team_agent_rl.py
-import socket
-import time
-import threading
-import json
-import os
-import re
-import math
+# rcss_gym_env.py
+# Entorno gymnasium headless para entrenar la política de los agentes sin
+# rcssserver. Mismo espacio de observación (7 floats) y de acciones (5
+# discretas) que usan team_agent_rl.py / team_agent_433.py; la física es el
+# modelo cinemático NumPy de field_sim.py.
+import gymnasium as gym
 import numpy as np
-from stable_baselines3 import PPO
-
-SERVER_HOST = "127.0.0.1"
-SERVER_PORT = 6000
-NUM_PLAYERS = 11
-TEAM_NAME = "MY_TEAM"
-CONF_FILE = "conf_file.conf"
-
-INIT_RE = re.compile(r"\(init\s+([lrLR])\s+(\d+)", re.IGNORECASE)
-POS_RE = re.compile(r"\(mypos\s+([\-0-9.]+)\s+([\-0-9.]+)\)", re.IGNORECASE)
-BALL_RE = re.compile(r"\(ball\s+([\-0-9.]+)\s+([\-0-9.]+)", re.IGNORECASE)
-
-MODEL_PATH = "models/ppo_rcss_final.zip"  # modelo entrenado
-
-def load_positions(conf_file):
-    if not os.path.exists(conf_file):
-        raise FileNotFoundError(f"No se encontró {conf_file}")
-    with open(conf_file, "r") as f:
-        data = json.load(f)
-    positions = {}
-    for i in range(1, NUM_PLAYERS + 1):
-        entry = data["data"][0].get(str(i))
-        if entry is None:
-            raise KeyError(f"No hay posición para '{i}' en {conf_file}")
-        positions[i] = (float(entry["x"]), float(entry["y"]))
-    return positions
-
-def safe_send(sock, text):
-    try:
-        sock.sendto(text.encode(), (SERVER_HOST, SERVER_PORT))
-    except:
+from gymnasium import spaces
+
+from field_sim import FieldSim, compute_reward, OBS_LOW, OBS_HIGH, N_ACTIONS
+
+
+class RcssGymEnv(gym.Env):
+    """
+    Un jugador en un campo, con su posición home. Cada step es una decisión
+    del agente (una acción 0..4 aplicada durante un ciclo del server).
+    El episodio termina si el jugador sale del campo y se trunca en max_steps.
+    """
+
+    metadata = {"render_modes": []}
+
+    def __init__(self, home_pos=(-10.0, 0.0), max_steps=1000, seed=None, random_ball=True):
+        super().__init__()
+        self.home_pos = tuple(float(v) for v in home_pos)
+        self.max_steps = int(max_steps)
+        self.observation_space = spaces.Box(low=OBS_LOW, high=OBS_HIGH, dtype=np.float32)
+        self.action_space = spaces.Discrete(N_ACTIONS)
+        self.sim = FieldSim(1, 1, home=self.home_pos, seed=seed, random_ball=random_ball)
+        self._actions = np.zeros((1, 1), dtype=np.int64)
+        self._steps = 0
+        self._ball_dist = None
+
+    def reset(self, *, seed=None, options=None):
+        super().reset(seed=seed)
+        if seed is not None:
+            self.sim.rng = np.random.default_rng(seed)
+        self.sim.reset()
+        self._steps = 0
+        self._ball_dist = self.sim.ball_dist()
+        return self.sim.observe()[0, 0].copy(), {}
+
+    def step(self, action):
+        self._actions[0, 0] = int(action)
+        touched = self.sim.step(self._actions)
+        out = self.sim.out_of_field()
+        reward, self._ball_dist = compute_reward(self.sim, self._ball_dist, touched, out)
+        self._steps += 1
+        terminated = bool(out[0, 0])
+        truncated = self._steps >= self.max_steps
+        info = {"touched": bool(touched[0, 0])}
+        return self.sim.observe()[0, 0].copy(), float(reward[0, 0]), terminated, truncated, info
+
+    def close(self):
         pass
-
-# Cargar modelo una sola vez (política compartida)
-MODEL = None
-if os.path.exists(MODEL_PATH):
-    MODEL = PPO.load(MODEL_PATH)
-    print("[INFO] Modelo RL cargado:", MODEL_PATH)
-else:
-    print("[WARN] Modelo no encontrado en", MODEL_PATH, "— ejecuta train_rl.py primero para generar uno.")
-
-def player_thread(idx, positions):
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind(("", 0))
-    sock.settimeout(0.5)
-
-    safe_send(sock, f"(init {TEAM_NAME})")
-
-    side = None
-    unum = None
-    init_buf = ""
-    t0 = time.time()
-    while time.time() - t0 < 5:
-        try:
-            data, _ = sock.recvfrom(8192)
-            msg = data.decode(errors="ignore")
-            init_buf += msg
-            m = INIT_RE.search(init_buf)
-            if m:
-                side = m.group(1).lower()
-                unum = int(m.group(2))
-                break
-        except socket.timeout:
-            continue
-
-    if unum is None:
-        sock.close()
-        return
-
-    target_pos = positions.get(unum) or positions.get(idx) or (-40.0, 0.0)
-    if side == "r":
-        target_pos = (-target_pos[0], target_pos[1])
-    home_x, home_y = float(target_pos[0]), float(target_pos[1])
-
-    # mandar move inicial
-    for _ in range(6):
-        safe_send(sock, f"(move {home_x:.2f} {home_y:.2f})")
-        time.sleep(0.08)
-
-    px, py = home_x, home_y
-    ballx, bally = 0.0, 0.0
-    last_ball_dist = math.hypot(ballx-px, bally-py)
-
-    while True:
-        # recolectar mensajes
-        try:
-            data, _ = sock.recvfrom(8192)
-            msg = data.decode(errors="ignore")
-        except socket.timeout:
-            msg = ""
-        # actualizar pos y pelota si vienen
-        mpos = POS_RE.search(msg)
-        if mpos:
-            px = float(mpos.group(1)); py = float(mpos.group(2))
-        mball = BALL_RE.search(msg)
-        if mball:
-            ballx = float(mball.group(1)); bally = float(mball.group(2))
-
-        dx = ballx - px; dy = bally - py
-        dist_home = math.hypot(px-home_x, py-home_y)
-
-        obs = np.array([px, py, ballx, bally, dx, dy, dist_home/60.0], dtype=np.float32)
-
-        # si no hay modelo, fallback a comportamiento heurístico
-        if MODEL is None:
-            # heurística simple: si cerca del balón, ir; si lejos, mantener home
-            if math.hypot(dx,dy) < 10.0:
-                safe_send(sock, f"(move {ballx:.2f} {bally:.2f})")
-                safe_send(sock, "(dash 60)")
-            else:
-                safe_send(sock, f"(move {home_x:.2f} {home_y:.2f})")
-            time.sleep(0.12)
-            continue
-
-        # usar modelo para predecir acción
-        action, _ = MODEL.predict(obs, deterministic=False)
-        # mapear acción discreta a comandos
-        if action == 0:
-            safe_send(sock, f"(move {ballx:.2f} {bally:.2f})")
-            safe_send(sock, "(dash 60)")
-        elif action == 1:
-            safe_send(sock, "(dash 75)")
-        elif action == 2:
-            safe_send(sock, "(turn -30)")
-            safe_send(sock, "(dash 40)")
-        elif action == 3:
-            safe_send(sock, "(turn 30)")
-            safe_send(sock, "(dash 40)")
-        elif action == 4:
-            safe_send(sock, f"(move {home_x:.2f} {home_y:.2f})")
-            safe_send(sock, "(dash 55)")
-
-        time.sleep(0.09)
-
-def main():
-    positions = load_positions(CONF_FILE)
-    threads = []
-    for i in range(1, NUM_PLAYERS+1):
-        t = threading.Thread(target=player_thread, args=(i, positions), daemon=True)
-        t.start()
-        threads.append(t)
-        time.sleep(0.12)
-    print("[INFO] Equipo RL arrancado. Ctrl-C para parar.")
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("Detenido.")
-
-if _name_ == "_main_":
-    main()
\ No newline at end of file
@@ -0,0 +1,286 @@
+# rcss_server_env.py
+# Entorno gymnasium respaldado por un rcssserver (o por fake_server.py)
+# en synch_mode, con el mismo espacio de observación y acciones que
+# RcssGymEnv. Un jugador (puerto de jugadores) y un trainer / offline coach
+# (puerto 6001):
+#   - reset: el trainer coloca jugador y balón al instante con (move ...)
+#     y pone play_on; nada de repetir (move) desde el jugador como en el
+#     arranque de los agentes, que sólo vale antes del saque.
+#   - step: el jugador manda su comando y (done), el trainer (done); en
+#     synch_mode el server avanza el ciclo en cuanto han terminado todos
+#     (sin esperar los 100 ms) y avisa con (think). El estado se lee con
+#     (look) del trainer: posiciones globales exactas, sin parsear el see.
+#
+# El server real tiene que arrancar con synch_mode y el trainer permitido:
+#   rcssserver server::synch_mode=true server::coach=true
+# y el stand-in:  python fake_server.py --synch
+#
+# La observación y la recompensa se calculan con field_sim (build/observe
+# y compute_reward) sobre el estado leído, así que son las mismas que en el
+# entorno simulado. El server ejecuta un solo comando de cuerpo por ciclo:
+# las acciones que en field_sim giran y corren (encarar balón/home, girar
+# ±30) mandan (turn) si hay que girar más de TURN_MIN grados y (dash) si no.
+#
+#   python rcss_server_env.py [--steps 2000]          # prueba contra fake_server en synch
+#   python rcss_server_env.py --host H --port 6000 --trainer-port 6001 [--steps N]
+import argparse
+import math
+import re
+import socket
+import threading
+import time
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+
+from field_sim import (FieldSim, compute_reward, ACTION_TURN_MODE, ACTION_TURN_DEG, ACTION_DASH,
+                       KICKABLE_DIST, FIELD_X_MIN, FIELD_X_MAX, FIELD_Y_MIN, FIELD_Y_MAX,
+                       OBS_LOW, OBS_HIGH, N_ACTIONS)
+
+PROTOCOL_VERSION = 15
+TEAM = "RL_TRAIN"
+TIMEOUT = 2.0     # s de espera máxima de una respuesta / del (think)
+TURN_MIN = 10.0   # grados: por debajo se corre en vez de girar
+
+_NUM = r"([-\d.e]+)"
+_LOOK_TIME_RE = re.compile(r"\(ok look (\d+)")
+_LOOK_BALL_RE = re.compile(r"\(\(b\)\s+" + r"\s+".join([_NUM] * 4) + r"\)")
+_INIT_RE = re.compile(r"\(init (l|r) (\d+) ")
+
+
+def _look_player_re(team, unum):
+    return re.compile(r'\(\(p "' + re.escape(team) + r'" ' + str(unum) + r'(?: goalie)?\)\s+'
+                      + r"\s+".join([_NUM] * 5))
+
+
+class ServerLink:
+    """Socket UDP con la dirección de respuesta del server (el real contesta desde otro puerto)."""
+
+    def __init__(self, host, port, timeout=TIMEOUT):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.settimeout(timeout)
+        self.addr = (host, port)
+
+    def send(self, text):
+        self.sock.sendto(text.encode(), self.addr)
+
+    def recv(self):
+        data, addr = self.sock.recvfrom(8192)
+        return data.decode(errors="replace").rstrip("\x00"), addr
+
+    def request(self, text, prefix):
+        """Envía y espera la primera respuesta que empieza por prefix (descarta el resto)."""
+        self.send(text)
+        deadline = time.monotonic() + self.sock.gettimeout()
+        while time.monotonic() < deadline:
+            msg, addr = self.recv()
+            if msg.startswith(prefix):
+                return msg, addr
+            if msg.startswith("(error"):
+                raise RuntimeError(f"{text} -> {msg}")
+        raise TimeoutError(f"sin respuesta {prefix} a {text}")
+
+    def close(self):
+        self.sock.close()
+
+
+class RcssServerEnv(gym.Env):
+    """
+    Un jugador en un server real (synch_mode) con un trainer para los
+    resets. Mismos espacios que RcssGymEnv. Con synch=False también
+    funciona contra un server normal, pero a 100 ms por step.
+    """
+
+    metadata = {"render_modes": []}
+
+    def __init__(self, host="127.0.0.1", port=6000, trainer_port=6001, team=TEAM, home_pos=(-10.0, 0.0),
+                 max_steps=1000, seed=None, random_ball=True, synch=True, timeout=TIMEOUT):
+        super().__init__()
+        self.home_pos = tuple(float(v) for v in home_pos)
+        self.max_steps = int(max_steps)
+        self.random_ball = random_ball
+        self.synch = synch
+        self.team = team
+        self.observation_space = spaces.Box(low=OBS_LOW, high=OBS_HIGH, dtype=np.float32)
+        self.action_space = spaces.Discrete(N_ACTIONS)
+        # estado leído del server en un FieldSim de 1x1: obs y recompensa como en el simulado
+        self.sim = FieldSim(1, 1, home=self.home_pos, seed=seed)
+        self._rng = np.random.default_rng(seed)
+        self._steps = 0
+        self._ball_dist = None
+        self.server_time = -1
+        self.cycles = 0
+
+        self.trainer = ServerLink(host, trainer_port, timeout)
+        self.trainer.request(f"(init (version {PROTOCOL_VERSION}))", "(init ok")
+        self.trainer.request("(eye off)", "(ok eye")
+        self.player = ServerLink(host, port, timeout)
+        msg, addr = self.player.request(f"(init {team} (version {PROTOCOL_VERSION}))", "(init")
+        m = _INIT_RE.match(msg)
+        if m is None:
+            raise RuntimeError(f"init rechazado: {msg}")
+        self.side, self.unum = m.group(1), int(m.group(2))
+        self.player.addr = addr
+        self._player_re = _look_player_re(team, self.unum)
+
+    # ---------- trainer ----------
+    def _look(self):
+        """Lee el estado del server en self.sim (posición, velocidad, cuerpo, balón)."""
+        msg, _ = self.trainer.request("(look)", "(ok look")
+        self.server_time = int(_LOOK_TIME_RE.match(msg).group(1))
+        b = _LOOK_BALL_RE.search(msg)
+        p = self._player_re.search(msg)
+        if b is None or p is None:
+            raise RuntimeError(f"look sin balón o sin el jugador {self.unum}: {msg[:200]}")
+        sim = self.sim
+        sim.ball[0] = (float(b.group(1)), float(b.group(2)))
+        sim.ball_vel[0] = (float(b.group(3)), float(b.group(4)))
+        sim.pos[0, 0] = (float(p.group(1)), float(p.group(2)))
+        sim.vel[0, 0] = (float(p.group(3)), float(p.group(4)))
+        sim.body[0, 0] = math.radians(float(p.group(5)))
+
+    def _trainer_cmd(self, cmd, ok):
+        self.trainer.request(cmd, ok)
+
+    # ---------- gym ----------
+    def reset(self, *, seed=None, options=None):
+        super().reset(seed=seed)
+        if seed is not None:
+            self._rng = np.random.default_rng(seed)
+        hx, hy = self.home_pos
+        if self.random_ball:
+            bx = self._rng.uniform(FIELD_X_MIN * 0.8, FIELD_X_MAX * 0.8)
+            by = self._rng.uniform(FIELD_Y_MIN * 0.8, FIELD_Y_MAX * 0.8)
+        else:
+            bx = by = 0.0
+        self._trainer_cmd(f'(move (player {self.team} {self.unum}) {hx:.3f} {hy:.3f} 0 0 0)', "(ok move")
+        self._trainer_cmd(f"(move (ball) {bx:.3f} {by:.3f} 0 0)", "(ok move")
+        self._trainer_cmd("(recover)", "(ok recover")
+        self._trainer_cmd("(change_mode play_on)", "(ok change_mode")
+        self._look()
+        self._steps = 0
+        self._ball_dist = self.sim.ball_dist()
+        return self.sim.observe()[0, 0].copy(), {}
+
+    def command_for(self, action):
+        """Comando de cuerpo (uno por ciclo) equivalente a la acción discreta."""
+        a = int(action)
+        mode = ACTION_TURN_MODE[a]
+        sim = self.sim
+        px, py = sim.pos[0, 0]
+        if mode == 0:
+            rel = 0.0
+        elif mode == 1:
+            rel = float(ACTION_TURN_DEG[a])
+        else:
+            tx, ty = sim.ball[0] if mode == 2 else self.home_pos
+            rel = math.degrees(math.atan2(ty - py, tx - px) - sim.body[0, 0])
+            rel = (rel + 180.0) % 360.0 - 180.0
+        if abs(rel) > TURN_MIN:
+            return f"(turn {rel:.1f})"
+        return f"(dash {ACTION_DASH[a]:.0f})"
+
+    def step(self, action):
+        t_before = self.server_time
+        self.player.send(self.command_for(action) + ("(done)" if self.synch else ""))
+        if self.synch:
+            self.trainer.send("(done)")
+        self._wait_cycle(t_before)
+        self._look()
+        sim = self.sim
+        # el server real cambia de modo si el balón sale (saque de banda...): se devuelve al campo
+        bx, by = sim.ball[0]
+        if not (FIELD_X_MIN < bx < FIELD_X_MAX and FIELD_Y_MIN < by < FIELD_Y_MAX):
+            bx = min(max(bx, FIELD_X_MIN + 1.0), FIELD_X_MAX - 1.0)
+            by = min(max(by, FIELD_Y_MIN + 1.0), FIELD_Y_MAX - 1.0)
+            self._trainer_cmd(f"(move (ball) {bx:.3f} {by:.3f} 0 0)", "(ok move")
+            self._trainer_cmd("(change_mode play_on)", "(ok change_mode")
+            sim.ball[0] = (bx, by)
+            sim.ball_vel[0] = 0.0
+        touched = sim.ball_dist() < KICKABLE_DIST
+        out = sim.out_of_field()
+        reward, self._ball_dist = compute_reward(sim, self._ball_dist, touched, out)
+        self._steps += 1
+        self.cycles += 1
+        terminated = bool(out[0, 0])
+        truncated = self._steps >= self.max_steps
+        info = {"touched": bool(touched[0, 0])}
+        return sim.observe()[0, 0].copy(), float(reward[0, 0]), terminated, truncated, info
+
+    def _wait_cycle(self, t_before):
+        """
+        Espera al fin del ciclo: el sense_body de un ciclo posterior a
+        t_before y, en synch_mode, el (think) que le sigue. Los (think) de
+        ciclos anteriores (avanzados por timeout durante el reset) se ignoran.
+        """
+        deadline = time.monotonic() + self.player.sock.gettimeout()
+        t_seen = -1
+        while time.monotonic() < deadline:
+            msg, _ = self.player.recv()
+            if msg.startswith("(sense_body"):
+                t_seen = int(msg.split(None, 2)[1])
+                if not self.synch and t_seen > t_before:
+                    return
+            elif self.synch and msg.startswith("(think") and t_seen > t_before:
+                return
+        raise TimeoutError("el server no avanzó el ciclo (¿synch_mode activado?)")
+
+    def close(self):
+        try:
+            self.player.send("(bye)")
+        except OSError:
+            pass
+        self.player.close()
+        self.trainer.close()
+
+
+def run_check(env, steps, seed=0):
+    """Acciones aleatorias durante steps pasos; devuelve pasos/s y episodios."""
+    rng = np.random.default_rng(seed)
+    env.reset(seed=seed)
+    episodes = 0
+    ret = 0.0
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        _, r, term, trunc, _ = env.step(rng.integers(N_ACTIONS))
+        ret += r
+        if term or trunc:
+            episodes += 1
+            env.reset()
+    dt = time.perf_counter() - t0
+    return {"steps": steps, "steps_per_s": steps / dt, "episodes": episodes, "reward": ret,
+            "server_cycles": env.cycles}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Entorno gym sobre rcssserver en synch_mode")
+    ap.add_argument("--host", default=None, help="server real (sin --host se lanza fake_server --synch)")
+    ap.add_argument("--port", type=int, default=6000)
+    ap.add_argument("--trainer-port", type=int, default=6001)
+    ap.add_argument("--steps", type=int, default=2000)
+    ap.add_argument("--max-steps", type=int, default=200, help="pasos por episodio")
+    args = ap.parse_args()
+
+    srv = None
+    host, port, tport = args.host, args.port, args.trainer_port
+    if host is None:
+        from fake_server import FakeServer
+        # ciclo nominal de 100 ms: sólo se espera si algún cliente no manda (done)
+        srv = FakeServer(port=0, cycle=0.1, synch=True, kickoff_cycle=10 ** 9)
+        threading.Thread(target=srv.serve, daemon=True).start()
+        host, port, tport = "127.0.0.1", srv.port, srv.trainer_port
+    env = RcssServerEnv(host, port, tport, max_steps=args.max_steps)
+    try:
+        res = run_check(env, args.steps)
+    finally:
+        env.close()
+        if srv is not None:
+            srv.stop()
+    print(f"[INFO] {res['steps']} pasos en synch_mode: {res['steps_per_s']:.0f} pasos/s "
+          f"({res['steps_per_s'] / 10.0:.1f}x tiempo real), {res['episodes']} episodios, "
+          f"recompensa total {res['reward']:+.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# receive_stage.py
+# Etapa de recepción "drain-to-latest": antes de decidir se vacían todos los
+# datagramas pendientes y de cada tipo (see, sense_body, hear de cada emisor,
+# ...) se queda sólo el más reciente, para no decidir con mensajes de hace
+# varios ciclos. También registra cuántos mensajes había en cola y qué edad
+# tenían, para ver el atraso cuando hay carga.
+import time
+
+# tipos en los que sólo importa el último mensaje
+COLLAPSE = (b"see", b"sense_body", b"hear", b"fullstate")
+# cuántos mensajes de otros tipos (init, error, ok, ...) se guardan en orden
+OTHER_LIMIT = 32
+
+
+def message_key(data):
+    """
+    Clave de colapso de un datagrama: b"see", b"sense_body", b"hear referee"...
+    Devuelve None para los tipos que se conservan todos (init, error, ...).
+    """
+    end = 1
+    n = len(data)
+    while end < n and data[end] not in b" )":
+        end += 1
+    kind = bytes(data[1:end])
+    if kind not in COLLAPSE:
+        return None
+    if kind == b"hear":
+        # (hear T emisor ...): un último mensaje por emisor (referee, self, coach...).
+        # Los de otros jugadores son (hear T dir ...): la dirección no identifica
+        # al emisor, así que no se colapsan (se guardan todos, como init/error)
+        parts = bytes(data[:64]).split(b" ", 3)
+        if len(parts) >= 3:
+            sender = parts[2].rstrip(b")")
+            try:
+                float(sender)
+            except ValueError:
+                return kind + b" " + sender
+            return None
+    return kind
+
+
+class LatestInbox:
+    """
+    Buzón que colapsa por tipo de mensaje. put() desde el lado de red,
+    drain() desde el bucle de decisión.
+
+    Contadores de la última drain(): last_depth (datagramas pendientes),
+    last_dropped (pisados por uno más nuevo del mismo tipo) y last_age_ms
+    (edad del mensaje más viejo que se usó). También máximos y totales.
+    """
+
+    def __init__(self):
+        self._latest = {}
+        self._other = []
+        self._pending = 0
+        self.last_depth = 0
+        self.last_dropped = 0
+        self.last_age_ms = 0.0
+        self.max_depth = 0
+        self.max_age_ms = 0.0
+        self.total_received = 0
+        self.total_dropped = 0
+        self.drains = 0
+
+    def __len__(self):
+        return self._pending
+
+    def put(self, data, t=None):
+        self.put_keyed(message_key(data), data, t)
+
+    def put_keyed(self, key, item, t=None):
+        """
+        Como put con la clave ya calculada (message_key del datagrama): el
+        lado de red puede guardar lo que ya extrajo del buffer de recepción
+        en vez del datagrama.
+        """
+        if t is None:
+            t = time.monotonic()
+        self._pending += 1
+        self.total_received += 1
+        if key is None:
+            if len(self._other) >= OTHER_LIMIT:
+                self._other.pop(0)
+            self._other.append((t, item))
+        else:
+            self._latest[key] = (t, item)
+
+    def drain(self, now=None):
+        """Mensajes a procesar, [(t, data), ...] en orden de llegada."""
+        if not self._pending:
+            self.last_depth = self.last_dropped = 0
+            self.last_age_ms = 0.0
+            return []
+        if now is None:
+            now = time.monotonic()
+        msgs = list(self._latest.values())
+        msgs.extend(self._other)
+        msgs.sort(key=lambda m: m[0])
+
+        depth = self._pending
+        self.last_depth = depth
+        self.last_dropped = depth - len(msgs)
+        self.last_age_ms = (now - msgs[0][0]) * 1000.0
+        self.max_depth = max(self.max_depth, depth)
+        self.max_age_ms = max(self.max_age_ms, self.last_age_ms)
+        self.total_dropped += self.last_dropped
+        self.drains += 1
+
+        self._latest.clear()
+        self._other.clear()
+        self._pending = 0
+        return msgs
+
+    def format_stats(self):
+        return (f"cola max={self.max_depth} edad max={self.max_age_ms:.1f}ms "
+                f"descartados={self.total_dropped}/{self.total_received}")
+
+
+def drain_socket(sock, inbox, bufsize=8192):
+    """
+    Lee sin bloquear todo lo que haya en el buffer del kernel y lo mete en
+    el buzón. Para bucles con socket bloqueante (fake server, benchmarks).
+    Devuelve cuántos datagramas se leyeron.
+    """
+    n = 0
+    # con timeout el socket haría select() antes de cada recv: lo pasamos a
+    # no bloqueante mientras se vacía y luego se restaura
+    timeout = sock.gettimeout()
+    sock.setblocking(False)
+    try:
+        while True:
+            try:
+                data = sock.recv(bufsize)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break
+            inbox.put(data)
+            n += 1
+    finally:
+        sock.settimeout(timeout)
+    return n
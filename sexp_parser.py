@@ -0,0 +1,317 @@
+# sexp_parser.py
+# Parser de mensajes de rcssserver que trabaja directamente sobre bytes /
+# memoryview (sin decodificar a str) y devuelve objetos tipados con
+# __slots__ para see / sense_body / hear / init.
+#
+# Se recorre el mensaje una sola vez con una regex de bytes (findall) que
+# reconoce los dos tipos de lista que usa el protocolo:
+#   ((nombre del objeto) valores...)   -> objetos vistos en see
+#   (clave valores...)                 -> campos planos (sense_body, mypos, ball)
+# Los números se convierten con float()/int() directamente desde bytes.
+# Cubre mucho más que las regex POS_RE/BALL_RE, así que por mensaje es más
+# lento que ellas.
+#
+# El camino caliente de los agentes es scan_percept: sobre el buffer de
+# recepción (bytearray de RecvBuffer, sin copiar ni decodificar) busca sólo
+# (mypos x y) / (ball x y), desde el final y acotado a los n bytes
+# recibidos; scan_play_mode hace lo mismo con los hear del árbitro.
+# benchmarks/bench_parser.py compara los tres caminos.
+import re
+
+RECV_BUFSIZE = 8192
+
+_OBJ_RE = re.compile(rb"\(\(([^()]*)\)([^()]*)\)|\(([a-z_]+)([^()]*)\)")
+# en sense_body no hay objetos ((...)): basta con las listas planas
+_FLAT_RE = re.compile(rb"\(([a-z_]+) ?([^()]*)\)")
+_TOKEN_RE = re.compile(rb'"[^"]*"|[^\s()]+')
+
+
+class InitMessage:
+    __slots__ = ("side", "unum", "play_mode")
+
+    kind = "init"
+
+    def __init__(self, side, unum, play_mode):
+        self.side = side
+        self.unum = unum
+        self.play_mode = play_mode
+
+
+class _Percept:
+    # mypos / ball absolutos: el server de entrenamiento (y el stand-in) los
+    # añade a los mensajes; el rcssserver estándar no los manda
+    __slots__ = ("time", "x", "y", "ball_x", "ball_y")
+
+    def __init__(self, time):
+        self.time = time
+        self.x = self.y = None
+        self.ball_x = self.ball_y = None
+
+
+class SeeMessage(_Percept):
+    """
+    ball: (dist, dir) relativo o None.
+    players: [(team, unum, goalie, dist, dir), ...] (team/unum pueden ser None).
+    flags / goals / lines: {nombre: (dist, dir)} con nombre tipo b"f c t 10".
+    """
+    __slots__ = ("ball", "players", "flags", "goals", "lines")
+
+    kind = "see"
+
+    def __init__(self, time):
+        _Percept.__init__(self, time)
+        self.ball = None
+        self.players = []
+        self.flags = {}
+        self.goals = {}
+        self.lines = {}
+
+
+class SenseBodyMessage(_Percept):
+    """counts: contadores de comandos ejecutados (kick, dash, turn, say, ...)."""
+    __slots__ = ("view_quality", "view_width", "stamina", "effort", "capacity",
+                 "speed", "speed_dir", "head_angle", "counts")
+
+    kind = "sense_body"
+
+    def __init__(self, time):
+        _Percept.__init__(self, time)
+        self.view_quality = self.view_width = None
+        self.stamina = self.effort = self.capacity = None
+        self.speed = self.speed_dir = None
+        self.head_angle = None
+        self.counts = {}
+
+
+class HearMessage:
+    """sender: b"referee", b"self", b"our", b"opp", ...; direction None si no viene."""
+    __slots__ = ("time", "sender", "direction", "unum", "message")
+
+    kind = "hear"
+
+    def __init__(self, time, sender, direction, unum, message):
+        self.time = time
+        self.sender = sender
+        self.direction = direction
+        self.unum = unum
+        self.message = message
+
+
+_COUNT_KEYS = frozenset((b"kick", b"dash", b"turn", b"say", b"turn_neck",
+                         b"catch", b"move", b"change_view", b"change_focus"))
+
+
+_PERCEPT_HEADS = (b"(see ", b"(sense_body ")
+# cola de la extensión: (mypos x y) seguido (normalmente) de (ball x y)
+_TAIL_RE = re.compile(rb"\(mypos ([^ )]+) ([^ )]+)\)(?: \(ball ([^ )]+) ([^ )]+)\))?")
+_BALL_RE = re.compile(rb"\(ball ([^ )]+) ([^ )]+)\)")
+
+
+def scan_percept(buf, end=None):
+    """
+    Camino caliente: de buf[:end] (bytes o bytearray; end = bytes recibidos
+    en un buffer reutilizado) sólo saca lo que usan los agentes. Devuelve
+    (x, y, ball_x, ball_y) con None en lo que no venga, o None si el
+    mensaje no es una percepción (hear, init, error...) o está mal formado.
+    mypos / ball van al final del mensaje: se busca desde atrás (rfind) y
+    se casa la cola con una sola regex, sin recorrer los objetos del see.
+    """
+    if end is None:
+        end = len(buf)
+    if not buf.startswith(_PERCEPT_HEADS, 0, end):
+        return None
+    try:
+        i = buf.rfind(b"(mypos ", 0, end)
+        if i >= 0:
+            m = _TAIL_RE.match(buf, i, end)
+            if m is None:
+                return None
+            x, y, bx, by = m.groups()
+            if bx is not None:
+                return float(x), float(y), float(bx), float(by)
+            x, y = float(x), float(y)
+        else:
+            x = y = None
+        # ball sin mypos delante (u otro orden)
+        i = buf.rfind(b"(ball ", 0, end)
+        if i < 0:
+            return x, y, None, None
+        m = _BALL_RE.match(buf, i, end)
+        if m is None:
+            return None
+        return x, y, float(m.group(1)), float(m.group(2))
+    except ValueError:
+        return None
+
+
+def scan_play_mode(buf, end=None):
+    """(hear T referee modo) -> modo (str); None para cualquier otro mensaje."""
+    if end is None:
+        end = len(buf)
+    if not buf.startswith(b"(hear ", 0, end):
+        return None
+    i = buf.find(b" ", 6, end)   # después del tiempo
+    if i < 0 or not buf.startswith(b"referee ", i + 1, end):
+        return None
+    e = buf.find(b")", i + 9, end)
+    if e < 0:
+        return None
+    return buf[i + 9:e].decode(errors="ignore")
+
+
+def parse_message(buf):
+    """
+    Parsea un datagrama (bytes, bytearray o memoryview). Devuelve un
+    InitMessage / SeeMessage / SenseBodyMessage / HearMessage, o None para
+    tipos que no interesan o mensajes mal formados.
+    """
+    m = _TOKEN_RE.search(buf)
+    if m is None:
+        return None
+    head = m.group(0)
+    pos = m.end()
+    try:
+        if head == b"see":
+            return _parse_see(buf, pos)
+        if head == b"sense_body":
+            return _parse_sense_body(buf, pos)
+        if head == b"hear":
+            return _parse_hear(buf, pos)
+        if head == b"init":
+            return _parse_init(buf, pos)
+    except (ValueError, IndexError):
+        return None
+    return None
+
+
+def _read_time(buf, pos):
+    m = _TOKEN_RE.search(buf, pos)
+    return int(m.group(0)), m.end()
+
+
+def _set_abs(msg, key, vals):
+    # (mypos x y) / (ball x y)
+    if key == b"mypos":
+        msg.x = float(vals[0]); msg.y = float(vals[1])
+        return True
+    if key == b"ball":
+        msg.ball_x = float(vals[0]); msg.ball_y = float(vals[1])
+        return True
+    return False
+
+
+def _parse_see(buf, pos):
+    time, pos = _read_time(buf, pos)
+    msg = SeeMessage(time)
+    flags = msg.flags
+    for name, vals, key, kvals in _OBJ_RE.findall(buf, pos):
+        if not name:
+            if key:
+                _set_abs(msg, key, kvals.split())
+            continue
+        vals = vals.split()
+        if len(vals) > 1:
+            dist = float(vals[0]); direction = float(vals[1])
+        else:
+            dist = None; direction = float(vals[0])
+        c = name[0]
+        if c == 102 or c == 70:  # f / F
+            flags[name] = (dist, direction)
+        elif c == 112 or c == 80:  # p / P
+            parts = name.split()
+            team = parts[1].strip(b'"') if len(parts) > 1 else None
+            unum = int(parts[2]) if len(parts) > 2 else None
+            goalie = len(parts) > 3 and parts[3] == b"goalie"
+            msg.players.append((team, unum, goalie, dist, direction))
+        elif c == 98 or c == 66:  # b / B
+            msg.ball = (dist, direction)
+        elif c == 103 or c == 71:  # g / G
+            msg.goals[name] = (dist, direction)
+        elif c == 108:  # l
+            msg.lines[name] = (dist, direction)
+    return msg
+
+
+def _parse_sense_body(buf, pos):
+    time, pos = _read_time(buf, pos)
+    msg = SenseBodyMessage(time)
+    counts = msg.counts
+    for key, vals in _FLAT_RE.findall(buf, pos):
+        if key in _COUNT_KEYS:
+            counts[key] = int(vals)
+            continue
+        vals = vals.split()
+        if not vals:
+            continue
+        if key == b"view_mode":
+            msg.view_quality = vals[0]
+            msg.view_width = vals[1] if len(vals) > 1 else None
+        elif key == b"stamina":
+            msg.stamina = float(vals[0])
+            msg.effort = float(vals[1]) if len(vals) > 1 else None
+            msg.capacity = float(vals[2]) if len(vals) > 2 else None
+        elif key == b"speed":
+            msg.speed = float(vals[0])
+            msg.speed_dir = float(vals[1]) if len(vals) > 1 else None
+        elif key == b"head_angle":
+            msg.head_angle = float(vals[0])
+        elif key == b"mypos" or key == b"ball":
+            _set_abs(msg, key, vals)
+    return msg
+
+
+def _parse_hear(buf, pos):
+    # (hear T referee play_on) | (hear T self "msg") | (hear T dir our 5 "msg")
+    toks = _TOKEN_RE.findall(buf, pos)
+    time = int(toks[0])
+    direction = unum = None
+    i = 1
+    try:
+        direction = float(toks[1])
+        i = 2
+    except ValueError:
+        pass
+    sender = toks[i]
+    i += 1
+    if sender in (b"our", b"opp") and i < len(toks) - 1:
+        try:
+            unum = int(toks[i])
+            i += 1
+        except ValueError:
+            pass
+    message = b" ".join(toks[i:]).strip(b'"')
+    return HearMessage(time, sender, direction, unum, message)
+
+
+def _parse_init(buf, pos):
+    toks = _TOKEN_RE.findall(buf, pos)
+    side = toks[0].decode().lower()
+    unum = int(toks[1])
+    play_mode = toks[2].decode() if len(toks) > 2 else None
+    return InitMessage(side, unum, play_mode)
+
+
+class RecvBuffer:
+    """
+    Buffer preasignado para recvfrom_into: se reutiliza en cada lectura y
+    scan_percept / parse_message trabajan sobre el tramo recibido, sin
+    copiar ni decodificar el datagrama.
+    """
+
+    def __init__(self, size=RECV_BUFSIZE):
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+
+    def recv_into(self, sock):
+        """Lee un datagrama en el buffer. Devuelve (n, addr)."""
+        return sock.recvfrom_into(self.buf)
+
+    def recv(self, sock):
+        """Lee un datagrama y lo escanea (camino caliente). Devuelve (scan_percept, addr)."""
+        n, addr = sock.recvfrom_into(self.buf)
+        return scan_percept(self.buf, n), addr
+
+    def recv_full(self, sock):
+        """Lee un datagrama y lo parsea entero. Devuelve (msg, addr)."""
+        n, addr = sock.recvfrom_into(self.buf)
+        return parse_message(self.view[:n]), addr
@@ -2,11 +2,9 @@
 
 echo "🚀 Iniciando equipo JulianaFC (11 jugadores)..."
 
-for i in {1..11}
-do
-    echo "→ Lanzando jugador $i"
-   python3 team_agent_rl.py $i &
-    sleep 0.3
-done
+# el supervisor carga modelo y formación una vez y hace fork de los workers
+# (jugadores repartidos entre los cores); relanza los que se caigan.
+# Opciones: --players-per-proc N, --variant rl|433|random, --no-pin
+python3 team_supervisor.py --variant rl "$@" &
 
-echo "✔ Todos los jugadores están ejecutándose en segundo plano."
+echo "✔ Equipo ejecutándose en segundo plano (PID $!)."
@@ -0,0 +1,204 @@
+# state_estimator.py
+# Estimación de la posición propia y del balón con un filtro de Kalman de
+# velocidad constante, vectorizado sobre todas las pistas a la vez (arrays
+# (N, ...) en vez de un objeto por jugador).
+#
+# Cada pista tiene estado [pos, vel] por eje (x e y comparten covarianza,
+# el ruido es isótropo), con el tiempo medido en ciclos del server: entre
+# dos observaciones la pista se predice (dead-reckoning) y la velocidad
+# decae con el factor de la pista (0.94 por ciclo el balón, como en el
+# server; 1 para el jugador, que vuelve a acelerar con cada dash).
+#
+# Los jugadores no usan la última observación tal cual sino la predicción
+# al ciclo en que se ejecutan sus comandos (fin del ciclo actual): así se
+# compensa el retraso entre percepción y ejecución y se rellenan los ciclos
+# sin see.
+import numpy as np
+
+from cycle_scheduler import CYCLE
+from field_sim import BALL_DECAY
+
+# ruido (m): de medida y de aceleración por ciclo
+SELF_R, SELF_Q = 0.1, 0.15
+BALL_R, BALL_Q = 0.3, 0.2
+INIT_VEL_VAR = 1.0   # (m/ciclo)^2 al abrir una pista
+GATE = 5.0           # m: una innovación mayor reinicia la pista (saque, move, teletransporte)
+
+
+class StateEstimator:
+    """
+    n pistas independientes 2D. decay, q, r: por pista (escalares o arrays
+    (n,)). Las operaciones aceptan un índice o un array de índices.
+    """
+
+    def __init__(self, n, decay=1.0, q=SELF_Q, r=SELF_R, cycle_len=CYCLE, gate=GATE):
+        self.n = int(n)
+        self.decay = np.broadcast_to(np.asarray(decay, dtype=np.float64), (self.n,)).copy()
+        self.q = np.broadcast_to(np.asarray(q, dtype=np.float64) ** 2, (self.n,)).copy()
+        self.r = np.broadcast_to(np.asarray(r, dtype=np.float64) ** 2, (self.n,)).copy()
+        self.cycle_len = float(cycle_len)
+        self.gate = float(gate)
+        # estado (n, eje, [pos, vel]) y covarianza (n, 2, 2) común a los dos ejes
+        self.s = np.zeros((self.n, 2, 2))
+        self.P = np.zeros((self.n, 2, 2))
+        self.t = np.zeros(self.n)            # hora (monotonic) del estado de cada pista
+        self.valid = np.zeros(self.n, dtype=bool)
+        self.updates = np.zeros(self.n, dtype=np.int64)
+        self.resets = np.zeros(self.n, dtype=np.int64)
+        # parámetros como floats de Python para el camino escalar
+        self._params = list(zip(self.decay.tolist(), self.q.tolist(), self.r.tolist()))
+
+    def _transition(self, idx, n_cycles):
+        """F (k, 2, 2) y Q (k, 2, 2) para avanzar n_cycles (k,) ciclos."""
+        d = self.decay[idx]
+        dn = d ** n_cycles
+        # desplazamiento = v * (1 + d + ... + d^(n-1)); con d = 1, v * n
+        g = np.where(d < 1.0, (1.0 - dn) / np.where(d < 1.0, 1.0 - d, 1.0), n_cycles)
+        F = np.zeros(n_cycles.shape + (2, 2))
+        F[..., 0, 0] = 1.0
+        F[..., 0, 1] = g
+        F[..., 1, 1] = dn
+        q = self.q[idx]
+        Q = np.empty_like(F)
+        Q[..., 0, 0] = q * n_cycles ** 3 / 3.0
+        Q[..., 0, 1] = Q[..., 1, 0] = q * n_cycles ** 2 / 2.0
+        Q[..., 1, 1] = q * n_cycles
+        return F, Q
+
+    def _propagate(self, idx, t):
+        idx = np.atleast_1d(idx)
+        n_cycles = np.maximum(np.broadcast_to(t, idx.shape) - self.t[idx], 0.0) / self.cycle_len
+        F, Q = self._transition(idx, n_cycles)
+        s = np.einsum("kij,kaj->kai", F, self.s[idx])
+        P = F @ self.P[idx] @ np.swapaxes(F, 1, 2) + Q
+        return idx, s, P
+
+    def predict(self, idx, t):
+        """Posiciones (k, 2) de las pistas en la hora t, sin modificar el estado."""
+        _, s, _ = self._propagate(idx, t)
+        return s[:, :, 0]
+
+    # ---------- una sola pista (camino rápido del bucle de los jugadores) ----------
+    # Misma matemática que update/predict en escalares de Python: para una
+    # pista el overhead de NumPy (einsum, indexado) es ~20x el cálculo.
+    def _propagate_one(self, i, t):
+        n = t - self.t.item(i)
+        n = n / self.cycle_len if n > 0.0 else 0.0
+        d, q, _ = self._params[i]
+        if d < 1.0:
+            dn = d ** n
+            g = (1.0 - dn) / (1.0 - d)
+        else:
+            dn, g = 1.0, n
+        (xp, xv), (yp, yv) = self.s[i].tolist()
+        (p00, p01), (_, p11) = self.P[i].tolist()
+        # F P F^T + Q con F = [[1, g], [0, dn]]
+        a00 = p00 + 2.0 * g * p01 + g * g * p11 + q * n ** 3 / 3.0
+        a01 = dn * (p01 + g * p11) + q * n * n / 2.0
+        a11 = dn * dn * p11 + q * n
+        return xp + g * xv, dn * xv, yp + g * yv, dn * yv, a00, a01, a11
+
+    def predict_one(self, i, t):
+        """(x, y) de la pista i en la hora t, sin modificar el estado."""
+        x, _, y, _, _, _, _ = self._propagate_one(i, t)
+        return x, y
+
+    def update_one(self, i, zx, zy, t):
+        """Como update() para una sola pista."""
+        if t <= self.t.item(i):
+            return
+        xp, xv, yp, yv, p00, p01, p11 = self._propagate_one(i, t)
+        r = self._params[i][2]
+        ix, iy = zx - xp, zy - yp
+        valid = self.valid.item(i)
+        if not valid or max(abs(ix), abs(iy)) > self.gate:
+            if valid:
+                self.resets[i] += 1
+            self.s[i] = ((zx, 0.0), (zy, 0.0))
+            self.P[i] = ((r, 0.0), (0.0, INIT_VEL_VAR))
+        else:
+            S = p00 + r
+            k0, k1 = p00 / S, p01 / S
+            self.s[i] = ((xp + k0 * ix, xv + k1 * ix), (yp + k0 * iy, yv + k1 * iy))
+            self.P[i] = ((p00 - k0 * p00, p01 - k0 * p01), (p01 - k0 * p01, p11 - k1 * p01))
+        self.t[i] = t
+        self.valid[i] = True
+        self.updates[i] += 1
+
+    def velocity(self, idx):
+        """Velocidades (k, 2) en m/ciclo."""
+        return self.s[np.atleast_1d(idx), :, 1]
+
+    def update(self, idx, z, t):
+        """
+        Observación z (k, 2) en la hora t para las pistas idx. Las que no
+        son más nuevas que el estado se ignoran; las no iniciadas (o con
+        una innovación mayor que gate) se reinician en z con velocidad 0.
+        """
+        idx = np.atleast_1d(idx)
+        z = np.asarray(z, dtype=np.float64).reshape(-1, 2)
+        t = np.broadcast_to(np.asarray(t, dtype=np.float64), idx.shape)
+        fresh = t > self.t[idx]
+        if not fresh.all():
+            idx, z, t = idx[fresh], z[fresh], t[fresh]
+            if idx.size == 0:
+                return
+        idx, s, P = self._propagate(idx, t)
+        r = self.r[idx]
+        innov = z - s[:, :, 0]
+        reset = ~self.valid[idx] | (np.abs(innov).max(axis=1) > self.gate)
+        # K = P H^T / (H P H^T + R), con H = [1, 0]
+        S = P[:, 0, 0] + r
+        K = P[:, :, 0] / S[:, None]
+        s += K[:, None, :] * innov[:, :, None]
+        P -= K[:, :, None] * P[:, None, 0, :]
+        if reset.any():
+            s[reset, :, 0] = z[reset]
+            s[reset, :, 1] = 0.0
+            P[reset] = 0.0
+            P[reset, 0, 0] = r[reset]
+            P[reset, 1, 1] = INIT_VEL_VAR
+            self.resets[idx[reset & self.valid[idx]]] += 1
+        self.s[idx] = s
+        self.P[idx] = P
+        self.t[idx] = t
+        self.valid[idx] = True
+        self.updates[idx] += 1
+
+
+class TeamEstimator:
+    """
+    Pistas de un equipo en un solo filtro: la posición propia de cada
+    jugador (slot) y el balón visto por cada jugador (n + slot).
+    """
+
+    def __init__(self, n_players=11, cycle_len=CYCLE):
+        n = int(n_players)
+        self.n_players = n
+        decay = np.r_[np.ones(n), np.full(n, BALL_DECAY)]
+        q = np.r_[np.full(n, SELF_Q), np.full(n, BALL_Q)]
+        r = np.r_[np.full(n, SELF_R), np.full(n, BALL_R)]
+        self.kf = StateEstimator(2 * n, decay, q, r, cycle_len)
+
+    def observe_self(self, slot, x, y, t):
+        self.kf.update_one(slot, x, y, t)
+
+    def observe_ball(self, slot, x, y, t):
+        self.kf.update_one(self.n_players + slot, x, y, t)
+
+    def has_self(self, slot):
+        return bool(self.kf.valid[slot])
+
+    def has_ball(self, slot):
+        return bool(self.kf.valid[self.n_players + slot])
+
+    def predict(self, slot, t):
+        """(x, y, bx, by) del jugador slot en la hora t."""
+        x, y = self.kf.predict_one(slot, t)
+        bx, by = self.kf.predict_one(self.n_players + slot, t)
+        return x, y, bx, by
+
+    def predict_all(self, t):
+        """(n, 4) con [x, y, bx, by] de todos los jugadores en la hora t (un solo paso vectorizado)."""
+        p = self.kf.predict(np.arange(2 * self.n_players), t)
+        return np.hstack([p[:self.n_players], p[self.n_players:]])
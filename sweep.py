@@ -0,0 +1,269 @@
+# sweep.py
+# Búsqueda de hiperparámetros (rejilla o aleatoria) de train_rl.py para un
+# jugador, con un trial por worker de un pool de procesos y un core por
+# trial (torch y BLAS a 1 hilo, campos en el mismo proceso):
+#
+#   - cada config se valida (train_rl.validate_config) antes de mandarla al
+#     pool: una activation_fn=None o un batch_size mayor que el rollout se
+#     rechazan al momento, sin gastar un entrenamiento;
+#   - cada eval_every pasos el trial evalúa su actor (evaluate_actor, como
+#     AsyncEvalCallback pero en su propio core) y lo compara con la mediana
+#     de los otros trials en el mismo punto: si queda por debajo (pasado el
+#     calentamiento y con al menos --min-trials comparables) se para;
+#   - el mejor actor de cada trial queda en out_dir/trial_NNN_best.npz; al
+#     final se escribe la tabla (summary.txt), los resultados (results.jsonl),
+#     sweep_best.npz y sweep_best.json (la config, para train_rl.py --config).
+#
+#   python sweep.py [--mode grid|random] [--trials N] [--space space.json] [--timesteps 100000]
+#                   [--eval-every 20000] [--jobs N] [--out-dir models/sweep]
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import torch
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecMonitor
+
+from numpy_policy import NumpyPolicy
+from train_callbacks import actor_snapshot, evaluate_actor
+from train_rl import make_model, validate_config
+from vec_env import make_vec_env
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+OUT_DIR = os.path.join(ROOT, "models", "sweep")
+
+# valores por parámetro; --space los sustituye (mismo formato en JSON)
+DEFAULT_SPACE = {
+    "activation": ["relu", "tanh"],
+    "net_arch": [[64, 64], [128, 128], [256, 256]],
+    "learning_rate": [1e-4, 3e-4, 1e-3],
+    "ent_coef": [0.0, 0.01],
+}
+WARMUP_EVALS = 1        # evaluaciones antes de poder parar un trial
+MIN_TRIALS = 3          # trials con evaluación en ese punto para comparar con la mediana
+EVAL_EPISODES = 16
+
+
+def build_trials(space, mode="grid", n_trials=None, seed=0):
+    """Lista de configs: producto cartesiano (grid) o n_trials muestras sin repetir (random)."""
+    keys = list(space)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+    if mode == "grid":
+        return grid[:n_trials] if n_trials else grid
+    rng = random.Random(seed)
+    return rng.sample(grid, min(n_trials or len(grid), len(grid)))
+
+
+def _init_worker():
+    # un core por trial: sin hilos extra de torch/BLAS que compitan entre trials
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = "1"
+    torch.set_num_threads(1)
+
+
+class MedianStopper:
+    """
+    Regla de la mediana entre trials: scores[k] guarda las evaluaciones de
+    todos los trials en la evaluación k (vive en un Manager, compartido por
+    los workers).
+    """
+
+    def __init__(self, scores, lock, warmup=WARMUP_EVALS, min_trials=MIN_TRIALS):
+        self.scores = scores
+        self.lock = lock
+        self.warmup = warmup
+        self.min_trials = min_trials
+
+    def report(self, k, score):
+        """Registra la evaluación k del trial; True si el trial debe pararse."""
+        with self.lock:
+            others = list(self.scores.get(k, []))
+            self.scores[k] = others + [score]
+        if k < self.warmup or len(others) < self.min_trials:
+            return False
+        return score < float(np.median(others))
+
+
+class TrialEvalCallback(BaseCallback):
+    """Evalúa el actor cada eval_every pasos, guarda el mejor y para el trial si el stopper lo pide."""
+
+    def __init__(self, res, eval_every, n_episodes, seed, best_path, home_pos, stopper=None):
+        super().__init__()
+        self.res = res
+        self.eval_every = int(eval_every)
+        self.next_eval = self.eval_every
+        self.n_episodes = n_episodes
+        self.seed = seed
+        self.best_path = best_path
+        self.home_pos = tuple(home_pos)
+        self.stopper = stopper
+        self.stopped = False
+
+    def _on_step(self):
+        if self.num_timesteps < self.next_eval:
+            return True
+        self.next_eval += self.eval_every
+        res = self.res
+        snap = actor_snapshot(self.model.policy)
+        score = evaluate_actor(*snap, n_episodes=self.n_episodes, seed=self.seed,
+                               home_pos=self.home_pos)["mean_reward"]
+        res["evals"].append((self.num_timesteps, score))
+        if res["best"] is None or score > res["best"]:
+            res["best"], res["best_step"] = score, self.num_timesteps
+            NumpyPolicy(*snap).save(self.best_path)
+            res["model"] = self.best_path
+        if self.stopper is not None and self.stopper.report(len(res["evals"]) - 1, score):
+            self.stopped = True
+            return False
+        return True
+
+
+def _result(spec, status="ok", error=None):
+    return {"trial": spec["trial"], "config": spec["config"], "status": status, "timesteps": 0,
+            "evals": [], "best": None, "best_step": None, "model": None, "error": error}
+
+
+def run_trial(spec, stopper=None):
+    """Un trial completo en este proceso (worker del pool). Devuelve un dict con el resultado."""
+    res = _result(spec)
+    t0 = time.perf_counter()
+    try:
+        cfg = validate_config(spec["config"])
+    except ValueError as e:
+        res.update(status="invalid", error=str(e))
+        return res
+    best_path = os.path.join(spec["out_dir"], f"trial_{spec['trial']:03d}_best.npz")
+    venv = None
+    try:
+        venv = VecMonitor(make_vec_env(spec["n_envs"], 1, home_pos=spec["home"], max_steps=1000,
+                                       seed=spec["seed"]))
+        model = make_model(venv, spec["seed"], cfg, verbose=0, tensorboard_log=None)
+        # se evalúa con la misma home con la que entrena el trial
+        cb = TrialEvalCallback(res, spec["eval_every"], spec["eval_episodes"], spec["seed"], best_path,
+                               spec["home"], stopper)
+        model.learn(total_timesteps=spec["timesteps"], callback=cb)
+        res["timesteps"] = model.num_timesteps
+        if cb.stopped:
+            res["status"] = "pruned"
+    except Exception as e:
+        res.update(status="error", error=repr(e))
+    finally:
+        if venv is not None:
+            venv.close()
+    res["wall_s"] = time.perf_counter() - t0
+    return res
+
+
+def format_table(results):
+    head = (f"{'#':>3} {'estado':<8} {'mejor':>7} {'paso':>7} {'final':>7} {'pasos':>7} {'s':>6}  config")
+    lines = [head, "-" * (len(head) + 40)]
+    fmt = lambda v, spec: format(v, spec) if v is not None else "-"
+    order = sorted(results, key=lambda r: (r["best"] is None, -(r["best"] or 0.0)))
+    for r in order:
+        final = r["evals"][-1][1] if r["evals"] else None
+        cfg = " ".join(f"{k}={v}" for k, v in r["config"].items())
+        lines.append(f"{r['trial']:>3} {r['status']:<8} {fmt(r['best'], '+7.2f'):>7} "
+                     f"{fmt(r['best_step'], 'd'):>7} {fmt(final, '+7.2f'):>7} {r['timesteps']:>7} "
+                     f"{r.get('wall_s', 0.0):>6.0f}  {cfg}"
+                     + (f"\n    {r['error']}" if r["error"] else ""))
+    return "\n".join(lines)
+
+
+def default_jobs():
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    return max(1, cores or 1)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Búsqueda de hiperparámetros de PPO con parada temprana")
+    ap.add_argument("--mode", default="grid", choices=("grid", "random"))
+    ap.add_argument("--trials", type=int, default=None, help="máximo de trials (random: muestras)")
+    ap.add_argument("--space", default=None, help="JSON {parámetro: [valores]} (por defecto DEFAULT_SPACE)")
+    ap.add_argument("--timesteps", type=int, default=100_000, help="pasos por trial")
+    ap.add_argument("--eval-every", type=int, default=20_000, help="pasos entre evaluaciones de un trial")
+    ap.add_argument("--eval-episodes", type=int, default=EVAL_EPISODES)
+    ap.add_argument("--warmup", type=int, default=WARMUP_EVALS, help="evaluaciones antes de poder parar")
+    ap.add_argument("--min-trials", type=int, default=MIN_TRIALS,
+                    help="trials comparables necesarios para aplicar la mediana")
+    ap.add_argument("--no-stop", action="store_true", help="sin parada temprana")
+    ap.add_argument("--n-envs", type=int, default=8, help="campos simulados por trial")
+    ap.add_argument("--home", type=float, nargs=2, default=(-10.0, 0.0), metavar=("X", "Y"))
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--jobs", type=int, default=None, help="trials simultáneos (por defecto un core cada uno)")
+    ap.add_argument("--out-dir", default=OUT_DIR)
+    args = ap.parse_args()
+
+    space = DEFAULT_SPACE
+    if args.space:
+        with open(args.space) as f:
+            space = json.load(f)
+    configs = build_trials(space, args.mode, args.trials, args.seed)
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    # validación de todas las configs antes de arrancar nada
+    results, specs = [], []
+    for i, cfg in enumerate(configs):
+        try:
+            validate_config(cfg)
+        except ValueError as e:
+            print(f"[WARN] trial {i} descartado: {e}")
+            results.append(_result({"trial": i, "config": cfg}, "invalid", str(e)))
+            continue
+        specs.append({"trial": i, "config": cfg, "timesteps": args.timesteps, "eval_every": args.eval_every,
+                      "eval_episodes": args.eval_episodes, "n_envs": args.n_envs, "home": tuple(args.home),
+                      "seed": args.seed, "out_dir": args.out_dir})
+    jobs = args.jobs or default_jobs()
+    print(f"[INFO] {len(specs)} trials válidos de {len(configs)} ({args.mode}), {jobs} en paralelo, "
+          f"{args.timesteps} pasos cada uno")
+
+    t0 = time.perf_counter()
+    method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+    ctx = mp.get_context(method)
+    with ctx.Manager() as manager:
+        stopper = None
+        if not args.no_stop:
+            stopper = MedianStopper(manager.dict(), manager.Lock(), args.warmup, args.min_trials)
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx, initializer=_init_worker) as pool:
+            futures = {pool.submit(run_trial, s, stopper): s for s in specs}
+            for fut in as_completed(futures):
+                s = futures[fut]
+                try:
+                    r = fut.result()
+                except Exception as e:
+                    r = _result(s, "error", repr(e))
+                results.append(r)
+                best = f"{r['best']:+.2f}" if r["best"] is not None else "-"
+                print(f"[INFO] trial {r['trial']} {r['status']}: mejor {best} en {r['timesteps']} pasos "
+                      f"({len(results)}/{len(configs)})" + (f" — {r['error']}" if r["error"] else ""))
+    elapsed = time.perf_counter() - t0
+
+    table = format_table(results)
+    print()
+    print(table)
+    with open(os.path.join(args.out_dir, "summary.txt"), "w") as f:
+        f.write(table + "\n")
+    with open(os.path.join(args.out_dir, "results.jsonl"), "w") as f:
+        for r in sorted(results, key=lambda r: r["trial"]):
+            f.write(json.dumps(r) + "\n")
+    scored = [r for r in results if r["best"] is not None]
+    if scored:
+        top = max(scored, key=lambda r: r["best"])
+        shutil.copyfile(top["model"], os.path.join(args.out_dir, "sweep_best.npz"))
+        with open(os.path.join(args.out_dir, "sweep_best.json"), "w") as f:
+            json.dump(top["config"], f)
+        print(f"\n[INFO] Mejor: trial {top['trial']} ({top['best']:+.2f}) -> "
+              f"{os.path.join(args.out_dir, 'sweep_best.npz')}")
+    counts = {st: sum(r["status"] == st for r in results) for st in ("ok", "pruned", "invalid", "error")}
+    print(f"[INFO] {len(results)} trials en {elapsed:.1f}s: "
+          + ", ".join(f"{n} {st}" for st, n in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,160 +1,103 @@
 # team_agent_rl.py
-import socket
-import time
-import threading
-import json
-import os
-import re
+import asyncio
 import math
-import numpy as np
-from stable_baselines3 import PPO
-
-SERVER_HOST = "127.0.0.1"
-SERVER_PORT = 6000
-NUM_PLAYERS = 11
-TEAM_NAME = "MY_TEAM"
-CONF_FILE = "conf_file.conf"
-
-INIT_RE = re.compile(r"\(init\s+([lrLR])\s+(\d+)", re.IGNORECASE)
-POS_RE = re.compile(r"\(mypos\s+([\-0-9.]+)\s+([\-0-9.]+)\)", re.IGNORECASE)
-BALL_RE = re.compile(r"\(ball\s+([\-0-9.]+)\s+([\-0-9.]+)", re.IGNORECASE)
-
-MODEL_PATH = "models/ppo_rcss_final.zip"  # modelo entrenado
-
-def load_positions(conf_file):
-    if not os.path.exists(conf_file):
-        raise FileNotFoundError(f"No se encontró {conf_file}")
-    with open(conf_file, "r") as f:
-        data = json.load(f)
-    positions = {}
-    for i in range(1, NUM_PLAYERS + 1):
-        entry = data["data"][0].get(str(i))
-        if entry is None:
-            raise KeyError(f"No hay posición para '{i}' en {conf_file}")
-        positions[i] = (float(entry["x"]), float(entry["y"]))
-    return positions
-
-def safe_send(sock, text):
-    try:
-        sock.sendto(text.encode(), (SERVER_HOST, SERVER_PORT))
-    except:
-        pass
-
-# Cargar modelo una sola vez (política compartida)
-MODEL = None
-if os.path.exists(MODEL_PATH):
-    MODEL = PPO.load(MODEL_PATH)
-    print("[INFO] Modelo RL cargado:", MODEL_PATH)
+import os
+from field_sim import build_obs, build_team_obs, role_features, OBS_DIM, TEAM_OBS_DIM
+from instrumentation import span, INFER
+from numpy_policy import lazy_policy
+from policy_cache import PolicyCache, DEFAULT_RESOLUTION, TEAM_RESOLUTION
+from policy_server import BatchedPolicyServer
+from team_runtime import Strategy, TEAM_NAME, SEED, CONF_FILE, main as run_main
+
+# modelo entrenado (se usa el .npz exportado si existe); RCSS_MODEL lo cambia (evaluate.py)
+MODEL_PATH = os.environ.get("RCSS_MODEL", "models/ppo_rcss_final.zip")
+BATCH_DEADLINE = 0.010  # espera máxima del batch de inferencia (s)
+STATS_EVERY = 10  # cada cuántos segundos imprimir contadores de inferencia
+DETERMINISTIC = False  # True: acción argmax (activa la caché obs -> acción)
+CACHE_SIZE = 4096  # entradas del LRU de acciones (sólo en modo determinista)
+# política de equipo (train_rl.py --team): la obs lleva además home y rol
+ROLE_OBS = os.environ.get("RCSS_ROLE_OBS", "0") == "1"
+ROLE_NAMES = None
+if ROLE_OBS:
+    # sólo la política de equipo necesita los roles del conf
+    from formation import load_roles
+    ROLE_NAMES = load_roles(CONF_FILE)[1]
+
+# Modelo compartido; se carga en segundo plano mientras los jugadores se conectan
+MODEL = lazy_policy(MODEL_PATH, seed=SEED)
+if MODEL is not None:
+    print("[INFO] Modelo RL encontrado:", MODEL_PATH)
 else:
     print("[WARN] Modelo no encontrado en", MODEL_PATH, "— ejecuta train_rl.py primero para generar uno.")
 
-def player_thread(idx, positions):
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind(("", 0))
-    sock.settimeout(0.5)
-
-    safe_send(sock, f"(init {TEAM_NAME})")
-
-    side = None
-    unum = None
-    init_buf = ""
-    t0 = time.time()
-    while time.time() - t0 < 5:
-        try:
-            data, _ = sock.recvfrom(8192)
-            msg = data.decode(errors="ignore")
-            init_buf += msg
-            m = INIT_RE.search(init_buf)
-            if m:
-                side = m.group(1).lower()
-                unum = int(m.group(2))
-                break
-        except socket.timeout:
-            continue
-
-    if unum is None:
-        sock.close()
-        return
-
-    target_pos = positions.get(unum) or positions.get(idx) or (-40.0, 0.0)
-    if side == "r":
-        target_pos = (-target_pos[0], target_pos[1])
-    home_x, home_y = float(target_pos[0]), float(target_pos[1])
-
-    # mandar move inicial
-    for _ in range(6):
-        safe_send(sock, f"(move {home_x:.2f} {home_y:.2f})")
-        time.sleep(0.08)
-
-    px, py = home_x, home_y
-    ballx, bally = 0.0, 0.0
-    last_ball_dist = math.hypot(ballx-px, bally-py)
-
-    while True:
-        # recolectar mensajes
-        try:
-            data, _ = sock.recvfrom(8192)
-            msg = data.decode(errors="ignore")
-        except socket.timeout:
-            msg = ""
-        # actualizar pos y pelota si vienen
-        mpos = POS_RE.search(msg)
-        if mpos:
-            px = float(mpos.group(1)); py = float(mpos.group(2))
-        mball = BALL_RE.search(msg)
-        if mball:
-            ballx = float(mball.group(1)); bally = float(mball.group(2))
+# Un solo servidor de inferencia por lotes para los 11 jugadores
+# con caché de acciones delante (se invalida sola si cambia el modelo en disco)
+POLICY = (PolicyCache(BatchedPolicyServer(MODEL, deadline=BATCH_DEADLINE,
+                                          obs_dim=TEAM_OBS_DIM if ROLE_OBS else OBS_DIM),
+                      MODEL, resolution=TEAM_RESOLUTION if ROLE_OBS else DEFAULT_RESOLUTION,
+                      max_size=CACHE_SIZE)
+          if MODEL is not None else None)
+
+class RLStrategy(Strategy):
+    name = "rl"
+
+    def on_start(self, player):
+        # rasgos de rol con la home real (reflejada si jugamos en el lado r)
+        self.role_feat = None
+        if ROLE_OBS:
+            name = ROLE_NAMES[player.unum - 1] if player.unum <= len(ROLE_NAMES) else "Unknown"
+            self.role_feat = role_features([name], [(player.home_x, player.home_y)])[0]
+
+    async def step(self, player):
+        # pos y pelota estimadas por el runtime para cuando se ejecuten los comandos
+        px, py = player.est_x, player.est_y
+        ballx, bally = player.est_ballx, player.est_bally
+        home_x, home_y = player.home_x, player.home_y
 
         dx = ballx - px; dy = bally - py
-        dist_home = math.hypot(px-home_x, py-home_y)
 
-        obs = np.array([px, py, ballx, bally, dx, dy, dist_home/60.0], dtype=np.float32)
+        obs = build_obs(px, py, ballx, bally, home_x, home_y)
+        if self.role_feat is not None:
+            obs = build_team_obs(obs, self.role_feat)
 
         # si no hay modelo, fallback a comportamiento heurístico
-        if MODEL is None:
+        if POLICY is None:
             # heurística simple: si cerca del balón, ir; si lejos, mantener home
             if math.hypot(dx,dy) < 10.0:
-                safe_send(sock, f"(move {ballx:.2f} {bally:.2f})")
-                safe_send(sock, "(dash 60)")
+                player.move(ballx, bally)
+                player.dash(60)
             else:
-                safe_send(sock, f"(move {home_x:.2f} {home_y:.2f})")
-            time.sleep(0.12)
-            continue
+                player.move(home_x, home_y)
+            return
 
-        # usar modelo para predecir acción
-        action, _ = MODEL.predict(obs, deterministic=False)
+        # usar modelo para predecir acción (batch compartido con el resto del equipo)
+        with span(player.metrics, INFER):
+            action = await POLICY.predict_async(obs, deterministic=DETERMINISTIC)
+        player.action = action
         # mapear acción discreta a comandos
         if action == 0:
-            safe_send(sock, f"(move {ballx:.2f} {bally:.2f})")
-            safe_send(sock, "(dash 60)")
+            player.move(ballx, bally)
+            player.dash(60)
         elif action == 1:
-            safe_send(sock, "(dash 75)")
+            player.dash(75)
         elif action == 2:
-            safe_send(sock, "(turn -30)")
-            safe_send(sock, "(dash 40)")
+            player.turn(-30)
+            player.dash(40)
         elif action == 3:
-            safe_send(sock, "(turn 30)")
-            safe_send(sock, "(dash 40)")
+            player.turn(30)
+            player.dash(40)
         elif action == 4:
-            safe_send(sock, f"(move {home_x:.2f} {home_y:.2f})")
-            safe_send(sock, "(dash 55)")
+            player.move(home_x, home_y)
+            player.dash(55)
 
-        time.sleep(0.09)
+async def report_stats():
+    while True:
+        await asyncio.sleep(STATS_EVERY)
+        print("[INFO]", POLICY.format_stats())
 
 def main():
-    positions = load_positions(CONF_FILE)
-    threads = []
-    for i in range(1, NUM_PLAYERS+1):
-        t = threading.Thread(target=player_thread, args=(i, positions), daemon=True)
-        t.start()
-        threads.append(t)
-        time.sleep(0.12)
-    print("[INFO] Equipo RL arrancado. Ctrl-C para parar.")
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("Detenido.")
+    run_main(RLStrategy, TEAM_NAME, banner="Equipo RL arrancado",
+             background=report_stats if POLICY is not None else None, policy=MODEL)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,709 @@
+# team_runtime.py
+# Runtime asyncio de un solo proceso: los 11 jugadores (o varios equipos)
+# comparten un event loop, cada jugador es una corrutina con su propio
+# socket UDP y un único lector por socket (loop.add_reader), que recibe en
+# un buffer preasignado (recvfrom_into) y sólo extrae mypos / ball.
+# Los comportamientos (random con límites, RL, 4-3-3 híbrido) se enchufan
+# como objetos Strategy.
+import asyncio
+import importlib
+import json
+import math
+import os
+import random
+import re
+import socket
+import sys
+import time
+from collections import deque
+
+import command_buffer
+import instrumentation as instr
+from command_buffer import CommandBuffer
+from cycle_scheduler import CycleClock, DECISION_OFFSET
+from field_sim import build_obs
+from match_recorder import get_recorder, close_recorder
+from receive_stage import LatestInbox, message_key
+from sexp_parser import RecvBuffer, parse_message, scan_percept, scan_play_mode
+from state_estimator import TeamEstimator
+from world_model import WorldModel, OWN_BALL_STALE
+
+SERVER_HOST = os.environ.get("RCSS_HOST", "127.0.0.1")
+SERVER_PORT = int(os.environ.get("RCSS_PORT", "6000"))
+NUM_PLAYERS = 11
+TEAM_NAME = os.environ.get("RCSS_TEAM", "MY_TEAM")
+# semilla de la parte aleatoria de los agentes (random, muestreo de la política)
+SEED = int(os.environ["RCSS_SEED"]) if os.environ.get("RCSS_SEED") else None
+CONF_FILE = "conf_file.conf"
+INIT_TIMEOUT = 5.0
+# reintento del (init) si no llega respuesta (p.ej. el server aún no arrancó):
+# primera espera y tope del backoff exponencial
+INIT_RETRY = 0.1
+INIT_RETRY_MAX = 1.0
+# el (move) inicial se repite sólo hasta que mypos lo confirma
+MOVE_RETRIES = 6
+MOVE_TOLERANCE = 0.5
+STARTUP_TARGET = 0.500  # objetivo: todos colocados a los 500 ms del lanzamiento
+
+INIT_RE = re.compile(r"\(init\s+([lrLR])\s+(\d+)", re.IGNORECASE)
+# respuesta a (reconnect TEAM UNUM): (reconnect l play_on)
+RECONNECT_RE = re.compile(r"\(reconnect\s+([lrLR])\s+([\w]+)", re.IGNORECASE)
+
+# variantes disponibles para scrimmages: nombre -> "modulo:Clase"
+STRATEGIES = {
+    "random": "team_agent:RandomBoundedStrategy",
+    "rl": "team_agent_rl:RLStrategy",
+    "433": "team_agent_433:Hybrid433Strategy",
+}
+
+
+def load_positions(conf_file, num_players=NUM_PLAYERS):
+    if not os.path.exists(conf_file):
+        raise FileNotFoundError(f"No se encontró {conf_file}")
+    with open(conf_file, "r") as f:
+        data = json.load(f)
+    positions = {}
+    for i in range(1, num_players + 1):
+        entry = data["data"][0].get(str(i))
+        if entry is None:
+            raise KeyError(f"No hay posición para '{i}' en {conf_file}")
+        positions[i] = (float(entry["x"]), float(entry["y"]))
+    return positions
+
+
+def _process_start():
+    """perf_counter del lanzamiento del proceso (/proc), o el de ahora si no se puede."""
+    now = time.perf_counter()
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return now - max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return now
+
+
+class StartupTimer:
+    """
+    Desglose del arranque: imports, formación, init (todos los handshakes),
+    colocación (todos los move confirmados) y carga del modelo, en ms desde
+    el lanzamiento del proceso. Se imprime una vez, al colocarse el último.
+    """
+
+    def __init__(self):
+        self.t0 = _process_start()
+        self.marks = {}
+        self.expected = 0
+        self.counts = {}
+        self.policy = None
+        self.reported = False
+
+    def mark(self, phase):
+        self.marks.setdefault(phase, time.perf_counter())
+
+    def expect(self, n_players):
+        self.expected += n_players
+
+    def player_done(self, phase, ok=True):
+        """Un jugador terminó 'init' o 'colocación' (ok=False si falló)."""
+        done, good = self.counts.get(phase, (0, 0))
+        self.counts[phase] = (done + 1, good + bool(ok))
+        if done + 1 == self.expected:
+            self.mark(phase)
+            if phase == "colocación":
+                self.report()
+
+    def format(self):
+        parts = []
+        prev = self.t0
+        for phase in ("imports", "formación", "init", "colocación"):
+            t = self.marks.get(phase)
+            if t is None:
+                continue
+            txt = f"{phase} +{(t - prev) * 1000.0:.1f}ms"
+            if phase in self.counts:
+                txt += f" ({self.counts[phase][1]}/{self.counts[phase][0]})"
+            parts.append(txt)
+            prev = t
+        total = prev - self.t0
+        line = " | ".join(parts) + f" -> total {total * 1000.0:.0f}ms"
+        if self.policy is not None:
+            secs = self.policy.load_seconds
+            line += (f" | modelo {secs * 1000.0:.1f}ms en segundo plano" if secs is not None
+                     else " | modelo cargando")
+        if "colocación" in self.marks:
+            line += " ✔" if total <= STARTUP_TARGET else f" (objetivo {STARTUP_TARGET * 1000:.0f}ms)"
+        return line
+
+    def report(self):
+        if not self.reported:
+            self.reported = True
+            print("[INFO] Arranque:", self.format())
+
+
+STARTUP = StartupTimer()
+
+
+class Strategy:
+    """Comportamiento de un jugador. Se crea una instancia por jugador
+    (la clase misma sirve de factory para run_team)."""
+
+    name = "base"
+
+    def on_start(self, player):
+        """Se llama una vez, con el jugador ya colocado en su home."""
+
+    async def step(self, player):
+        """
+        Decisión de un ciclo. El runtime la llama en el punto de decisión del
+        ciclo con la percepción ya actualizada; para esperar varios ciclos se
+        usa player.idle(n) en vez de dormir.
+        """
+        raise NotImplementedError
+
+
+class Player:
+    """Estado de un jugador: socket, identidad, home y última percepción."""
+
+    def __init__(self, idx, team_name=TEAM_NAME, host=SERVER_HOST, port=SERVER_PORT,
+                 decision_offset=DECISION_OFFSET, world=None, estimator=None):
+        self.idx = idx
+        self.team_name = team_name
+        self.server_addr = (host, port)
+        self.transport = None   # socket UDP no bloqueante (sendto para los comandos)
+        self.rbuf = RecvBuffer()
+        self._loop = None
+        self.inbox = LatestInbox()
+        self._arrival = asyncio.Event()
+        self.clock = CycleClock(decision_offset)
+        # comandos del ciclo (un datagrama por ciclo) y comandos de cuerpo
+        # que no entraron en su ciclo (salen uno por ciclo)
+        self.commands = CommandBuffer()
+        self.plan = deque()
+        self.idle_cycles = 0
+
+        self.side = None
+        self.unum = None
+        self.home_x, self.home_y = -40.0, 0.0
+        self.px, self.py = self.home_x, self.home_y
+        self.ballx, self.bally = 0.0, 0.0
+        self.pos_time = time.monotonic()
+        # modelo del mundo del equipo (world_model), slot = índice - 1;
+        # observaciones propias con su hora (0 = nunca) para publicarlas
+        self.world = world
+        self.slot = idx - 1
+        self.seen_pos_time = 0.0
+        self.own_ball = (0.0, 0.0)
+        self.ball_time = 0.0
+        # filtro de Kalman del equipo (state_estimator): posición propia y
+        # del balón previstas para cuando se ejecuten los comandos del ciclo
+        self.estimator = estimator
+        self.est_x, self.est_y = self.px, self.py
+        self.est_ballx, self.est_bally = self.ballx, self.bally
+        self.play_mode = None
+        self.parse_misses = 0
+        self.recv_timeouts = 0
+        # latencias por etapa (instrumentation); None si está desactivado
+        self.metrics = instr.new_player_metrics(team_name, idx, self.counters)
+        # grabación del partido (match_recorder); None si está desactivada.
+        # action: acción discreta de la política en esta decisión (-1 = ninguna)
+        self.recorder = get_recorder()
+        self.action = -1
+
+    # ---------- red ----------
+    def open(self, loop):
+        """Crea el socket del jugador y registra su lector en el loop."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        sock.bind(("0.0.0.0", 0))
+        self.transport = sock
+        self._loop = loop
+        loop.add_reader(sock.fileno(), self.on_readable)
+
+    def on_readable(self):
+        """Lee todo lo pendiente en el socket, datagrama a datagrama, en el mismo buffer."""
+        recv_into = self.transport.recvfrom_into
+        buf = self.rbuf.buf
+        while True:
+            try:
+                n, addr = recv_into(buf)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # ICMP port unreachable, etc.: el server todavía no está o se cayó
+                return
+            self.on_datagram(n, addr)
+
+    def on_datagram(self, n, addr):
+        """
+        Datagrama de n bytes en self.rbuf. Al buzón va sólo lo que se usa:
+        (x, y, ball_x, ball_y) de see / sense_body, el modo de juego de los
+        hear del árbitro y, para init, error y demás tipos poco frecuentes,
+        el datagrama copiado entero.
+        """
+        # el server contesta desde un puerto propio por jugador: a partir
+        # del init los comandos van a esa dirección
+        m = self.metrics
+        if m is not None:
+            t0 = time.perf_counter_ns()
+        self.server_addr = addr
+        t = time.monotonic()
+        buf = self.rbuf.buf
+        # on_message sólo mira la cabecera y el tiempo: lo que queda en el
+        # buffer después de los n bytes no le afecta
+        self.clock.on_message(buf, t)
+        view = self.rbuf.view[:n]
+        key = message_key(view)
+        if key is None:
+            # los hear de otros jugadores (sin colapsar) no se usan: no se copian
+            item = None if buf.startswith(b"(hear ", 0, n) else bytes(view)
+        elif key.startswith(b"hear"):
+            # sólo interesa el árbitro; los hear de jugadores dan None y no se guardan
+            item = scan_play_mode(buf, n)
+        else:
+            item = scan_percept(buf, n)
+            if item is None and key != b"fullstate":
+                self.parse_misses += 1
+        if item is not None:
+            self.inbox.put_keyed(key, item, t)
+            self._arrival.set()
+        if m is not None:
+            m.record(instr.RECV, time.perf_counter_ns() - t0)
+
+    def send(self, cmd):
+        """
+        Encola un comando (str o bytes) para el datagrama del ciclo. Los de
+        cuerpo (dash/turn/move/kick...) salen como mucho uno por ciclo: si ya
+        hay otro en este ciclo, queda en el plan y se manda en los ciclos
+        siguientes; si repite uno ya pendiente se descarta.
+        """
+        if isinstance(cmd, str):
+            cmd = command_buffer.encode(cmd)
+        buf = self.commands
+        if not buf.add(cmd):
+            if cmd == buf.body or cmd in self.plan:
+                buf.drop(cmd)
+            else:
+                self.plan.append(cmd)
+
+    # atajos con formato directo a bytes (sin f-string + encode)
+    def dash(self, power):
+        self.send(command_buffer.dash(power))
+
+    def turn(self, moment):
+        self.send(command_buffer.turn(moment))
+
+    def move(self, x, y):
+        self.send(command_buffer.move(x, y))
+
+    def kick(self, power, direction):
+        self.send(command_buffer.kick(power, direction))
+
+    def flush(self):
+        """Manda los comandos encolados en un solo datagrama."""
+        if self.transport is None or not len(self.commands):
+            return
+        m = self.metrics
+        if m is None:
+            self.commands.flush(self.transport, self.server_addr)
+            return
+        t0 = time.perf_counter_ns()
+        self.commands.flush(self.transport, self.server_addr)
+        m.record(instr.SEND, time.perf_counter_ns() - t0)
+
+    def record(self, obs, raw):
+        """Graba la decisión del ciclo: obs previa (estimada y cruda), acción y comandos decididos."""
+        cmd = self.commands.pending()
+        if self.plan:
+            cmd += b"".join(self.plan)
+        self.recorder.append(time.monotonic(), self.clock.cycle, self.unum,
+                             self.side.encode() if self.side else b"", self.action, obs, raw, cmd)
+
+    def idle(self, cycles):
+        """No decidir durante 'cycles' ciclos una vez vaciado el plan."""
+        self.idle_cycles = int(cycles)
+
+    async def next_decision(self):
+        """
+        Espera el punto de decisión del ciclo y vacía el buzón. Devuelve True
+        si la estrategia tiene que decidir en este ciclo; False si el ciclo ya
+        se usó para un comando pendiente del plan o es un ciclo de espera.
+        Antes de esperar manda lo que dejó encolado la decisión anterior.
+        """
+        self.flush()
+        await self.clock.wait_decision()
+        m = self.metrics
+        if m is not None:
+            # retraso sobre el punto de decisión previsto del ciclo
+            lag = time.monotonic() - self.clock.cycle_start - self.clock.offset
+            m.record(instr.LAG, int(lag * 1e9))
+        self.drain()
+        self.estimate()
+        if self.plan:
+            self.commands.add(self.plan.popleft())
+            self.flush()
+            return False
+        if self.idle_cycles > 0:
+            self.idle_cycles -= 1
+            return False
+        return True
+
+    def drain(self):
+        """
+        Vacía el buzón quedándose con el último mensaje de cada tipo y los
+        aplica al estado en orden de llegada. Devuelve cuántos se aplicaron.
+        """
+        msgs = self.inbox.drain()
+        m = self.metrics
+        if m is None:
+            for t, data in msgs:
+                self.update_from(data, t)
+        else:
+            for t, data in msgs:
+                t0 = time.perf_counter_ns()
+                self.update_from(data, t)
+                m.record(instr.PARSE, time.perf_counter_ns() - t0)
+        if self.world is not None:
+            self.share_world()
+        return len(msgs)
+
+    def share_world(self, now=None):
+        """
+        Publica la percepción propia en el modelo del mundo y, si este jugador
+        no ve el balón desde hace más de OWN_BALL_STALE, usa la estimación
+        fusionada de los compañeros (si es más nueva que la suya).
+        """
+        now = time.monotonic() if now is None else now
+        bx, by = self.own_ball
+        self.world.publish(self.slot, self.unum, self.clock.cycle, self.px, self.py,
+                           self.seen_pos_time, bx, by, self.ball_time)
+        if now - self.ball_time > OWN_BALL_STALE:
+            est = self.world.fused_ball(now)
+            if est is not None and est.time > self.ball_time:
+                self.ballx, self.bally = est.x, est.y
+                if self.estimator is not None:
+                    self.estimator.observe_ball(self.slot, est.x, est.y, est.time)
+
+    def estimate(self):
+        """
+        Rellena est_x/est_y/est_ballx/est_bally: la predicción del filtro al
+        final del ciclo actual (cuando el server ejecuta lo que se mande
+        ahora) o, sin filtro u observaciones, los últimos valores.
+        """
+        self.est_x, self.est_y = self.px, self.py
+        self.est_ballx, self.est_bally = self.ballx, self.bally
+        est = self.estimator
+        if est is None or self.clock.cycle_start is None:
+            return
+        x, y, bx, by = est.predict(self.slot, self.clock.cycle_start + self.clock.cycle_len)
+        if est.has_self(self.slot):
+            self.est_x, self.est_y = x, y
+        if est.has_ball(self.slot):
+            self.est_ballx, self.est_bally = bx, by
+
+    async def recv(self, timeout):
+        """Mensajes pendientes del server como str, o "" si vence el timeout."""
+        if not len(self.inbox):
+            self._arrival.clear()
+            try:
+                await asyncio.wait_for(self._arrival.wait(), timeout)
+            except asyncio.TimeoutError:
+                self.recv_timeouts += 1
+                return ""
+        # el handshake sólo busca (init ...) / (reconnect ...), que llegan enteros
+        return "".join(data.decode(errors="ignore") for _, data in self.inbox.drain()
+                       if isinstance(data, bytes))
+
+    def counters(self):
+        """Contadores del jugador para el export de métricas."""
+        return {
+            "missed_cycles": self.clock.missed_cycles,
+            "extrapolated_cycles": self.clock.extrapolated_cycles,
+            "recv_timeouts": self.recv_timeouts,
+            "parse_misses": self.parse_misses,
+            "inbox_dropped": self.inbox.total_dropped,
+            "commands_dropped": self.commands.dropped,
+        }
+
+    # ---------- percepción ----------
+    def update_from(self, item, t=None):
+        """
+        Aplica al estado una entrada del buzón (ver on_datagram): la tupla
+        (x, y, ball_x, ball_y) de scan_percept, el modo de juego (str) de un
+        hear del árbitro o un datagrama entero (bytes), que se parsea con
+        parse_message. t: hora de llegada (la de la observación para el
+        filtro). Devuelve True si actualizó la posición propia.
+        """
+        if isinstance(item, str):
+            self.play_mode = item
+            return False
+        if isinstance(item, (bytes, bytearray)):
+            msg = parse_message(item)
+            if msg is None:
+                self.parse_misses += 1
+                return False
+            kind = msg.kind
+            if kind == "hear":
+                if msg.sender == b"referee":
+                    self.play_mode = msg.message.decode(errors="ignore")
+                return False
+            if kind == "init":
+                self.play_mode = msg.play_mode
+                return False
+            item = (msg.x, msg.y, msg.ball_x, msg.ball_y)
+        x, y, bx, by = item
+        now = time.monotonic()
+        if t is None:
+            t = now
+        est = self.estimator
+        if bx is not None:
+            self.ballx, self.bally = bx, by
+            self.own_ball = (bx, by)
+            self.ball_time = now
+            if est is not None:
+                est.observe_ball(self.slot, bx, by, t)
+        if x is not None:
+            self.px, self.py = x, y
+            self.pos_time = self.seen_pos_time = now
+            if est is not None:
+                est.observe_self(self.slot, x, y, t)
+            return True
+        return False
+
+    def close(self):
+        if self.transport is not None:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.remove_reader(self.transport.fileno())
+            self.transport.close()
+            self.transport = None
+
+
+async def handshake(player, timeout=INIT_TIMEOUT, unum=None):
+    """
+    Manda (init TEAM) y espera la respuesta con side/unum. Si no hay
+    respuesta se reenvía con backoff exponencial (INIT_RETRY..INIT_RETRY_MAX):
+    cubre datagramas perdidos y el server que todavía no escucha.
+    Con unum se manda (reconnect TEAM unum) para recuperar un jugador que
+    ya estaba en el campo (p.ej. tras reiniciar su proceso).
+    """
+    if unum is None:
+        cmd, regex = f"(init {player.team_name})", INIT_RE
+    else:
+        cmd, regex = f"(reconnect {player.team_name} {unum})", RECONNECT_RE
+    init_buf = ""
+    t_end = time.monotonic() + timeout
+    retry = INIT_RETRY
+    while time.monotonic() < t_end:
+        player.send(cmd)
+        player.flush()
+        t_retry = min(t_end, time.monotonic() + retry)
+        retry = min(retry * 2, INIT_RETRY_MAX)
+        while time.monotonic() < t_retry:
+            init_buf += await player.recv(t_retry - time.monotonic())
+            m = regex.search(init_buf)
+            if m:
+                player.side = m.group(1).lower()
+                if unum is None:
+                    player.unum = int(m.group(2))
+                else:
+                    player.unum = unum
+                    player.play_mode = m.group(2)
+                return True
+    return False
+
+
+async def move_home(player, retries=MOVE_RETRIES, tol=MOVE_TOLERANCE):
+    """
+    Coloca al jugador en su home con (move), uno por ciclo. Se reenvía sólo
+    mientras la posición informada (mypos) no lo confirme; sin mypos (server
+    estándar) se manda 'retries' veces como antes. True si se confirmó.
+    """
+    cmd = command_buffer.move(player.home_x, player.home_y)
+    for _ in range(retries):
+        t_sent = time.monotonic()
+        player.send(cmd)
+        # el sense_body del ciclo siguiente ya trae la posición tras el move
+        await player.next_decision()
+        if (player.pos_time > t_sent and
+                math.hypot(player.px - player.home_x, player.py - player.home_y) <= tol):
+            return True
+    return False
+
+
+async def run_player(idx, strategy_factory, positions, team_name=TEAM_NAME,
+                     host=SERVER_HOST, port=SERVER_PORT, decision_offset=DECISION_OFFSET,
+                     reconnect_unum=None, on_init=None, world=None, estimator=None):
+    """
+    Un jugador completo: handshake, colocación y bucle de decisión.
+    reconnect_unum: reconectar como ese dorsal en vez de hacer (init).
+    on_init(idx, unum): aviso opcional tras el handshake.
+    world: WorldModel del equipo (compartido con los compañeros).
+    estimator: TeamEstimator del proceso (filtro vectorizado de los jugadores).
+    """
+    loop = asyncio.get_running_loop()
+    player = Player(idx, team_name, host, port, decision_offset, world, estimator)
+    player.open(loop)
+
+    try:
+        if not await handshake(player, unum=reconnect_unum):
+            print(f"[{team_name} {idx}] ❌ No se detectó init.")
+            STARTUP.player_done("init", ok=False)
+            STARTUP.player_done("colocación", ok=False)
+            return
+        STARTUP.player_done("init")
+        if on_init is not None:
+            on_init(idx, player.unum)
+        if reconnect_unum is None:
+            print(f"[{team_name} {idx}] Init detectado: side={player.side}, unum={player.unum}")
+        else:
+            print(f"[{team_name} {idx}] Reconectado: side={player.side}, unum={player.unum}, "
+                  f"modo={player.play_mode}")
+
+        x, y = positions.get(player.unum) or positions.get(idx) or (-40.0, 0.0)
+        # reflejar si el equipo está en el lado derecho
+        if player.side == "r":
+            x = -x
+        player.home_x, player.home_y = float(x), float(y)
+        player.px, player.py = player.home_x, player.home_y
+
+        if reconnect_unum is None:
+            STARTUP.player_done("colocación", await move_home(player))
+        else:
+            # con el partido en juego el move no vale: el jugador sigue donde estaba
+            STARTUP.player_done("colocación")
+
+        strategy = strategy_factory()
+        strategy.on_start(player)
+        m = player.metrics
+        rec = player.recorder
+        while True:
+            if await player.next_decision():
+                if rec is not None:
+                    # la obs con la que decide la estrategia (posiciones
+                    # estimadas) y, aparte, la observación cruda para evaluar
+                    # el estimador (benchmarks/eval_estimator.py)
+                    obs = build_obs(player.est_x, player.est_y, player.est_ballx, player.est_bally,
+                                    player.home_x, player.home_y)
+                    raw = (player.px, player.py, player.ballx, player.bally)
+                    player.action = -1
+                if m is None:
+                    await strategy.step(player)
+                else:
+                    t0 = time.perf_counter_ns()
+                    await strategy.step(player)
+                    m.record(instr.DECIDE, time.perf_counter_ns() - t0)
+                if rec is not None:
+                    player.record(obs, raw)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"[{team_name} {idx}] jugador detenido: {e!r}")
+    finally:
+        if player.clock.active:
+            print(f"[{team_name} {idx}] ciclos={player.clock.cycle} "
+                  f"perdidos={player.clock.missed_cycles} extrapolados={player.clock.extrapolated_cycles} "
+                  f"{player.inbox.format_stats()} {player.commands.format_stats()}")
+        player.close()
+
+
+async def run_team(strategy_factory, positions=None, team_name=TEAM_NAME,
+                   host=SERVER_HOST, port=SERVER_PORT, num_players=NUM_PLAYERS,
+                   decision_offset=DECISION_OFFSET, players=None, reconnect=None, on_init=None,
+                   world=None):
+    """
+    Lanza los jugadores de un equipo como corrutinas del loop actual.
+    players: índices a lanzar (por defecto 1..num_players); reconnect:
+    {índice: dorsal} de los que tienen que reconectarse (ver run_player).
+    world: WorldModel compartido entre procesos (team_supervisor); si no se
+    pasa se crea uno para este equipo.
+    """
+    if positions is None:
+        positions = load_positions(CONF_FILE, num_players)
+    if players is None:
+        players = range(1, num_players + 1)
+    reconnect = reconnect or {}
+    own_world = world is None
+    if own_world:
+        world = WorldModel(num_players)
+    # un filtro para todos los jugadores del proceso (pistas por índice)
+    estimator = TeamEstimator(num_players)
+    STARTUP.expect(len(players))
+    instr.start_exporter()
+    try:
+        await asyncio.gather(*(
+            run_player(i, strategy_factory, positions, team_name, host, port, decision_offset,
+                       reconnect.get(i), on_init, world, estimator)
+            for i in players
+        ))
+    finally:
+        if own_world:
+            world.close()
+            world.unlink()
+
+
+async def run_teams(teams, host=SERVER_HOST, port=SERVER_PORT):
+    """Varios equipos en el mismo proceso: teams = [(team_name, strategy_factory), ...]."""
+    positions = load_positions(CONF_FILE)
+    STARTUP.mark("formación")
+    await asyncio.gather(*(
+        run_team(factory, positions, name, host, port) for name, factory in teams
+    ))
+
+
+def resolve_strategy(variant):
+    """'433' -> clase Strategy (import perezoso del módulo del agente)."""
+    spec = STRATEGIES.get(variant, variant)
+    module_name, _, cls_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), cls_name)
+
+
+def main(strategy_factory, team_name=TEAM_NAME, banner="Equipo arrancado", background=None,
+         policy=None):
+    """Entrada de los agentes: un equipo en un solo event loop.
+    background: corrutina opcional que corre junto al equipo (p.ej. contadores).
+    policy: LazyPolicy opcional; se empieza a cargar en paralelo a los handshakes."""
+    STARTUP.mark("imports")
+    if SEED is not None:
+        random.seed(SEED)
+    if policy is not None:
+        STARTUP.policy = policy.prefetch()
+    try:
+        positions = load_positions(CONF_FILE)
+    except Exception as e:
+        print("ERROR cargando conf:", e)
+        return
+    STARTUP.mark("formación")
+
+    async def _run():
+        tasks = [run_team(strategy_factory, positions, team_name)]
+        if background is not None:
+            tasks.append(background())
+        await asyncio.gather(*tasks)
+
+    print(f"[INFO] {banner}. Ctrl-C para parar.")
+    try:
+        asyncio.run(_run())
+    except KeyboardInterrupt:
+        print("Detenido.")
+    finally:
+        close_recorder()
+
+
+if __name__ == "__main__":
+    # scrimmage: python team_runtime.py EQUIPO_A=433 EQUIPO_B=random
+    if len(sys.argv) < 2:
+        print("uso: python team_runtime.py NOMBRE=variante [NOMBRE=variante ...]")
+        print("variantes:", ", ".join(STRATEGIES))
+        sys.exit(1)
+    specs = []
+    for arg in sys.argv[1:]:
+        name, _, variant = arg.partition("=")
+        specs.append((name, resolve_strategy(variant or "random")))
+    STARTUP.mark("imports")
+    try:
+        asyncio.run(run_teams(specs))
+    except KeyboardInterrupt:
+        print("Detenido.")
+    finally:
+        close_recorder()
@@ -0,0 +1,226 @@
+# team_supervisor.py
+# Lanzador del equipo: carga el módulo del agente, el modelo y la formación
+# una sola vez y hace fork de procesos worker, cada uno con un grupo de
+# jugadores en su propio event loop (team_runtime.run_team). Los pesos se
+# comparten entre workers copy-on-write (y el .npz mapeado, vía page cache).
+# Cada worker se fija a un core; si un worker muere se relanza sólo ese,
+# reconectando a sus jugadores con (reconnect TEAM UNUM).
+#
+#   python team_supervisor.py [--variant rl] [--players-per-proc 4] [--no-pin]
+import argparse
+import asyncio
+import math
+import multiprocessing as mp
+import os
+import signal
+import sys
+import time
+from multiprocessing.connection import wait
+
+import team_runtime
+from match_recorder import close_recorder
+from team_runtime import (CONF_FILE, NUM_PLAYERS, SERVER_HOST, SERVER_PORT, STRATEGIES, TEAM_NAME,
+                          StartupTimer, load_positions, resolve_strategy, run_team)
+from world_model import WorldModel
+
+MAX_RESTARTS = 5        # reinicios por worker dentro de RESTART_WINDOW
+RESTART_WINDOW = 60.0   # s
+RESTART_DELAY = 0.5     # s de espera antes de relanzar un worker caído
+
+
+def _terminate(signum, frame):
+    raise SystemExit(0)
+
+
+def _worker_main(conn, strategy_factory, positions, players, reconnect, core, team_name,
+                 host, port, generation, world):
+    """Proceso worker: un event loop con sus jugadores."""
+    if core is not None:
+        try:
+            os.sched_setaffinity(0, {core})
+        except OSError:
+            pass
+    if generation > 0:
+        # un reinicio mide su arranque desde el fork, no desde el supervisor
+        team_runtime.STARTUP = StartupTimer()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # el supervisor gestiona Ctrl-C
+    # terminate() del supervisor: salir ordenadamente para volcar la grabación
+    signal.signal(signal.SIGTERM, _terminate)
+
+    def on_init(idx, unum):
+        try:
+            conn.send((idx, unum))
+        except (BrokenPipeError, OSError):
+            pass
+
+    try:
+        asyncio.run(run_team(strategy_factory, positions, team_name, host, port,
+                             players=players, reconnect=reconnect, on_init=on_init, world=world))
+    finally:
+        close_recorder()
+        conn.close()
+
+
+class _Worker:
+    """Estado de un worker en el supervisor."""
+
+    def __init__(self, wid, players, core):
+        self.wid = wid
+        self.players = list(players)
+        self.core = core
+        self.unums = {}      # índice -> dorsal asignado por el server
+        self.process = None
+        self.conn = None
+        self.generation = 0
+        self.restarts = []   # instantes de los reinicios recientes
+
+
+class TeamSupervisor:
+    """
+    Reparte los jugadores en workers de players_per_proc jugadores, los lanza
+    con fork y los vigila: un worker que termina con error (o muere por una
+    señal) se relanza con reconnect para sus jugadores ya registrados.
+    """
+
+    def __init__(self, variant="rl", team_name=TEAM_NAME, host=SERVER_HOST, port=SERVER_PORT,
+                 num_players=NUM_PLAYERS, players_per_proc=None, pin=True):
+        self.team_name = team_name
+        self.host = host
+        self.port = port
+        self.ctx = mp.get_context("fork")
+
+        self.strategy_factory = resolve_strategy(variant)
+        team_runtime.STARTUP.mark("imports")
+
+        # el modelo se carga aquí, antes del fork: los workers lo heredan
+        module = sys.modules[self.strategy_factory.__module__]
+        model = getattr(module, "MODEL", None)
+        if model is not None and hasattr(model, "get"):
+            try:
+                model.get()
+                print(f"[INFO] Modelo cargado en el supervisor ({model.load_seconds * 1000:.1f}ms), "
+                      "compartido con los workers")
+            except Exception:
+                pass  # LazyPolicy ya avisó; cada worker lo reintentará al predecir
+        self.positions = load_positions(CONF_FILE, num_players)
+        team_runtime.STARTUP.mark("formación")
+        # modelo del mundo en memoria compartida: los workers lo heredan al hacer fork
+        self.world = WorldModel(num_players)
+
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+        if players_per_proc is None:
+            players_per_proc = math.ceil(num_players / max(1, len(cores)))
+        players_per_proc = max(1, int(players_per_proc))
+        indices = list(range(1, num_players + 1))
+        groups = [indices[i:i + players_per_proc] for i in range(0, num_players, players_per_proc)]
+        self.workers = [
+            _Worker(w, g, cores[w % len(cores)] if pin and cores else None)
+            for w, g in enumerate(groups)
+        ]
+        self._stopping = False
+
+    def _spawn(self, worker):
+        parent_conn, child_conn = self.ctx.Pipe(duplex=False)
+        reconnect = {i: worker.unums[i] for i in worker.players if i in worker.unums}
+        p = self.ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.strategy_factory, self.positions, worker.players, reconnect,
+                  worker.core, self.team_name, self.host, self.port, worker.generation,
+                  self.world),
+            name=f"team-worker-{worker.wid}", daemon=True)
+        p.start()
+        child_conn.close()
+        worker.process, worker.conn = p, parent_conn
+        core = "-" if worker.core is None else worker.core
+        print(f"[INFO] Worker {worker.wid} (pid {p.pid}, core {core}): jugadores {worker.players}"
+              + (f" — reinicio {worker.generation}, reconectando {sorted(reconnect.values())}"
+                 if worker.generation else ""))
+
+    def _on_exit(self, worker):
+        code = worker.process.exitcode
+        worker.conn.close()
+        worker.conn = None
+        if self._stopping:
+            return
+        if code == 0:
+            print(f"[INFO] Worker {worker.wid} terminó (jugadores {worker.players}).")
+            return
+        now = time.monotonic()
+        worker.restarts = [t for t in worker.restarts if now - t < RESTART_WINDOW]
+        if len(worker.restarts) >= MAX_RESTARTS:
+            print(f"[WARN] Worker {worker.wid} cayó {MAX_RESTARTS} veces en {RESTART_WINDOW:.0f}s "
+                  f"(código {code}); no se relanza.")
+            return
+        print(f"[WARN] Worker {worker.wid} cayó (código {code}); relanzando jugadores {worker.players}.")
+        worker.restarts.append(now)
+        worker.generation += 1
+        time.sleep(RESTART_DELAY)
+        self._spawn(worker)
+
+    def run(self):
+        for w in self.workers:
+            self._spawn(w)
+        try:
+            while any(w.conn is not None for w in self.workers):
+                by_sentinel = {w.process.sentinel: w for w in self.workers if w.conn is not None}
+                by_conn = {w.conn: w for w in self.workers if w.conn is not None}
+                for ready in wait(list(by_sentinel) + list(by_conn)):
+                    if ready in by_conn:
+                        w = by_conn[ready]
+                        try:
+                            idx, unum = ready.recv()
+                            w.unums[idx] = unum
+                        except (EOFError, OSError):
+                            # el worker cerró su extremo al salir: esperar a
+                            # su sentinel en vez de volver a despertar por EOF
+                            w.process.join()
+                    elif ready in by_sentinel:
+                        w = by_sentinel[ready]
+                        w.process.join()
+                        # leer los avisos que quedaran antes de cerrar el pipe
+                        while w.conn.poll():
+                            try:
+                                idx, unum = w.conn.recv()
+                                w.unums[idx] = unum
+                            except (EOFError, OSError):
+                                break
+                        self._on_exit(w)
+        except KeyboardInterrupt:
+            print("Detenido.")
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stopping = True
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # un segundo Ctrl-C no corta el cierre
+        for w in self.workers:
+            if w.process is not None and w.process.is_alive():
+                w.process.terminate()
+        for w in self.workers:
+            if w.process is not None:
+                w.process.join(timeout=2.0)
+        self.world.close()
+        self.world.unlink()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Lanza el equipo con workers fork y modelo compartido")
+    ap.add_argument("--variant", default="rl", help="estrategia: " + ", ".join(STRATEGIES))
+    ap.add_argument("--team", default=TEAM_NAME)
+    ap.add_argument("--host", default=SERVER_HOST)
+    ap.add_argument("--port", type=int, default=SERVER_PORT)
+    ap.add_argument("--players", type=int, default=NUM_PLAYERS)
+    ap.add_argument("--players-per-proc", type=int, default=None,
+                    help="jugadores por proceso (por defecto reparte entre los cores disponibles)")
+    ap.add_argument("--no-pin", action="store_true", help="no fijar cada worker a un core")
+    args = ap.parse_args()
+
+    sup = TeamSupervisor(args.variant, args.team, args.host, args.port, args.players,
+                         args.players_per_proc, pin=not args.no_pin)
+    print(f"[INFO] Supervisor: {len(sup.workers)} workers para {args.players} jugadores. "
+          "Ctrl-C para parar.")
+    sup.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# tests/test_command_buffer.py
+# CommandBuffer: como mucho un comando de cuerpo por ciclo (el segundo no
+# entra; Player.send lo pasa al plan o lo descarta si es repetido), un
+# datagrama por flush, y los formateadores numéricos sin ValueError con
+# NaN/inf ni valores fuera de rango.
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import command_buffer as cb  # noqa: E402
+from command_buffer import CommandBuffer  # noqa: E402
+
+
+class FakeTransport:
+    def __init__(self, fail=False):
+        self.sent = []
+        self.fail = fail
+
+    def sendto(self, data, addr):
+        if self.fail:
+            raise OSError("red caída")
+        self.sent.append((bytes(data), addr))
+
+
+ADDR = ("127.0.0.1", 6000)
+
+
+def test_one_body_command_per_cycle():
+    buf = CommandBuffer()
+    assert buf.add(b"(dash 60)")
+    assert not buf.add(b"(turn 30)")
+    assert not buf.add(b"(kick 100 0)")
+    assert buf.add(b"(turn_neck 10)")      # no es de cuerpo
+    assert buf.add(b"(say hola)")
+    assert len(buf) == 3
+    assert buf.pending() == b"(dash 60)(turn_neck 10)(say hola)"
+
+
+def test_flush_sends_one_datagram_and_resets_cycle():
+    buf = CommandBuffer()
+    tr = FakeTransport()
+    buf.add(b"(change_view narrow high)")
+    buf.add(b"(move -10.00 0.00)")
+    assert buf.flush(tr, ADDR) == 2
+    # el de cuerpo va primero aunque se añadiera después
+    assert tr.sent == [(b"(move -10.00 0.00)(change_view narrow high)", ADDR)]
+    assert len(buf) == 0 and buf.flush(tr, ADDR) == 0
+    assert buf.add(b"(turn 30)")           # ciclo nuevo: vuelve a caber uno
+    buf.add(b"(turn_neck 5)")
+    buf.flush(tr, ADDR)
+    s = buf.stats()
+    assert (s["commands"], s["datagrams"], s["syscalls_saved"]) == (4, 2, 2)
+
+
+def test_failed_send_is_not_counted():
+    buf = CommandBuffer()
+    buf.add(b"(dash 10)")
+    assert buf.flush(FakeTransport(fail=True), ADDR) == 0
+    assert len(buf) == 0 and buf.stats()["commands"] == 0
+
+
+def test_player_send_plans_conflicts_and_drops_repeats():
+    from team_runtime import Player
+    p = Player(1)
+    p.dash(60)
+    p.turn(30)        # conflicto: al plan del ciclo siguiente
+    p.dash(60)        # repetido del pendiente: fuera
+    p.turn(30)        # repetido del plan: fuera
+    p.send("(turn_neck 10)")
+    assert p.commands.body == b"(dash 60)"
+    assert list(p.plan) == [b"(turn 30)"]
+    assert p.commands.pending() == b"(dash 60)(turn_neck 10)"
+    assert p.commands.stats()["dropped"] == 2
+
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), -float("inf"), np.float32("nan")])
+def test_non_finite_values_become_zero(value):
+    assert cb.dash(value) == b"(dash 0)"
+    assert cb.turn(value) == b"(turn 0)"
+    assert cb.move(value, 1.0) == b"(move 0.00 1.00)"
+    assert cb.kick(value, value) == b"(kick 0.0 0.0)"
+
+
+def test_out_of_range_dash_turn_are_clamped():
+    assert cb.dash(250) == b"(dash 100)"
+    assert cb.dash(-101.5) == b"(dash -100)"
+    assert cb.turn(540.0) == b"(turn 180)"
+    assert cb.turn(-181) == b"(turn -180)"
+
+
+def test_in_range_values():
+    assert cb.dash(60) is cb.DASH[60]      # precodificado
+    assert cb.dash(np.float64(45)) == b"(dash 45)"
+    assert cb.dash(33.3) == b"(dash 33.3)"
+    assert cb.turn(-12.5) == b"(turn -12.5)"
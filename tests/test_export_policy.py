@@ -0,0 +1,64 @@
+# tests/test_export_policy.py
+# Paridad de NumpyPolicy (export_policy) contra el actor de SB3 sobre el
+# checkpoint del repo: orden de capas, activación, transposición y camino
+# logits/argmax. Se salta si no están stable_baselines3 y torch.
+import os
+import sys
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+sb3 = pytest.importorskip("stable_baselines3")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from export_policy import export  # noqa: E402
+from numpy_policy import NumpyPolicy  # noqa: E402
+
+MODEL_ZIP = os.path.join(ROOT, "ppo_rcss_20000_steps.zip")
+N_OBS = 512
+
+
+@pytest.fixture(scope="module")
+def models(tmp_path_factory):
+    if not os.path.exists(MODEL_ZIP):
+        pytest.skip(f"no está {MODEL_ZIP}")
+    out = str(tmp_path_factory.mktemp("export") / "policy.npz")
+    export(MODEL_ZIP, out)
+    return sb3.PPO.load(MODEL_ZIP, device="cpu"), NumpyPolicy.load(out)
+
+
+@pytest.fixture(scope="module")
+def obs(models):
+    space = models[0].observation_space
+    rng = np.random.default_rng(0)
+    return rng.uniform(space.low, space.high, size=(N_OBS,) + space.shape).astype(np.float32)
+
+
+def _sb3_logits(model, obs):
+    """Logits sin normalizar del actor de SB3: action_net(policy_net(features))."""
+    policy = model.policy
+    with torch.no_grad():
+        features = policy.extract_features(torch.as_tensor(obs), policy.pi_features_extractor)
+        return policy.action_net(policy.mlp_extractor.forward_actor(features)).numpy()
+
+
+def test_logits_match(models, obs):
+    model, policy = models
+    np.testing.assert_allclose(policy.logits(obs), _sb3_logits(model, obs), rtol=1e-4, atol=1e-4)
+
+
+def test_argmax_actions_match(models, obs):
+    model, policy = models
+    sb3_actions, _ = model.predict(obs, deterministic=True)
+    np_actions, _ = policy.predict(obs, deterministic=True)
+    np.testing.assert_array_equal(np_actions, sb3_actions)
+
+
+def test_single_obs_matches(models, obs):
+    model, policy = models
+    sb3_action, _ = model.predict(obs[0], deterministic=True)
+    np_action, _ = policy.predict(obs[0], deterministic=True)
+    assert int(np_action) == int(sb3_action)
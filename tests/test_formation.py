@@ -0,0 +1,135 @@
+# tests/test_formation.py
+# Formación de conf_file.conf: en las muestras del conf la interpolación
+# (Delaunay o IDW) y la rejilla devuelven las posiciones de la muestra;
+# entre muestras, combinaciones convexas. Y la caché .formation.npy: se
+# guarda, se mapea en el siguiente arranque y se rehace si el conf cambia.
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import formation  # noqa: E402
+from formation import Formation, grid_path, load_roles  # noqa: E402
+
+CONF = os.path.join(ROOT, "conf_file.conf")
+
+
+def _samples():
+    with open(CONF) as f:
+        data = json.load(f)["data"]
+    ball = np.array([(s["ball"]["x"], s["ball"]["y"]) for s in data])
+    pos = np.array([[(s[str(i)]["x"], s[str(i)]["y"]) for i in range(1, 12)] for s in data])
+    return ball, pos
+
+
+BALL, POS = _samples()
+
+
+@pytest.fixture(scope="module")
+def form():
+    return Formation.from_conf(CONF, cache=False)
+
+
+@pytest.fixture(scope="module")
+def form_idw():
+    return Formation(BALL, POS, method="IDW", step=2.5)
+
+
+def test_method_from_conf(form):
+    assert form.method == ("DelaunayTriangulation" if formation.HAVE_SCIPY else "IDW")
+
+
+@pytest.mark.parametrize("which", ["form", "form_idw"])
+def test_interpolate_exact_at_samples(which, request):
+    f = request.getfixturevalue(which)
+    np.testing.assert_allclose(f.interpolate(BALL), POS, atol=1e-9)
+
+
+def test_grid_lookup_at_samples(form):
+    for (bx, by), pos in zip(BALL, POS):
+        np.testing.assert_allclose(form.lookup(bx, by), pos, atol=1e-4)
+        assert form.target(11, bx, by) == pytest.approx(tuple(pos[10]), abs=1e-4)
+        # lado r: el balón se refleja y la x del objetivo también
+        assert form.target(11, -bx, by, side="r") == pytest.approx((-pos[10, 0], pos[10, 1]), abs=1e-4)
+
+
+@pytest.mark.parametrize("which", ["form", "form_idw"])
+def test_between_samples_is_convex(which, request):
+    f = request.getfixturevalue(which)
+    rng = np.random.default_rng(0)
+    pts = np.column_stack([rng.uniform(-52.5, 52.5, 200), rng.uniform(-34, 34, 200)])
+    out = f.interpolate(pts)
+    assert out.shape == (200, 11, 2)
+    assert (out >= POS.min(axis=0) - 1e-9).all() and (out <= POS.max(axis=0) + 1e-9).all()
+
+
+def test_delaunay_midpoint_of_grid_cell(form):
+    if form.method != "DelaunayTriangulation":
+        pytest.skip("sin scipy")
+    # el centro de una celda rectangular de muestras está en la diagonal por
+    # la que la corta la triangulación: media de los dos extremos de esa diagonal
+    corners = [(-36.0, -17.0), (-18.0, -17.0), (-36.0, 0.0), (-18.0, 0.0)]
+    idx = [int(np.flatnonzero((BALL == c).all(axis=1))[0]) for c in corners]
+    mid = form.interpolate([(-27.0, -8.5)])[0]
+    diag_a = (POS[idx[0]] + POS[idx[3]]) / 2
+    diag_b = (POS[idx[1]] + POS[idx[2]]) / 2
+    assert np.allclose(mid, diag_a, atol=1e-9) or np.allclose(mid, diag_b, atol=1e-9)
+
+
+def test_static_and_single_sample():
+    f = Formation(BALL[:1], POS[:1], step=5.0)
+    assert f.method == "Static"
+    np.testing.assert_array_equal(f.lookup(30.0, -20.0), POS[0].astype(np.float32))
+
+
+def test_load_roles_homes_are_first_sample():
+    homes, names = load_roles(CONF)
+    np.testing.assert_array_equal(homes, POS[0])
+    assert names[0] == "Goalie" and names[10] == "CenterForward"
+
+
+def test_grid_cache_written_mapped_and_rebuilt(tmp_path):
+    conf = str(tmp_path / "f.conf")
+    shutil.copy(CONF, conf)
+    cache = grid_path(conf)
+    assert cache == str(tmp_path / "f.formation.npy")
+
+    built = Formation.from_conf(conf, step=2.0)
+    assert os.path.exists(cache)
+    loaded = Formation.from_conf(conf, step=2.0)
+    assert isinstance(loaded.grid.base, np.memmap)     # mapeada, no leída
+    np.testing.assert_array_equal(loaded.grid, built.grid)
+
+    # otro paso de rejilla: la forma no encaja y se reconstruye
+    other = Formation.from_conf(conf, step=2.5)
+    assert not isinstance(other.grid.base, np.memmap)
+
+    # conf más nuevo que la caché: se ignora la caché y se reescribe
+    with open(conf) as f:
+        data = json.load(f)
+    data["data"][0]["11"]["x"] = -14.0
+    with open(conf, "w") as f:
+        json.dump(data, f)
+    t = os.path.getmtime(cache) + 10
+    os.utime(conf, (t, t))
+    fresh = Formation.from_conf(conf, step=2.5)
+    expected = Formation.from_conf(conf, step=2.5, cache=False).grid
+    assert not np.array_equal(fresh.grid, other.grid)
+    np.testing.assert_array_equal(fresh.grid, expected)
+    np.testing.assert_array_equal(np.load(cache), expected)
+
+
+def test_corrupt_cache_is_rebuilt(tmp_path):
+    conf = str(tmp_path / "f.conf")
+    shutil.copy(CONF, conf)
+    with open(grid_path(conf), "wb") as f:
+        f.write(b"no es un npy")
+    f_ = Formation.from_conf(conf, step=2.5)
+    np.testing.assert_array_equal(f_.grid, Formation.from_conf(conf, step=2.5, cache=False).grid)
+    assert np.load(grid_path(conf)).shape == f_.grid.shape
@@ -0,0 +1,187 @@
+# tests/test_policy_cache.py
+# PolicyCache: aciertos por obs cuantizada, sin caché en modo estocástico,
+# LRU acotado, y la invalidación cuando cambia la generación de la política
+# (recarga terminada) o el mtime del fichero del modelo.
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from numpy_policy import LazyPolicy, NumpyPolicy  # noqa: E402
+from policy_cache import PolicyCache  # noqa: E402
+
+OBS = np.array([-10.0, 0.0, 5.0, 5.0, 15.0, 5.0, 0.1], dtype=np.float32)
+# dentro de la misma celda de DEFAULT_RESOLUTION que OBS
+NEAR = OBS + np.array([0.1] * 6 + [0.002], dtype=np.float32)
+
+
+class FakeServer:
+    """predict_async que cuenta las llamadas y devuelve action."""
+
+    def __init__(self, action=1):
+        self.action = action
+        self.calls = 0
+
+    async def predict_async(self, obs, deterministic=False):
+        self.calls += 1
+        return self.action
+
+    def format_stats(self):
+        return "fake"
+
+
+class FakePolicy:
+    def __init__(self):
+        self.generation = 1
+        self.mtime = 100.0
+        self.reloads = 0
+        self.path = "fake.npz"
+
+    def model_mtime(self):
+        return self.mtime
+
+    def reload(self):
+        self.reloads += 1
+
+
+def predict(cache, obs, deterministic=True):
+    return asyncio.run(cache.predict_async(obs, deterministic=deterministic))
+
+
+def test_hits_on_quantized_obs():
+    server = FakeServer()
+    cache = PolicyCache(server, check_every=3600)
+    assert predict(cache, OBS) == 1
+    assert predict(cache, NEAR) == 1
+    assert (cache.hits, cache.misses, server.calls) == (1, 1, 1)
+    predict(cache, OBS + np.float32(1.0))          # otra celda
+    assert server.calls == 2
+
+
+def test_stochastic_requests_bypass_cache():
+    server = FakeServer()
+    cache = PolicyCache(server, check_every=3600)
+    predict(cache, OBS, deterministic=False)
+    predict(cache, OBS, deterministic=False)
+    assert server.calls == 2 and cache.bypassed == 2 and cache.stats()["size"] == 0
+
+
+def test_lru_is_bounded():
+    server = FakeServer()
+    cache = PolicyCache(server, max_size=2, check_every=3600)
+    for dx in (0.0, 1.0, 2.0):
+        predict(cache, OBS + np.float32(dx))
+    assert cache.stats()["size"] == 2 and cache.evictions == 1
+    predict(cache, OBS + np.float32(2.0))          # la más reciente sigue
+    assert cache.hits == 1
+    predict(cache, OBS)                            # la más vieja se expulsó
+    assert server.calls == 4
+
+
+def test_generation_change_invalidates():
+    policy = FakePolicy()
+    server = FakeServer(action=1)
+    cache = PolicyCache(server, policy, check_every=3600)
+    predict(cache, OBS)
+    policy.generation = 2                          # recarga terminada
+    server.action = 3
+    assert predict(cache, OBS) == 3
+    assert cache.invalidations == 1 and server.calls == 2
+
+
+def test_first_load_does_not_invalidate():
+    policy = FakePolicy()
+    policy.generation = 0
+    cache = PolicyCache(FakeServer(), policy, check_every=3600)
+    policy.generation = 1
+    predict(cache, OBS)
+    assert cache.invalidations == 0
+
+
+def test_result_from_previous_generation_is_not_cached():
+    policy = FakePolicy()
+
+    class SlowServer(FakeServer):
+        async def predict_async(self, obs, deterministic=False):
+            # el modelo cambia mientras la petición está en el batch
+            policy.generation += 1
+            cache._check_model()
+            return await FakeServer.predict_async(self, obs, deterministic)
+
+    server = SlowServer()
+    cache = PolicyCache(server, policy, check_every=3600)
+    predict(cache, OBS)
+    assert cache.stats()["size"] == 0
+
+
+def test_mtime_change_reloads_and_invalidates():
+    policy = FakePolicy()
+    server = FakeServer()
+    cache = PolicyCache(server, policy, check_every=0.0)
+    predict(cache, OBS)
+    predict(cache, OBS)
+    assert cache.hits == 1 and policy.reloads == 0
+    policy.mtime = 200.0
+    predict(cache, OBS)
+    assert policy.reloads == 1 and cache.invalidations == 1 and server.calls == 2
+    # cuando la recarga termina (nueva generación) se vacía otra vez
+    policy.generation = 2
+    predict(cache, OBS)
+    assert cache.invalidations == 2 and server.calls == 3
+
+
+def test_mtime_is_checked_only_every_check_every():
+    policy = FakePolicy()
+    cache = PolicyCache(FakeServer(), policy, check_every=3600)
+    policy.mtime = 200.0
+    predict(cache, OBS)
+    assert policy.reloads == 0
+
+
+def _write_policy(path, bias):
+    rng = np.random.default_rng(0)
+    w = [rng.normal(size=(8, 7)), rng.normal(size=(5, 8))]
+    b = [np.zeros(8), np.full(5, -1.0)]
+    b[1][bias] = 1.0
+    NumpyPolicy(w, b).save(path)
+
+
+def test_lazy_policy_file_rewrite_end_to_end(tmp_path):
+    path = str(tmp_path / "policy.npz")
+    _write_policy(path, bias=0)
+    lazy = LazyPolicy(path)
+    lazy.get()
+
+    class PolicyServer(FakeServer):
+        async def predict_async(self, obs, deterministic=False):
+            self.calls += 1
+            action, _ = lazy.predict(obs, deterministic=True)
+            return int(action)
+
+    server = PolicyServer()
+    cache = PolicyCache(server, lazy, check_every=0.0)
+    obs = np.zeros(7, dtype=np.float32)
+    assert predict(cache, obs) == 0
+    assert predict(cache, obs) == 0 and cache.hits == 1
+
+    _write_policy(path, bias=4)
+    t = os.path.getmtime(path) + 5
+    os.utime(path, (t, t))
+    predict(cache, obs)                            # ve el mtime nuevo: recarga en segundo plano
+    lazy._thread.join(10)
+    assert lazy.generation == 2
+    assert predict(cache, obs) == 4                # generación nueva: caché vacía, acción nueva
+    assert cache.invalidations == 2
+    lazy.get().close()
+
+
+@pytest.mark.parametrize("res", [(1.0,) * 7, (0.01,) * 7])
+def test_key_resolution(res):
+    cache = PolicyCache(FakeServer(), resolution=res, check_every=3600)
+    near = OBS + np.float32(0.3)
+    assert (cache.key(OBS) == cache.key(near)) == (res[0] == 1.0)
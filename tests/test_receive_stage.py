@@ -0,0 +1,117 @@
+# tests/test_receive_stage.py
+# LatestInbox (drain-to-latest) y message_key: de cada tipo se queda el
+# último mensaje, los hear se colapsan por emisor salvo los de jugadores
+# (hear T dir ...), que se conservan todos, y el resto va en orden.
+import os
+import socket
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from receive_stage import OTHER_LIMIT, LatestInbox, drain_socket, message_key  # noqa: E402
+
+
+@pytest.mark.parametrize("data, key", [
+    (b"(see 10 ((b) 1 2))", b"see"),
+    (b"(sense_body 10 (stamina 8000 1))", b"sense_body"),
+    (b"(fullstate 10 (pmode play_on))", b"fullstate"),
+    (b"(hear 10 referee play_on)", b"hear referee"),
+    (b'(hear 10 self "hola")', b"hear self"),
+    (b'(hear 10 online_coach_left "(info)")', b"hear online_coach_left"),
+    (b'(hear 10 -30 our 5 "pasa")', None),
+    (b'(hear 10 45.5 "grito")', None),
+    (b"(init l 3 before_kick_off)", None),
+    (b"(error unknown_command)", None),
+    (b"(ok change_view)", None),
+])
+def test_message_key(data, key):
+    assert message_key(data) == key
+    assert message_key(bytearray(data)) == key
+    assert message_key(memoryview(data)) == key
+
+
+def test_drain_keeps_latest_per_kind():
+    inbox = LatestInbox()
+    inbox.put(b"(sense_body 1)", t=1.0)
+    inbox.put(b"(see 1)", t=1.1)
+    inbox.put(b"(sense_body 2)", t=2.0)
+    inbox.put(b"(see 2)", t=2.1)
+    inbox.put(b"(sense_body 3)", t=3.0)
+    assert len(inbox) == 5
+    msgs = inbox.drain(now=3.5)
+    assert msgs == [(2.1, b"(see 2)"), (3.0, b"(sense_body 3)")]
+    assert inbox.last_depth == 5 and inbox.last_dropped == 3
+    assert inbox.last_age_ms == pytest.approx(1400.0)
+    assert len(inbox) == 0 and inbox.drain() == []
+    assert inbox.last_depth == 0 and inbox.last_dropped == 0
+
+
+def test_hears_collapse_per_sender_but_not_player_hears():
+    inbox = LatestInbox()
+    inbox.put(b"(hear 1 referee kick_off_l)", t=1.0)
+    inbox.put(b'(hear 1 -30 our 5 "a")', t=1.1)
+    inbox.put(b'(hear 1 30 our 7 "b")', t=1.2)
+    inbox.put(b"(hear 2 referee play_on)", t=2.0)
+    inbox.put(b'(hear 2 -30 our 5 "c")', t=2.1)
+    inbox.put(b'(hear 2 self "d")', t=2.2)
+    data = [d for _, d in inbox.drain(now=3.0)]
+    # los tres hear de jugadores llegan, aunque dos vengan de la misma dirección
+    assert data == [b'(hear 1 -30 our 5 "a")', b'(hear 1 30 our 7 "b")',
+                    b"(hear 2 referee play_on)", b'(hear 2 -30 our 5 "c")', b'(hear 2 self "d")']
+    assert inbox.last_dropped == 1
+
+
+def test_other_messages_kept_in_order_up_to_limit():
+    inbox = LatestInbox()
+    for i in range(OTHER_LIMIT + 5):
+        inbox.put(b"(error %d)" % i, t=float(i))
+    msgs = inbox.drain(now=100.0)
+    assert [d for _, d in msgs] == [b"(error %d)" % i for i in range(5, OTHER_LIMIT + 5)]
+    assert inbox.last_dropped == 5
+
+
+def test_put_keyed_stores_extracted_items():
+    inbox = LatestInbox()
+    inbox.put_keyed(b"see", (1.0, 2.0, None, None), t=1.0)
+    inbox.put_keyed(b"see", (1.5, 2.5, 3.0, 4.0), t=2.0)
+    inbox.put_keyed(None, b"(init l 1 before_kick_off)", t=0.5)
+    assert inbox.drain(now=2.0) == [(0.5, b"(init l 1 before_kick_off)"), (2.0, (1.5, 2.5, 3.0, 4.0))]
+
+
+def test_stats_accumulate_across_drains():
+    inbox = LatestInbox()
+    for t in (1.0, 1.1, 1.2):
+        inbox.put(b"(see 1)", t=t)
+    inbox.drain(now=1.2)
+    inbox.put(b"(see 2)", t=2.0)
+    inbox.drain(now=2.5)
+    assert inbox.total_received == 4 and inbox.total_dropped == 2
+    assert inbox.max_depth == 3 and inbox.drains == 2
+    assert inbox.max_age_ms == pytest.approx(500.0)
+
+
+def test_drain_socket_reads_everything_pending():
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        rx.bind(("127.0.0.1", 0))
+        rx.settimeout(1.0)
+        for i in range(4):
+            tx.sendto(b"(see %d)" % i, rx.getsockname())
+        tx.sendto(b"(hear 4 referee play_on)", rx.getsockname())
+        inbox = LatestInbox()
+        # en loopback los datagramas ya están en el buffer del kernel
+        n = 0
+        for _ in range(100):
+            n += drain_socket(rx, inbox)
+            if n == 5:
+                break
+        assert n == 5
+        assert rx.gettimeout() == 1.0
+        assert [d for _, d in inbox.drain()] == [b"(see 3)", b"(hear 4 referee play_on)"]
+    finally:
+        rx.close()
+        tx.close()
@@ -0,0 +1,134 @@
+# tests/test_sexp_parser.py
+# scan_percept / scan_play_mode (camino caliente sobre el buffer reutilizado)
+# y parse_message, incluidos mensajes truncados o mal formados: nunca deben
+# lanzar, sólo devolver None.
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sexp_parser import (HearMessage, InitMessage, RecvBuffer, SeeMessage,  # noqa: E402
+                         SenseBodyMessage, parse_message, scan_percept, scan_play_mode)
+
+SEE = (b'(see 12 ((f c t) 30.1 -12) ((p "opp" 7) 8.5 20) ((b) 4.2 -3) ((l t) 31 88) '
+       b'(mypos -10.500 3.250) (ball 1.000 -2.000))\x00')
+SENSE = (b"(sense_body 12 (view_mode high normal) (stamina 8000 1 130600) (speed 0.4 10) "
+         b"(head_angle 0) (kick 1) (dash 20) (turn 5) (say 0) (turn_neck 0) "
+         b"(mypos 4.000 -5.500) (ball 0.250 0.750))\x00")
+
+
+def test_scan_percept_see_and_sense_body():
+    assert scan_percept(SEE) == (-10.5, 3.25, 1.0, -2.0)
+    assert scan_percept(SENSE) == (4.0, -5.5, 0.25, 0.75)
+
+
+def test_scan_percept_respects_end_in_reused_buffer():
+    # restos de un datagrama anterior más largo detrás de end no cuentan
+    buf = bytearray(256)
+    buf[:len(SENSE)] = SENSE
+    short = b"(see 13 ((b) 2 0) (mypos 1.0 2.0))"
+    buf[:len(short)] = short
+    assert scan_percept(buf, len(short)) == (1.0, 2.0, None, None)
+
+
+def test_scan_percept_partial_fields():
+    assert scan_percept(b"(see 3 ((f c) 10 0))") == (None, None, None, None)
+    assert scan_percept(b"(see 3 (ball 5 6))") == (None, None, 5.0, 6.0)
+    assert scan_percept(b"(sense_body 3 (mypos 7 8))") == (7.0, 8.0, None, None)
+
+
+@pytest.mark.parametrize("msg", [
+    b"(hear 10 referee play_on)",
+    b"(init l 3 before_kick_off)",
+    b"(error unknown_command)",
+    b"",
+    b"(se",
+])
+def test_scan_percept_ignores_other_messages(msg):
+    assert scan_percept(msg) is None
+
+
+@pytest.mark.parametrize("msg", [
+    b"(see 12 (mypos abc 3.0) (ball 1 2))",
+    b"(see 12 (mypos 1.0",
+    b"(see 12 (mypos 1.0 2.0) (ball x y))",
+    b"(sense_body 12 (ball 1.0",
+    b"(see 12 (ball nan?! 1))",
+])
+def test_scan_percept_malformed_returns_none(msg):
+    assert scan_percept(msg) is None
+
+
+def test_scan_play_mode():
+    assert scan_play_mode(b"(hear 10 referee play_on)") == "play_on"
+    assert scan_play_mode(b"(hear 10 referee goal_l_1)\x00") == "goal_l_1"
+    assert scan_play_mode(b"(hear 10 -30 our 5 \"hola\")") is None
+    assert scan_play_mode(b"(hear 10 referee") is None
+    assert scan_play_mode(b"(hear 10") is None
+    assert scan_play_mode(SEE) is None
+
+
+def test_parse_see():
+    msg = parse_message(SEE)
+    assert isinstance(msg, SeeMessage)
+    assert msg.time == 12
+    assert (msg.x, msg.y, msg.ball_x, msg.ball_y) == (-10.5, 3.25, 1.0, -2.0)
+    assert msg.ball == (4.2, -3.0)
+    assert msg.flags[b"f c t"] == (30.1, -12.0)
+    assert msg.players == [(b"opp", 7, False, 8.5, 20.0)]
+    assert msg.lines[b"l t"] == (31.0, 88.0)
+
+
+def test_parse_sense_body():
+    msg = parse_message(memoryview(SENSE))
+    assert isinstance(msg, SenseBodyMessage)
+    assert (msg.stamina, msg.effort, msg.capacity) == (8000.0, 1.0, 130600.0)
+    assert (msg.speed, msg.speed_dir) == (0.4, 10.0)
+    assert msg.counts[b"dash"] == 20 and msg.counts[b"kick"] == 1
+    assert (msg.x, msg.y, msg.ball_x, msg.ball_y) == (4.0, -5.5, 0.25, 0.75)
+
+
+def test_parse_hear_and_init():
+    ref = parse_message(b"(hear 10 referee play_on)")
+    assert isinstance(ref, HearMessage)
+    assert (ref.time, ref.sender, ref.direction, ref.message) == (10, b"referee", None, b"play_on")
+    mate = parse_message(b'(hear 11 -30 our 5 "pasa")')
+    assert (mate.direction, mate.sender, mate.unum, mate.message) == (-30.0, b"our", 5, b"pasa")
+    init = parse_message(b"(init r 9 before_kick_off)")
+    assert isinstance(init, InitMessage)
+    assert (init.side, init.unum, init.play_mode) == ("r", 9, "before_kick_off")
+
+
+@pytest.mark.parametrize("msg", [
+    b"",
+    b"(",
+    b"(see x ((b) 1 2))",
+    b"(see 12 ((b) abc 2))",
+    b"(sense_body 12 (dash many))",
+    b"(hear)",
+    b"(init l)",
+    b"(change_player_type 3 1)",
+])
+def test_parse_message_malformed_returns_none(msg):
+    assert parse_message(msg) is None
+
+
+def test_recv_buffer_over_udp():
+    import socket
+    a = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    b = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        a.bind(("127.0.0.1", 0))
+        rbuf = RecvBuffer()
+        b.sendto(SENSE, a.getsockname())
+        assert rbuf.recv(a)[0] == (4.0, -5.5, 0.25, 0.75)
+        b.sendto(b"(hear 1 referee kick_off_l)", a.getsockname())
+        assert rbuf.recv(a)[0] is None   # restos del SENSE detrás de n no cuentan
+        b.sendto(SEE, a.getsockname())
+        assert isinstance(rbuf.recv_full(a)[0], SeeMessage)
+    finally:
+        a.close()
+        b.close()
@@ -0,0 +1,116 @@
+# tests/test_world_model.py
+# WorldModel sobre shared_memory con seqlock por slot: ida y vuelta de
+# publish/snapshot, slots con escritura en curso descartados, fusión del
+# balón, y lecturas concurrentes con escritores en otros procesos (cada
+# lectura que snapshot da por buena tiene que ser un registro completo).
+import multiprocessing as mp
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from world_model import WorldModel  # noqa: E402
+
+N_WRITES = 20000
+
+
+@pytest.fixture
+def world():
+    wm = WorldModel(4)
+    yield wm
+    wm.close()
+    wm.unlink()
+
+
+def test_publish_snapshot_roundtrip(world):
+    world.publish(1, 2, 37, -10.0, 5.0, 100.0, 3.0, -4.0, 99.5)
+    snap, ok = world.snapshot()
+    assert ok.all()
+    r = snap[1]
+    assert (r["unum"], r["cycle"], r["x"], r["y"], r["pos_t"]) == (2, 37, -10.0, 5.0, 100.0)
+    assert (r["ball_x"], r["ball_y"], r["ball_t"]) == (3.0, -4.0, 99.5)
+    assert world.seq[1] == 2 and world.seq[0] == 0
+    # la copia no cambia con escrituras posteriores
+    world.publish(1, 2, 38, 0.0, 0.0, 101.0, 0.0, 0.0, 101.0)
+    assert snap[1]["cycle"] == 37
+
+
+def test_slot_being_written_is_not_ok(world):
+    world.publish(0, 1, 1, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0)
+    world.seq[0] += np.uint64(1)   # escritor a mitad (seq impar)
+    snap, ok = world.snapshot()
+    assert not ok[0] and ok[1:].all()
+    assert world.fused_ball(now=1.0) is None
+
+
+def test_fused_ball_weights_by_observer_distance(world):
+    now = 50.0
+    world.publish(0, 1, 10, 0.0, 0.0, now, 1.0, 0.0, now)          # a 1 m: peso 1/2
+    world.publish(1, 2, 10, 10.0, 0.0, now, 3.0, 0.0, now - 0.01)  # a 7 m: peso 1/8
+    world.publish(2, 3, 9, 0.0, 0.0, now, 9.0, 9.0, now - 0.2)     # fuera de la ventana
+    est = world.fused_ball(now=now)
+    assert est.sources == 2 and est.time == now
+    assert est.x == pytest.approx((1.0 * 0.5 + 3.0 * 0.125) / 0.625)
+    assert est.y == pytest.approx(0.0)
+    assert world.fused_ball(now=now + 1.0) is None   # todas más viejas que BALL_MAX_AGE
+
+
+def test_teammates_recent_and_excluded(world):
+    world.publish(0, 1, 5, 1.0, 2.0, 10.0, 0.0, 0.0, 0.0)
+    world.publish(1, 2, 5, 3.0, 4.0, 9.9, 0.0, 0.0, 0.0)
+    world.publish(2, 3, 5, 5.0, 6.0, 1.0, 0.0, 0.0, 0.0)   # demasiado vieja
+    mates = world.teammates(now=10.0, exclude=0)
+    assert set(mates) == {2}
+    x, y, age = mates[2]
+    assert (x, y) == (3.0, 4.0) and age == pytest.approx(0.1)
+
+
+def test_attach_by_name_sees_same_block(world):
+    other = WorldModel(4, name=world.name)
+    try:
+        assert not other.owner
+        other.publish(3, 4, 7, 1.5, 2.5, 3.0, 4.0, 5.0, 6.0)
+        snap, ok = world.snapshot()
+        assert ok[3] and snap[3]["cycle"] == 7 and snap[3]["ball_y"] == 5.0
+    finally:
+        other.close()
+
+
+def _writer(name, slot, n):
+    # todos los campos del registro llevan el mismo valor i: una lectura
+    # rota (mitad de una escritura, mitad de otra) mezclaría valores
+    wm = WorldModel(4, name=name)
+    try:
+        for i in range(1, n + 1):
+            f = float(i)
+            wm.publish(slot, i, i, f, f, f, f, f, f)
+    finally:
+        wm.close()
+
+
+def test_concurrent_writers_in_other_processes(world):
+    ctx = mp.get_context("fork")
+    procs = [ctx.Process(target=_writer, args=(world.name, s, N_WRITES)) for s in range(3)]
+    for p in procs:
+        p.start()
+    seen_ok = 0
+    try:
+        while any(p.is_alive() for p in procs):
+            snap, ok = world.snapshot()
+            for r in snap[:3][ok[:3]]:
+                vals = {float(r[k]) for k in ("unum", "cycle", "x", "y", "pos_t", "ball_x", "ball_y", "ball_t")}
+                assert len(vals) == 1, f"lectura rota: {r}"
+                seen_ok += 1
+    finally:
+        for p in procs:
+            p.join(30)
+    assert all(p.exitcode == 0 for p in procs)
+    snap, ok = world.snapshot()
+    assert ok.all()
+    assert (snap["cycle"][:3] == N_WRITES).all()
+    assert (world.seq[:3] == 2 * N_WRITES).all()
+    assert seen_ok > 0
@@ -0,0 +1,295 @@
+# train_callbacks.py
+# Callbacks de stable_baselines3 para train_rl.py que no paran model.learn:
+#
+#   AsyncCheckpointCallback: en el step del checkpoint sólo se copian en
+#   memoria los pesos, el estado del optimizador y los atributos del modelo
+#   (lo que model.save pasaría a save_to_zip_file); la serialización y la
+#   compresión del zip las hace un hilo escritor. El fichero se escribe
+#   como .tmp y se renombra, así nadie (evaluate.py, la caché de política
+#   de los agentes) lee un zip a medias. Guarda los keep_last más recientes
+#   y cuenta el tiempo que el entrenamiento ha estado parado por los
+#   checkpoints.
+#
+#   AsyncEvalCallback: cada eval_freq steps copia el actor (como NumpyPolicy)
+#   y lo evalúa en otro proceso con episodios deterministas sobre field_sim;
+#   el resultado se recoge cuando está listo (eval/* en el logger) y el
+#   mejor actor se guarda como {prefix}_best.npz, que los agentes cargan
+#   directamente. Si la evaluación anterior no ha terminado, se salta.
+import copy
+import glob
+import multiprocessing as mp
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.save_util import save_to_zip_file
+
+from numpy_policy import NumpyPolicy
+from vec_env import make_batch
+
+KEEP_LAST = 5
+WRITER_QUEUE = 2       # snapshots pendientes antes de que el step espere al escritor
+EVAL_EPISODES = 16
+EVAL_MAX_STEPS = 1000
+
+
+def _detached(obj):
+    """Copia de un state_dict (anidado) con los tensores clonados en CPU."""
+    if torch.is_tensor(obj):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return type(obj)((k, _detached(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_detached(v) for v in obj)
+    return copy.copy(obj)
+
+
+def snapshot_model(model):
+    """
+    (data, params, pytorch_variables) como los arma BaseAlgorithm.save, pero
+    copiados: el modelo puede seguir entrenando mientras se escriben.
+    """
+    data = model.__dict__.copy()
+    exclude = set(model._excluded_save_params())
+    state_dicts_names, torch_variable_names = model._get_torch_save_params()
+    for name in state_dicts_names + torch_variable_names:
+        exclude.add(name.split(".")[0])
+    for name in exclude:
+        data.pop(name, None)
+    # copia superficial de cada atributo (buffers de episodios, _last_obs...)
+    data = {k: (v.copy() if isinstance(v, np.ndarray) else copy.copy(v)) for k, v in data.items()}
+    params = {name: _detached(v) for name, v in model.get_parameters().items()}
+    pytorch_variables = None
+    if torch_variable_names:
+        pytorch_variables = {}
+        for name in torch_variable_names:
+            obj = model
+            for part in name.split("."):
+                obj = getattr(obj, part)
+            pytorch_variables[name] = _detached(obj)
+    return data, params, pytorch_variables
+
+
+def actor_snapshot(policy):
+    """Actor de una MlpPolicy (policy_net + action_net) como arrays NumPy para NumpyPolicy."""
+    layers = [m for m in policy.mlp_extractor.policy_net if isinstance(m, torch.nn.Linear)]
+    layers.append(policy.action_net)
+    act = policy.activation_fn.__name__.lower()
+    with torch.no_grad():
+        weights = [l.weight.detach().cpu().numpy().copy() for l in layers]
+        biases = [l.bias.detach().cpu().numpy().copy() for l in layers]
+    return weights, biases, act
+
+
+class AsyncCheckpointCallback(BaseCallback):
+    """Como CheckpointCallback(save_freq, save_path, name_prefix) pero sin escribir en el step."""
+
+    def __init__(self, save_freq, save_path, name_prefix="ppo_rcss", keep_last=KEEP_LAST, verbose=0):
+        super().__init__(verbose)
+        self.save_freq = int(save_freq)
+        self.save_path = save_path
+        self.name_prefix = name_prefix
+        self.keep_last = int(keep_last)
+        self._queue = queue.Queue(maxsize=WRITER_QUEUE)
+        self._thread = None
+        self._error = None
+        # contadores
+        self.saved = 0
+        self.pruned = 0
+        self.snapshot_s = 0.0    # copia en memoria (en el step)
+        self.blocked_s = 0.0     # espera porque el escritor iba atrasado (en el step)
+        self.write_s = 0.0       # serialización + compresión + disco (en el hilo)
+        self._t_start = None
+
+    def _init_callback(self):
+        os.makedirs(self.save_path, exist_ok=True)
+        self._t_start = time.perf_counter()
+        self._thread = threading.Thread(target=self._writer, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def checkpoint_path(self, steps):
+        return os.path.join(self.save_path, f"{self.name_prefix}_{steps}_steps.zip")
+
+    def _on_step(self):
+        if self.n_calls % self.save_freq == 0:
+            self.save_now()
+        return True
+
+    def save_now(self):
+        if self._error is not None:
+            raise RuntimeError("el escritor de checkpoints falló") from self._error
+        t0 = time.perf_counter()
+        snap = snapshot_model(self.model)
+        t1 = time.perf_counter()
+        # bloquea sólo si ya hay WRITER_QUEUE snapshots esperando
+        self._queue.put((self.checkpoint_path(self.num_timesteps), snap))
+        t2 = time.perf_counter()
+        self.snapshot_s += t1 - t0
+        self.blocked_s += t2 - t1
+        self.logger.record("checkpoint/snapshot_ms", 1000.0 * (t1 - t0))
+        self.logger.record("checkpoint/blocked_ms", 1000.0 * (t2 - t1))
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, (data, params, pytorch_variables) = item
+            t0 = time.perf_counter()
+            try:
+                tmp = path + ".tmp"
+                save_to_zip_file(tmp, data=data, params=params, pytorch_variables=pytorch_variables)
+                os.replace(tmp, path)
+                self.saved += 1
+                self._prune()
+                if self.verbose:
+                    print(f"[INFO] Checkpoint guardado en {path}")
+            except Exception as e:
+                self._error = e
+                print(f"[WARN] No se pudo guardar el checkpoint {path}: {e!r}")
+            self.write_s += time.perf_counter() - t0
+
+    def _prune(self):
+        """Borra los checkpoints {prefix}_N_steps.zip más viejos, salvo los keep_last últimos."""
+        if self.keep_last <= 0:
+            return
+        pat = re.compile(re.escape(self.name_prefix) + r"_(\d+)_steps\.zip$")
+        found = []
+        for p in glob.glob(os.path.join(self.save_path, f"{self.name_prefix}_*_steps.zip")):
+            m = pat.match(os.path.basename(p))
+            if m:
+                found.append((int(m.group(1)), p))
+        found.sort()
+        for _, p in found[:-self.keep_last]:
+            try:
+                os.remove(p)
+                self.pruned += 1
+            except OSError:
+                pass
+
+    def _on_training_end(self):
+        self.close()
+
+    def close(self):
+        if self._thread is None:
+            return
+        t0 = time.perf_counter()
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        flush_s = time.perf_counter() - t0
+        total = time.perf_counter() - self._t_start
+        lost = self.snapshot_s + self.blocked_s
+        print(f"[INFO] Checkpoints: {self.saved} guardados, {self.pruned} podados | entrenamiento parado "
+              f"{1000.0 * lost:.0f} ms ({100.0 * lost / total:.2f}%: copia {1000.0 * self.snapshot_s:.0f} ms, "
+              f"espera {1000.0 * self.blocked_s:.0f} ms) | escritura en segundo plano "
+              f"{1000.0 * self.write_s:.0f} ms | vaciado final {1000.0 * flush_s:.0f} ms")
+
+    def stats(self):
+        return {"saved": self.saved, "pruned": self.pruned, "snapshot_s": self.snapshot_s,
+                "blocked_s": self.blocked_s, "write_s": self.write_s}
+
+
+def evaluate_actor(weights, biases, activation, n_episodes=EVAL_EPISODES, max_steps=EVAL_MAX_STEPS,
+                   seed=0, team=None, home_pos=(-10.0, 0.0)):
+    """
+    Episodios deterministas del actor en n_episodes campos a la vez (un step
+    vectorizado) con la misma home que el entrenamiento. Devuelve la media y la desviación del retorno de cada
+    sub-entorno hasta su primer fin de episodio y los toques por episodio.
+    """
+    policy = NumpyPolicy(weights, biases, activation)
+    batch = make_batch(n_episodes, home_pos=home_pos, max_steps=max_steps, seed=seed, team=team)
+    obs = batch.reset()
+    n = len(obs)
+    ret = np.zeros(n)
+    active = np.ones(n, dtype=bool)
+    touches = 0
+    for _ in range(max_steps):
+        actions, _ = policy.predict(obs, deterministic=True)
+        obs, rew, done, _, _ = batch.step(actions)
+        ret[active] += rew[active]
+        # toques del step, antes del auto-reset (ball_dist() ya vería el campo reiniciado)
+        touches += int((batch.touched & active).sum())
+        active &= ~done
+        if not active.any():
+            break
+    return {"mean_reward": float(ret.mean()), "std_reward": float(ret.std()),
+            "touches_per_episode": touches / n}
+
+
+class AsyncEvalCallback(BaseCallback):
+    """Evaluación en un proceso aparte cada eval_freq steps, sin esperar al resultado."""
+
+    def __init__(self, eval_freq, save_path, name_prefix="ppo_rcss", n_episodes=EVAL_EPISODES,
+                 max_steps=EVAL_MAX_STEPS, team=None, home_pos=(-10.0, 0.0), seed=0, verbose=1):
+        super().__init__(verbose)
+        self.eval_freq = int(eval_freq)
+        self.best_path = os.path.join(save_path, f"{name_prefix}_best.npz")
+        self.n_episodes = int(n_episodes)
+        self.max_steps = int(max_steps)
+        self.team = team
+        self.home_pos = tuple(home_pos)
+        self.seed = seed
+        self.best_mean = -np.inf
+        self.results = []
+        self.skipped = 0
+        self.blocked_s = 0.0
+        self._pool = None
+        self._pending = None    # (future, timesteps, snapshot del actor)
+
+    def _init_callback(self):
+        method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        self._pool = ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context(method))
+
+    def _on_step(self):
+        t0 = time.perf_counter()
+        self._collect()
+        if self.n_calls % self.eval_freq == 0:
+            if self._pending is not None:
+                self.skipped += 1
+            else:
+                snap = actor_snapshot(self.model.policy)
+                fut = self._pool.submit(evaluate_actor, *snap, self.n_episodes, self.max_steps,
+                                        self.seed, self.team, self.home_pos)
+                self._pending = (fut, self.num_timesteps, snap)
+        self.blocked_s += time.perf_counter() - t0
+        return True
+
+    def _collect(self, wait=False):
+        if self._pending is None:
+            return
+        fut, steps, snap = self._pending
+        if not wait and not fut.done():
+            return
+        self._pending = None
+        try:
+            res = fut.result()
+        except Exception as e:
+            print(f"[WARN] Evaluación de {steps} pasos falló: {e!r}")
+            return
+        res["timesteps"] = steps
+        self.results.append(res)
+        self.logger.record("eval/mean_reward", res["mean_reward"])
+        self.logger.record("eval/touches_per_episode", res["touches_per_episode"])
+        self.logger.record("eval/timesteps", steps)
+        best = res["mean_reward"] > self.best_mean
+        if best:
+            self.best_mean = res["mean_reward"]
+            NumpyPolicy(*snap).save(self.best_path)
+        if self.verbose:
+            print(f"[INFO] Evaluación ({steps} pasos): recompensa {res['mean_reward']:+.2f} "
+                  f"± {res['std_reward']:.2f}, toques/episodio {res['touches_per_episode']:.2f}"
+                  + (f" -> mejor, guardado {self.best_path}" if best else ""))
+
+    def _on_training_end(self):
+        self._collect(wait=True)
+        self._pool.shutdown(wait=True)
+        if self.verbose:
+            print(f"[INFO] Evaluaciones: {len(self.results)} hechas, {self.skipped} saltadas "
+                  f"(la anterior seguía en curso), {1000.0 * self.blocked_s:.0f} ms en el step")
@@ -1,30 +1,247 @@
 # train_rl.py
+import argparse
+import json
 import os
+import time
+import torch
+import torch.nn as nn
 from stable_baselines3 import PPO
-from stable_baselines3.common.callbacks import CheckpointCallback
-from rcss_gym_env import RcssGymEnv
+from stable_baselines3.common.callbacks import CallbackList
+from stable_baselines3.common.vec_env import DummyVecEnv, VecMonitor
+from bc_dataset import stream_batches, prefetch, dataset_summary
+from formation import load_roles
+from numpy_policy import ACTIVATIONS
+from train_callbacks import AsyncCheckpointCallback, AsyncEvalCallback, KEEP_LAST
+from vec_env import make_vec_env
 
 MODEL_DIR = "models"
-os.makedirs(MODEL_DIR, exist_ok=True)
+CONF_FILE = "conf_file.conf"
 
-def train_single_agent(home_pos, total_timesteps=200_000):
-    env = RcssGymEnv(home_pos=home_pos, max_steps=1000)
-    # SB3 requires vector env; for simplicity usamos DummyVecEnv via helper
-    from stable_baselines3.common.vec_env import DummyVecEnv
-    venv = DummyVecEnv([lambda: env])
+ROLLOUT_STEPS = 2048  # pasos por rollout de PPO, repartidos entre todos los campos
+CHECKPOINT_EVERY = 20000  # pasos de entorno (totales) entre checkpoints
+EVAL_EVERY = 20000  # pasos de entorno (totales) entre evaluaciones (en otro proceso)
+BC_EPOCHS = 3
+BC_BATCH = 256
+BC_LR = 1e-3
 
-    policy_kwargs = dict(activation_fn=None, net_arch=[dict(pi=[128,128], vf=[128,128])])
-    model = PPO("MlpPolicy", venv, verbose=1, policy_kwargs=policy_kwargs, tensorboard_log="./tb_logs")
+# activaciones de la MlpPolicy; sólo las que numpy_policy sabe ejecutar en los agentes
+ACTIVATION_FNS = {"relu": nn.ReLU, "tanh": nn.Tanh}
+# hiperparámetros de make_model (lo que train_rl.py usaba fijo); sweep.py los varía
+DEFAULT_CONFIG = {
+    "activation": "relu",
+    "net_arch": [128, 128],     # capas de pi y vf (o dict(pi=[...], vf=[...]))
+    "learning_rate": 3e-4,
+    "rollout_steps": ROLLOUT_STEPS,
+    "batch_size": 64,
+    "n_epochs": 10,
+    "gamma": 0.99,
+    "gae_lambda": 0.95,
+    "clip_range": 0.2,
+    "ent_coef": 0.0,
+}
 
-    checkpoint_cb = CheckpointCallback(save_freq=20000, save_path=MODEL_DIR, name_prefix="ppo_rcss")
+def _layers_ok(layers):
+    return (isinstance(layers, (list, tuple)) and len(layers) > 0
+            and all(isinstance(n, int) and not isinstance(n, bool) and n > 0 for n in layers))
 
-    model.learn(total_timesteps=total_timesteps, callback=checkpoint_cb)
-    model.save(os.path.join(MODEL_DIR, "ppo_rcss_final"))
-    env.close()
+def validate_config(config=None):
+    """
+    DEFAULT_CONFIG con config encima, comprobado antes de construir el PPO
+    (p.ej. activation_fn=None revienta en MlpExtractor ya con el entorno
+    levantado). Lanza ValueError con todos los problemas encontrados.
+    """
+    config = dict(config or {})
+    errors = [f"parámetro desconocido: {k}" for k in config if k not in DEFAULT_CONFIG]
+    cfg = dict(DEFAULT_CONFIG, **{k: v for k, v in config.items() if k in DEFAULT_CONFIG})
+    act = cfg["activation"]
+    if act not in ACTIVATION_FNS or act not in ACTIVATIONS:
+        errors.append(f"activation={act!r} no soportada (usa {', '.join(sorted(ACTIVATION_FNS))})")
+    arch = cfg["net_arch"]
+    if isinstance(arch, dict):
+        if set(arch) != {"pi", "vf"} or not all(_layers_ok(v) for v in arch.values()):
+            errors.append(f"net_arch={arch!r}: se espera dict(pi=[...], vf=[...]) con enteros > 0")
+    elif not _layers_ok(arch):
+        errors.append(f"net_arch={arch!r}: se espera una lista no vacía de enteros > 0")
+    def check(name, ok, what):
+        v = cfg[name]
+        try:
+            good = ok(v)
+        except TypeError:
+            good = False
+        if not good:
+            errors.append(f"{name}={v!r}: {what}")
+    check("learning_rate", lambda v: v > 0, "debe ser > 0")
+    check("rollout_steps", lambda v: int(v) == v and v >= 64, "entero >= 64")
+    check("batch_size", lambda v: int(v) == v and 1 < v <= cfg["rollout_steps"], "entero en (1, rollout_steps]")
+    check("n_epochs", lambda v: int(v) == v and v >= 1, "entero >= 1")
+    check("gamma", lambda v: 0 < v <= 1, "en (0, 1]")
+    check("gae_lambda", lambda v: 0 <= v <= 1, "en [0, 1]")
+    check("clip_range", lambda v: v > 0, "debe ser > 0")
+    check("ent_coef", lambda v: v >= 0, "debe ser >= 0")
+    if errors:
+        raise ValueError("configuración inválida: " + "; ".join(errors))
+    return cfg
+
+def pretrain_bc(model, logs, epochs=BC_EPOCHS, batch_size=BC_BATCH, lr=BC_LR, seed=None):
+    """
+    Behaviour cloning: ajusta el actor de la MlpPolicy (mlp_extractor.policy_net
+    + action_net) a los pares obs -> acción de las decisiones heurísticas
+    grabadas (bc_dataset), maximizando log p(acción | obs). El crítico no se
+    toca; PPO arranca después desde estos pesos.
+    """
+    total, labelled, hist = dataset_summary(logs)
+    if labelled == 0:
+        print("[WARN] BC: no hay decisiones heurísticas etiquetables en", logs)
+        return
+    print(f"[INFO] BC: {labelled}/{total} registros etiquetados, acciones={hist.tolist()}")
+    policy = model.policy
+    params = list(policy.mlp_extractor.policy_net.parameters()) + list(policy.action_net.parameters())
+    opt = torch.optim.Adam(params, lr=lr)
+    policy.set_training_mode(True)
+    for epoch in range(epochs):
+        t0 = time.perf_counter()
+        loss_sum = hits = n = 0
+        # lectura y etiquetado en un hilo de fondo, solapados con la optimización
+        for obs, act in prefetch(stream_batches(logs, batch_size, seed=None if seed is None else seed + epoch)):
+            obs_t = torch.as_tensor(obs, device=policy.device)
+            act_t = torch.as_tensor(act, device=policy.device)
+            dist = policy.get_distribution(obs_t)
+            loss = -dist.log_prob(act_t).mean()
+            opt.zero_grad()
+            loss.backward()
+            opt.step()
+            loss_sum += loss.item() * act.size
+            hits += (dist.distribution.probs.argmax(dim=1) == act_t).sum().item()
+            n += act.size
+        print(f"[INFO] BC época {epoch + 1}/{epochs}: loss={loss_sum / n:.4f} "
+              f"acierto={100.0 * hits / n:.1f}% ({n / (time.perf_counter() - t0):.0f} muestras/s)")
+    policy.set_training_mode(False)
+
+def make_model(venv, seed=None, config=None, verbose=1, tensorboard_log="./tb_logs"):
+    """PPO sobre venv con los hiperparámetros de config (DEFAULT_CONFIG + cambios)."""
+    cfg = validate_config(config)
+    arch = cfg["net_arch"]
+    if not isinstance(arch, dict):
+        arch = dict(pi=list(arch), vf=list(arch))
+    policy_kwargs = dict(activation_fn=ACTIVATION_FNS[cfg["activation"]], net_arch=arch)
+    # mismo tamaño de rollout total que con un solo entorno
+    n_steps = max(64, int(cfg["rollout_steps"]) // venv.num_envs)
+    return PPO("MlpPolicy", venv, n_steps=n_steps, verbose=verbose, policy_kwargs=policy_kwargs,
+               tensorboard_log=tensorboard_log, seed=seed, learning_rate=cfg["learning_rate"],
+               batch_size=int(cfg["batch_size"]), n_epochs=int(cfg["n_epochs"]), gamma=cfg["gamma"],
+               gae_lambda=cfg["gae_lambda"], clip_range=cfg["clip_range"], ent_coef=cfg["ent_coef"])
+
+def _learn(model, venv, total_timesteps, name_prefix, team=None, home_pos=(-10.0, 0.0), keep_last=KEEP_LAST,
+           eval_every=EVAL_EVERY):
+    # las frecuencias cuentan llamadas a step del VecEnv (num_envs pasos cada una);
+    # checkpoints y evaluaciones se hacen en segundo plano (train_callbacks); la
+    # evaluación usa la misma home (o el mismo equipo) que el VecEnv de entrenamiento
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    callbacks = [AsyncCheckpointCallback(max(1, CHECKPOINT_EVERY // venv.num_envs), MODEL_DIR,
+                                         name_prefix, keep_last=keep_last)]
+    if eval_every > 0:
+        callbacks.append(AsyncEvalCallback(max(1, eval_every // venv.num_envs), MODEL_DIR, name_prefix,
+                                           team=team, home_pos=home_pos))
+    model.learn(total_timesteps=total_timesteps, callback=CallbackList(callbacks))
+    model.save(os.path.join(MODEL_DIR, f"{name_prefix}_final"))
+    venv.close()
     return model
 
-if _name_ == "_main_":
-    # ejemplo: entrenar un jugador con home en posición de delantero central
-    home_pos = (-10.0, 0.0)  # ajústalo según tu conf_file
-    model = train_single_agent(home_pos, total_timesteps=150_000)
-    print("Entrenamiento finalizado y modelo guardado.")
\ No newline at end of file
+def train_single_agent(home_pos, total_timesteps=200_000, n_envs=1, n_procs=1, seed=None,
+                       bc_logs=None, bc_epochs=BC_EPOCHS, server=None, keep_last=KEEP_LAST,
+                       eval_every=EVAL_EVERY, config=None):
+    cfg = validate_config(config)   # antes de levantar entornos
+    if server is not None:
+        # server real (o fake_server --synch) en synch_mode: un solo jugador + trainer
+        from rcss_server_env import RcssServerEnv
+        host, port, trainer_port = server
+        venv = VecMonitor(DummyVecEnv([lambda: RcssServerEnv(host, port, trainer_port, home_pos=home_pos,
+                                                             max_steps=1000, seed=seed)]))
+    else:
+        # n_envs campos simulados a la vez (un step NumPy vectorizado); con
+        # n_procs > 1 los campos se reparten entre procesos
+        venv = VecMonitor(make_vec_env(n_envs, n_procs, home_pos=home_pos, max_steps=1000, seed=seed))
+    model = make_model(venv, seed, cfg)
+    if bc_logs:
+        # arranque en caliente del actor con las decisiones grabadas
+        pretrain_bc(model, bc_logs, epochs=bc_epochs, seed=seed)
+    return _learn(model, venv, total_timesteps, "ppo_rcss", home_pos=home_pos, keep_last=keep_last,
+                  eval_every=eval_every)
+
+def train_team(conf_file=CONF_FILE, total_timesteps=1_000_000, n_fields=8, n_procs=1, seed=None,
+               keep_last=KEEP_LAST, eval_every=EVAL_EVERY, config=None):
+    """
+    Una sola política para los 11 roles de conf_file, con parámetros
+    compartidos: cada campo simula el equipo entero (homes de la muestra de
+    saque) y las transiciones de todos los jugadores entran en el mismo
+    rollout. La obs lleva la home y el rol (field_sim.role_features), así
+    que los agentes la usan con RCSS_ROLE_OBS=1. Guarda ppo_rcss_team_*.
+    """
+    cfg = validate_config(config)
+    homes, names = load_roles(conf_file)
+    print(f"[INFO] Equipo: {len(names)} roles ({', '.join(sorted(set(names)))}), "
+          f"{n_fields} campos -> {n_fields * len(names)} jugadores por step")
+    venv = VecMonitor(make_vec_env(n_fields, n_procs, max_steps=1000, seed=seed, team=(homes, names)))
+    model = make_model(venv, seed, cfg)
+    return _learn(model, venv, total_timesteps, "ppo_rcss_team", team=(homes, names), keep_last=keep_last,
+                  eval_every=eval_every)
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Entrenamiento PPO sobre el simulador headless")
+    ap.add_argument("--timesteps", type=int, default=150_000)
+    ap.add_argument("--n-envs", type=int, default=8, help="campos simulados en paralelo")
+    ap.add_argument("--n-procs", type=int, default=1, help="procesos entre los que repartir los campos")
+    ap.add_argument("--home", type=float, nargs=2, default=(-10.0, 0.0), metavar=("X", "Y"))
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--bc-logs", nargs="+", default=None, metavar="DIR",
+                    help="partidos grabados (RCSS_RECORD) para preentrenar el actor por behaviour cloning")
+    ap.add_argument("--bc-epochs", type=int, default=BC_EPOCHS)
+    ap.add_argument("--team", action="store_true",
+                    help="política compartida por los 11 roles de conf_file (ignora --home)")
+    ap.add_argument("--conf", default=CONF_FILE, help="conf_file con las homes y la tabla de roles (--team)")
+    ap.add_argument("--keep-last", type=int, default=KEEP_LAST,
+                    help="checkpoints que se conservan (0 = todos)")
+    ap.add_argument("--eval-every", type=int, default=EVAL_EVERY,
+                    help="pasos entre evaluaciones en segundo plano (0 = sin evaluación)")
+    ap.add_argument("--config", default=None, metavar="JSON",
+                    help="hiperparámetros sobre DEFAULT_CONFIG: JSON o fichero .json (p.ej. sweep_best.json)")
+    ap.add_argument("--server", default=None, metavar="HOST[:PORT]",
+                    help="entrenar contra un rcssserver en synch_mode (trainer en PORT + 1) en vez del simulador")
+    args = ap.parse_args()
+    if args.server:
+        host, _, port = args.server.partition(":")
+        port = int(port or 6000)
+        args.server = (host, port, port + 1)
+    if args.config:
+        text = args.config
+        if os.path.exists(text):
+            with open(text) as f:
+                text = f.read()
+        try:
+            args.config = json.loads(text)
+            validate_config(args.config)
+        except (json.JSONDecodeError, ValueError) as e:
+            ap.error(f"--config: {e}")
+    if args.team and args.server:
+        ap.error("--team no está soportado con --server")
+    if args.team and args.bc_logs:
+        ap.error("--bc-logs no está soportado con --team (los partidos grabados no llevan rasgos de rol)")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.team:
+        # n_envs son campos: cada uno aporta 11 jugadores al batch
+        train_team(args.conf, total_timesteps=args.timesteps, n_fields=args.n_envs,
+                   n_procs=args.n_procs, seed=args.seed, keep_last=args.keep_last,
+                   eval_every=args.eval_every, config=args.config)
+        print("Entrenamiento de equipo finalizado y modelo guardado.")
+    else:
+        # ejemplo: entrenar un jugador con home en posición de delantero central
+        home_pos = tuple(args.home)  # ajústalo según tu conf_file
+        model = train_single_agent(home_pos, total_timesteps=args.timesteps,
+                                   n_envs=args.n_envs, n_procs=args.n_procs, seed=args.seed,
+                                   bc_logs=args.bc_logs, bc_epochs=args.bc_epochs, server=args.server,
+                                   keep_last=args.keep_last, eval_every=args.eval_every,
+                                   config=args.config)
+        print("Entrenamiento finalizado y modelo guardado.")
@@ -0,0 +1,293 @@
+# vec_env.py
+# Entornos vectorizados para PPO: N campos independientes simulados como un
+# solo conjunto de arrays (field_sim.FieldSim), un step vectorizado para
+# todos. ShardedRcssVecEnv reparte los campos entre procesos (estilo
+# SubprocVecEnv) cuando hay varios cores.
+#
+# Con team=(homes, nombres) (formation.load_roles) cada campo lleva los 11
+# jugadores del conf_file y cada jugador es un sub-entorno del VecEnv: las
+# transiciones de todos los roles van en el mismo batch de una única
+# política compartida, que distingue el rol por los rasgos de la obs.
+import multiprocessing as mp
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from field_sim import (FieldSim, compute_reward, role_features, OBS_DIM, OBS_LOW, OBS_HIGH,
+                       TEAM_OBS_DIM, TEAM_OBS_LOW, TEAM_OBS_HIGH, N_ACTIONS)
+
+
+def make_spaces(team=False):
+    if team:
+        return (spaces.Box(low=TEAM_OBS_LOW, high=TEAM_OBS_HIGH, dtype=np.float32),
+                spaces.Discrete(N_ACTIONS))
+    return (spaces.Box(low=OBS_LOW, high=OBS_HIGH, dtype=np.float32),
+            spaces.Discrete(N_ACTIONS))
+
+
+class FieldBatch:
+    """
+    Núcleo sin dependencias de SB3: n campos, un jugador por campo, con
+    auto-reset de los campos que terminan (como hacen los VecEnv de SB3).
+    """
+
+    agents_per_field = 1
+
+    def __init__(self, n_envs, home_pos=(-10.0, 0.0), max_steps=1000, seed=None):
+        self.n = int(n_envs)
+        self.home_pos = tuple(float(v) for v in home_pos)
+        self.max_steps = int(max_steps)
+        self.sim = FieldSim(self.n, 1, home=self.home_pos, seed=seed)
+        self.steps = np.zeros(self.n, dtype=np.int64)
+        self._ball_dist = None
+        self.touched = np.zeros(self.n, dtype=bool)  # balón al alcance tras el último step (antes del reset)
+
+    def seed(self, seed):
+        self.sim.rng = np.random.default_rng(seed)
+
+    def reset(self):
+        self.sim.reset()
+        self.steps[:] = 0
+        self._ball_dist = self.sim.ball_dist()
+        return self.sim.observe()[:, 0].copy()
+
+    def step(self, actions):
+        """Devuelve (obs, rewards, dones, truncated, terminal_obs) con arrays (n, ...)."""
+        sim = self.sim
+        touched = sim.step(np.asarray(actions).reshape(self.n, 1))
+        self.touched = touched[:, 0]
+        out = sim.out_of_field()
+        reward, self._ball_dist = compute_reward(sim, self._ball_dist, touched, out)
+        self.steps += 1
+        terminated = out[:, 0]
+        truncated = (self.steps >= self.max_steps) & ~terminated
+        dones = terminated | truncated
+        obs = sim.observe()[:, 0].copy()
+        terminal_obs = None
+        if dones.any():
+            terminal_obs = obs[dones].copy()
+            sim.reset(dones)
+            self.steps[dones] = 0
+            self._ball_dist[dones] = sim.ball_dist()[dones]
+            obs[dones] = sim.observe()[dones, 0]
+        return obs, reward[:, 0], dones, truncated, terminal_obs
+
+
+class TeamFieldBatch:
+    """
+    n campos con un equipo completo cada uno (homes (k, 2) y nombres de rol).
+    Las salidas son (n * k, ...) en orden campo-jugador. Un jugador que sale
+    del campo termina su episodio y reaparece en su home sin parar el campo;
+    el campo entero se trunca y reinicia cada max_steps.
+    """
+
+    def __init__(self, n_fields, homes, names, max_steps=1000, seed=None):
+        self.n = int(n_fields)
+        homes = np.asarray(homes, dtype=np.float64).reshape(-1, 2)
+        self.k = self.agents_per_field = len(homes)
+        self.max_steps = int(max_steps)
+        self.sim = FieldSim(self.n, self.k, home=homes, seed=seed)
+        self.steps = np.zeros(self.n, dtype=np.int64)
+        self._ball_dist = None
+        self.touched = np.zeros(self.n * self.k, dtype=bool)  # por agente, antes del reset
+        # los rasgos de rol no cambian: se escriben una vez en el buffer de obs
+        self._obs = np.zeros((self.n, self.k, TEAM_OBS_DIM), dtype=np.float32)
+        self._obs[..., OBS_DIM:] = role_features(names, homes)
+
+    def seed(self, seed):
+        self.sim.rng = np.random.default_rng(seed)
+
+    def _observe(self):
+        self._obs[..., :OBS_DIM] = self.sim.observe()
+        return self._obs.reshape(self.n * self.k, TEAM_OBS_DIM).copy()
+
+    def reset(self):
+        self.sim.reset()
+        self.steps[:] = 0
+        self._ball_dist = self.sim.ball_dist()
+        return self._observe()
+
+    def step(self, actions):
+        sim = self.sim
+        touched = sim.step(np.asarray(actions).reshape(self.n, self.k))
+        self.touched = touched.ravel()
+        out = sim.out_of_field()
+        reward, self._ball_dist = compute_reward(sim, self._ball_dist, touched, out)
+        self.steps += 1
+        field_trunc = self.steps >= self.max_steps
+        terminated = out & ~field_trunc[:, None]
+        truncated = np.broadcast_to(field_trunc[:, None], out.shape) & ~terminated
+        dones = (terminated | truncated).ravel()
+        obs = self._observe()
+        terminal_obs = None
+        if dones.any():
+            terminal_obs = obs[dones].copy()
+            if terminated.any():
+                sim.reset_players(terminated)
+            if field_trunc.any():
+                sim.reset(field_trunc)
+                self.steps[field_trunc] = 0
+            reset = terminated | field_trunc[:, None]
+            self._ball_dist[reset] = sim.ball_dist()[reset]
+            obs[dones] = self._observe()[dones]
+        return obs, reward.ravel(), dones, truncated.ravel(), terminal_obs
+
+
+def make_batch(n_fields, home_pos=(-10.0, 0.0), max_steps=1000, seed=None, team=None):
+    """FieldBatch (un jugador por campo) o, con team=(homes, nombres), TeamFieldBatch."""
+    if team is None:
+        return FieldBatch(n_fields, home_pos, max_steps, seed)
+    homes, names = team
+    return TeamFieldBatch(n_fields, homes, names, max_steps, seed)
+
+
+def _infos(dones, truncated, terminal_obs, n):
+    infos = [{} for _ in range(n)]
+    if terminal_obs is not None:
+        for j, i in enumerate(np.flatnonzero(dones)):
+            infos[i]["terminal_observation"] = terminal_obs[j]
+            infos[i]["TimeLimit.truncated"] = bool(truncated[i])
+    return infos
+
+
+class _BatchVecEnvBase(VecEnv):
+    """Métodos comunes: atributos y métodos de los sub-entornos no aplican."""
+
+    render_mode = None
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name, None)] * len(self._get_indices(indices))
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        raise NotImplementedError(f"{type(self).__name__} no tiene sub-entornos gymnasium")
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(self._get_indices(indices))
+
+
+class RcssVecEnv(_BatchVecEnvBase):
+    """n_envs campos en un único proceso, un step NumPy para todos."""
+
+    def __init__(self, n_envs, home_pos=(-10.0, 0.0), max_steps=1000, seed=None, team=None):
+        self.batch = make_batch(n_envs, home_pos, max_steps, seed, team)
+        obs_space, act_space = make_spaces(team is not None)
+        super().__init__(n_envs * self.batch.agents_per_field, obs_space, act_space)
+        self._actions = None
+
+    def reset(self):
+        if self._seeds[0] is not None:
+            self.batch.seed(self._seeds[0])
+        self._reset_seeds()
+        return self.batch.reset()
+
+    def step_async(self, actions):
+        self._actions = actions
+
+    def step_wait(self):
+        obs, rewards, dones, truncated, terminal_obs = self.batch.step(self._actions)
+        return obs, rewards, dones, _infos(dones, truncated, terminal_obs, self.num_envs)
+
+    def close(self):
+        pass
+
+
+def _shard_worker(remote, parent_remote, n_envs, home_pos, max_steps, seed, team=None):
+    parent_remote.close()
+    batch = make_batch(n_envs, home_pos, max_steps, seed, team)
+    try:
+        while True:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                remote.send(batch.step(data))
+            elif cmd == "reset":
+                if data is not None:
+                    batch.seed(data)
+                remote.send(batch.reset())
+            elif cmd == "close":
+                break
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        remote.close()
+
+
+class ShardedRcssVecEnv(_BatchVecEnvBase):
+    """
+    n_envs campos repartidos entre n_procs procesos; cada proceso simula su
+    trozo con FieldBatch (vectorizado) y el step de todos corre en paralelo.
+    """
+
+    def __init__(self, n_envs, n_procs, home_pos=(-10.0, 0.0), max_steps=1000, seed=None,
+                 start_method=None, team=None):
+        n_procs = max(1, min(int(n_procs), int(n_envs)))
+        sizes = [len(c) for c in np.array_split(np.arange(n_envs), n_procs)]
+        # límites en sub-entornos (jugadores), no en campos
+        per_field = 1 if team is None else len(team[0])
+        self._bounds = np.cumsum([0] + sizes) * per_field
+
+        if start_method is None:
+            start_method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+        self.remotes, self.processes = [], []
+        for i, size in enumerate(sizes):
+            remote, work_remote = ctx.Pipe()
+            wseed = None if seed is None else seed + 1000 * i
+            p = ctx.Process(target=_shard_worker,
+                            args=(work_remote, remote, size, home_pos, max_steps, wseed, team),
+                            daemon=True)
+            p.start()
+            work_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(p)
+        self.closed = False
+
+        obs_space, act_space = make_spaces(team is not None)
+        super().__init__(int(n_envs) * per_field, obs_space, act_space)
+
+    def reset(self):
+        for i, remote in enumerate(self.remotes):
+            seed = self._seeds[0]
+            remote.send(("reset", None if seed is None else seed + 1000 * i))
+        self._reset_seeds()
+        return np.concatenate([remote.recv() for remote in self.remotes])
+
+    def step_async(self, actions):
+        actions = np.asarray(actions)
+        for i, remote in enumerate(self.remotes):
+            remote.send(("step", actions[self._bounds[i]:self._bounds[i + 1]]))
+
+    def step_wait(self):
+        results = [remote.recv() for remote in self.remotes]
+        obs = np.concatenate([r[0] for r in results])
+        rewards = np.concatenate([r[1] for r in results])
+        dones = np.concatenate([r[2] for r in results])
+        truncated = np.concatenate([r[3] for r in results])
+        terminal = [r[4] for r in results if r[4] is not None]
+        terminal_obs = np.concatenate(terminal) if terminal else None
+        return obs, rewards, dones, _infos(dones, truncated, terminal_obs, self.num_envs)
+
+    def close(self):
+        if self.closed:
+            return
+        for remote in self.remotes:
+            try:
+                remote.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for p in self.processes:
+            p.join(timeout=2.0)
+        self.closed = True
+
+
+def make_vec_env(n_envs=1, n_procs=1, home_pos=(-10.0, 0.0), max_steps=1000, seed=None, team=None):
+    """
+    RcssVecEnv si n_procs <= 1, ShardedRcssVecEnv si no. Con team, n_envs
+    son campos y el VecEnv tiene n_envs * 11 sub-entornos (uno por jugador).
+    """
+    if n_procs <= 1:
+        return RcssVecEnv(n_envs, home_pos, max_steps, seed, team)
+    return ShardedRcssVecEnv(n_envs, n_procs, home_pos, max_steps, seed, team=team)
@@ -0,0 +1,135 @@
+# world_model.py
+# Modelo del mundo compartido por todo el equipo: cada jugador publica en
+# su slot su última posición y su última observación del balón (con la hora
+# de cada una) y cualquiera lee una estimación fusionada del balón y las
+# posiciones de los compañeros.
+#
+# Los datos viven en un bloque de multiprocessing.shared_memory visto como
+# array NumPy estructurado, así que sirve igual con los 11 jugadores en un
+# proceso (team_runtime) que repartidos en workers (team_supervisor, que lo
+# crea antes del fork). Sin locks: cada slot tiene un único escritor (su
+# jugador) y un contador de secuencia estilo seqlock; el lector copia el
+# array y descarta los slots que cambiaron mientras leía.
+# Los tiempos son time.monotonic(), común a todos los procesos de la máquina.
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+SLOT_DTYPE = np.dtype([
+    ("unum", np.int32),
+    ("cycle", np.int32),     # ciclo local del jugador al publicar
+    ("x", np.float64), ("y", np.float64),
+    ("pos_t", np.float64),   # hora de la última posición propia (0 = nunca)
+    ("ball_x", np.float64), ("ball_y", np.float64),
+    ("ball_t", np.float64),  # hora de la última observación propia del balón
+])
+
+BALL_MAX_AGE = 0.3      # s: observaciones del balón más viejas no se usan
+OWN_BALL_STALE = 0.15   # s: sin ver el balón más de esto el jugador usa la del equipo
+FUSE_WINDOW = 0.05      # s: se fusionan las observaciones del mismo ciclo que la más reciente
+TEAMMATE_MAX_AGE = 0.5
+READ_RETRIES = 3
+
+
+class BallEstimate:
+    __slots__ = ("x", "y", "time", "sources")
+
+    def __init__(self, x, y, t, sources):
+        self.x = x
+        self.y = y
+        self.time = t
+        self.sources = sources
+
+
+class WorldModel:
+    """
+    n_slots slots (uno por jugador; slot = índice del jugador - 1).
+    Sin name crea el bloque compartido; con name se engancha a uno existente
+    (otro proceso sin fork). El creador debe llamar a unlink() al terminar.
+    """
+
+    def __init__(self, n_slots=11, name=None):
+        self.n = int(n_slots)
+        size = 8 * self.n + SLOT_DTYPE.itemsize * self.n
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        buf = self.shm.buf
+        self.seq = np.ndarray((self.n,), dtype=np.uint64, buffer=buf, offset=0)
+        self.slots = np.ndarray((self.n,), dtype=SLOT_DTYPE, buffer=buf, offset=8 * self.n)
+        if self.owner:
+            self.seq[:] = 0
+            self.slots[:] = np.zeros(self.n, dtype=SLOT_DTYPE)
+        self._one = np.uint64(1)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    # ---------- escritura (un solo escritor por slot) ----------
+    def publish(self, slot, unum, cycle, x, y, pos_t, ball_x, ball_y, ball_t):
+        seq = self.seq
+        seq[slot] += self._one   # impar: escritura en curso
+        self.slots[slot] = (unum or 0, cycle, x, y, pos_t, ball_x, ball_y, ball_t)
+        seq[slot] += self._one   # par: slot consistente
+
+    # ---------- lectura ----------
+    def snapshot(self):
+        """
+        Copia consistente de todos los slots y máscara de los que se pudieron
+        leer sin escritura concurrente (tras READ_RETRIES reintentos).
+        """
+        out = np.empty(self.n, dtype=SLOT_DTYPE)
+        ok = np.zeros(self.n, dtype=bool)
+        pending = np.arange(self.n)
+        for _ in range(READ_RETRIES):
+            s1 = self.seq[pending]  # indexado con array: ya es copia
+            out[pending] = self.slots[pending]
+            s2 = self.seq[pending]
+            good = (s1 == s2) & (s1 % 2 == 0)
+            ok[pending[good]] = True
+            pending = pending[~good]
+            if pending.size == 0:
+                break
+        return out, ok
+
+    def fused_ball(self, now=None, max_age=BALL_MAX_AGE, window=FUSE_WINDOW):
+        """
+        Estimación del balón con las observaciones de todo el equipo: se
+        toma la más reciente y las del mismo ciclo, ponderadas por cercanía
+        del observador (el ruido de see crece con la distancia).
+        Devuelve BallEstimate o None si nadie lo vio hace menos de max_age.
+        """
+        now = time.monotonic() if now is None else now
+        snap, ok = self.snapshot()
+        bt = snap["ball_t"]
+        valid = ok & (bt > 0) & (now - bt <= max_age)
+        if not valid.any():
+            return None
+        newest = bt[valid].max()
+        use = valid & (bt >= newest - window)
+        s = snap[use]
+        dist = np.hypot(s["ball_x"] - s["x"], s["ball_y"] - s["y"])
+        w = 1.0 / (1.0 + dist)
+        w /= w.sum()
+        return BallEstimate(float(w @ s["ball_x"]), float(w @ s["ball_y"]), float(newest), int(use.sum()))
+
+    def teammates(self, now=None, max_age=TEAMMATE_MAX_AGE, exclude=None):
+        """{unum: (x, y, edad_s)} de los compañeros con posición reciente."""
+        now = time.monotonic() if now is None else now
+        snap, ok = self.snapshot()
+        pt = snap["pos_t"]
+        valid = ok & (pt > 0) & (now - pt <= max_age) & (snap["unum"] > 0)
+        if exclude is not None:
+            valid[exclude] = False
+        return {int(r["unum"]): (float(r["x"]), float(r["y"]), now - float(r["pos_t"]))
+                for r in snap[valid]}
+
+    def close(self):
+        # soltar las vistas antes de cerrar el bloque
+        self.seq = self.slots = None
+        self.shm.close()
+
+    def unlink(self):
+        if self.owner:
+            self.shm.unlink()